@@ -7,8 +7,14 @@ from flask_login import LoginManager
 from flask_migrate import Migrate
 from apscheduler.schedulers.background import BackgroundScheduler
 from config import get_config
-from app.models import db, Colaborador
-from app.fila import GerenciadorFila
+from app.models import db
+from app.fila import ao_distribuir
+# Infraestrutura: banco, concorrência, réplica e observabilidade
+from app import banco, concorrencia, replica, metricas, monitor_sql
+# Caches e estado por processo
+from app import cache_usuarios, senhas, configuracoes, idempotencia, painel, busca
+# Fila: pendentes, previsão de espera, ciclo de vida e escrita adiada
+from app import pendentes, previsao, ciclo_vida, escrita_adiada
 
 # Inicializa extensões
 socketio = SocketIO()
@@ -23,6 +29,7 @@ def create_app():
     
     # Carrega configurações
     app.config.from_object(get_config())
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = banco.opcoes_engine(app.config)
     
     # Inicializa extensões com a app
     db.init_app(app)
@@ -30,17 +37,60 @@ def create_app():
                      async_mode=app.config['SOCKETIO_ASYNC_MODE'],
                      cors_allowed_origins=app.config['SOCKETIO_CORS_ALLOWED_ORIGINS'])
     login_manager.init_app(app)
-    migrate.init_app(app, db)
+    # O índice textual (app.busca) fica fora do autogenerate
+    migrate.init_app(app, db, include_object=busca.incluir_no_autogenerate)
+    
+    # Nos modos cooperativos o acesso ao banco sai do loop de eventos
+    concorrencia.configurar(app.config['SOCKETIO_ASYNC_MODE'],
+                            app.config['DB_THREADPOOL_SIZE'],
+                            app.config['SQLALCHEMY_DATABASE_URI'],
+                            app.config['SQLITE_BUSY_TIMEOUT_MS'] / 1000)
+    with app.app_context():
+        for engine in db.engines.values():
+            concorrencia.registrar_execucao_em_threads(engine)
+            banco.configurar_engine(engine, app.config)
+    
+    # Sessão da réplica de leitura (relatórios) é fechada ao fim de cada contexto
+    app.teardown_appcontext(replica.encerrar_sessao)
     
     # Configurações do Flask-Login
     login_manager.login_view = 'auth.login'
     login_manager.login_message = 'Por favor, faça login para acessar esta página.'
     login_manager.login_message_category = 'info'
     
+    # Hash de senhas em pool de processos
+    senhas.configurar(app.config['SENHA_METODO'],
+                      app.config['SENHA_PROCESSOS'],
+                      app.config['SENHA_FILA_MAXIMA'])
+    
+    # Usuários autenticados ficam em cache, invalidado a cada alteração
+    cache_usuarios.configurar(app.config['CACHE_USUARIOS_TTL'],
+                              app.config['CACHE_USUARIOS_MAX'])
+    
+    # Resultados de criações com chave de idempotência, para as repetições
+    idempotencia.configurar(app.config['IDEMPOTENCIA_TTL_SEGUNDOS'],
+                            app.config['IDEMPOTENCIA_MAX'])
+    
+    # Painel de TV: um resumo por intervalo, compartilhado pelos assinantes SSE
+    painel.configurar(app.config['PAINEL_MAXIMO_ASSINANTES'])
+    app.wsgi_app = painel.sem_acumulo(app.wsgi_app)
+    
+    # Busca textual: quantas correspondências entram na ordenação por relevância
+    busca.configurar(app.config['BUSCA_MAXIMO_CANDIDATOS'])
+    
+    # Pendentes em heap por prioridade, com envelhecimento
+    pendentes.configurar(app.config['PRIORIDADE_ENVELHECIMENTO_SEGUNDOS'])
+    
+    # Médias móveis da duração dos atendimentos para a previsão de espera
+    previsao.configurar(app.config['PREVISAO_ALFA'])
+    
+    # Horários do ciclo de vida e observações gravados em lote, fora das transições
+    escrita_adiada.configurar(app, app.config['ESCRITA_ADIADA_MAXIMO'])
+    
     @login_manager.user_loader
     def load_user(user_id):
         """Carrega o usuário pelo ID"""
-        return Colaborador.query.get(int(user_id))
+        return cache_usuarios.carregar(int(user_id))
     
     # Registra blueprints
     from app.auth import auth_bp
@@ -53,31 +103,30 @@ def create_app():
     from app.socket_events import register_socket_events
     register_socket_events(socketio)
     
-    # Configura agendador de tarefas
-    def verificar_timeouts_job():
-        """Job para verificar timeouts periodicamente"""
-        with app.app_context():
-            try:
-                resultados = GerenciadorFila.verificar_timeouts()
-                if resultados:
-                    print(f'Timeouts processados: {len(resultados)}')
-                    # Notifica via SocketIO sobre os timeouts
-                    for resultado in resultados:
-                        socketio.emit('timeout_processado', resultado, 
-                                    room=f'colaborador_{resultado["proximo_colaborador"]}')
-            except Exception as e:
-                print(f'Erro ao verificar timeouts: {e}')
-    
-    # Agenda verificação de timeouts a cada minuto
-    if not scheduler.running:
-        scheduler.add_job(
-            func=verificar_timeouts_job,
-            trigger='interval',
-            minutes=1,
-            id='verificar_timeouts',
-            replace_existing=True
-        )
-        scheduler.start()
+    # Latência por rota e por evento, exposta em /metrics
+    if app.config['METRICAS_HABILITADAS']:
+        metricas.instrumentar(app, socketio)
+    
+    # Consultas SQL por requisição/evento e detecção de N+1
+    if app.config['SQL_MONITOR']:
+        monitor_sql.configurar(app, socketio)
+    
+    # Notifica quem recebeu uma solicitação, qualquer que seja a origem da distribuição
+    @ao_distribuir
+    def notificar_distribuicao(dados, colaborador_id):
+        socketio.emit('nova_solicitacao_recebida',
+                      dict(dados, timeout_minutos=configuracoes.timeout_minutos()),
+                      room=f'colaborador_{colaborador_id}')
+        ciclo_vida.notificada(colaborador_id, dados['solicitacao_id'])
+    
+    # Avisa os clientes conectados quando uma configuração muda
+    @configuracoes.ao_alterar
+    def notificar_configuracoes(alteradas):
+        socketio.emit('configuracoes_alteradas', alteradas, room='geral')
+    
+    # Jobs periódicos (app.tarefas)
+    from app import tarefas
+    tarefas.agendar(app)
     
     # Context processor para disponibilizar variáveis em todos os templates
     @app.context_processor
@@ -85,7 +134,7 @@ def create_app():
         """Injeta variáveis globais nos templates"""
         return {
             'app_name': 'Sistema de Fila de Atendimento',
-            'timeout_minutos': app.config.get('TIMEOUT_MINUTOS', 20)
+            'timeout_minutos': configuracoes.timeout_minutos()
         }
     
     # Tratamento de erros
@@ -102,35 +151,9 @@ def create_app():
         db.session.rollback()
         return render_template('errors/500.html'), 500
     
-    # Comando CLI para inicializar o banco de dados
-    @app.cli.command()
-    def init_db():
-        """Inicializa o banco de dados"""
-        db.create_all()
-        print('Banco de dados inicializado!')
-    
-    # Comando CLI para criar usuário admin
-    @app.cli.command()
-    def create_admin():
-        """Cria um usuário administrador"""
-        admin = Colaborador.query.filter_by(email='admin@empresa.com').first()
-        if admin:
-            print('Usuário admin já existe!')
-            return
-        
-        admin = Colaborador(
-            nome='Administrador',
-            email='admin@empresa.com'
-        )
-        admin.set_senha('admin123')
-        
-        db.session.add(admin)
-        db.session.commit()
-        
-        print('Usuário admin criado com sucesso!')
-        print('Email: admin@empresa.com')
-        print('Senha: admin123')
-        print('IMPORTANTE: Altere a senha em produção!')
+    # Comandos CLI (app.comandos)
+    from app import comandos
+    comandos.registrar(app)
     
     return app
 
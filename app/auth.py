@@ -1,13 +1,26 @@
 """
 Sistema de autenticação de colaboradores
 """
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
 from flask_login import login_user, logout_user, login_required, current_user
 from app.models import db, Colaborador
+from app.senhas import FilaSenhasCheia
 
 auth_bp = Blueprint('auth', __name__)
 
 
+def eh_administrador(usuario):
+    """Indica se o usuário está entre os ADMINISTRADORES configurados"""
+    return (usuario.is_authenticated
+            and usuario.email in current_app.config['ADMINISTRADORES'])
+
+
+def _fila_senhas_cheia(template):
+    """Resposta quando o pool de senhas não aceita mais cálculos (503)"""
+    flash('Muitos acessos simultâneos. Tente novamente em instantes.', 'error')
+    return render_template(template), 503
+
+
 @auth_bp.route('/login', methods=['GET', 'POST'])
 def login():
     """Página de login"""
@@ -29,7 +42,16 @@ def login():
         colaborador = Colaborador.query.filter_by(email=email).first()
         
         # Verifica credenciais
-        if colaborador and colaborador.verificar_senha(senha):
+        try:
+            senha_correta = colaborador is not None and colaborador.verificar_senha(senha)
+        except FilaSenhasCheia:
+            return _fila_senhas_cheia('login.html')
+        
+        if senha_correta:
+            # Atualiza o hash se o custo configurado mudou
+            if colaborador.atualizar_hash_senha(senha):
+                db.session.commit()
+            
             login_user(colaborador, remember=lembrar)
             
             # Redireciona para a página solicitada ou dashboard
@@ -96,7 +118,10 @@ def registro():
             nome=nome,
             email=email
         )
-        novo_colaborador.set_senha(senha)
+        try:
+            novo_colaborador.set_senha(senha)
+        except FilaSenhasCheia:
+            return _fila_senhas_cheia('registro.html')
         
         db.session.add(novo_colaborador)
         db.session.commit()
@@ -129,7 +154,12 @@ def alterar_senha():
             flash('Por favor, preencha todos os campos.', 'error')
             return render_template('alterar_senha.html')
         
-        if not current_user.verificar_senha(senha_atual):
+        try:
+            senha_correta = current_user.verificar_senha(senha_atual)
+        except FilaSenhasCheia:
+            return _fila_senhas_cheia('alterar_senha.html')
+        
+        if not senha_correta:
             flash('Senha atual incorreta.', 'error')
             return render_template('alterar_senha.html')
         
@@ -142,7 +172,10 @@ def alterar_senha():
             return render_template('alterar_senha.html')
         
         # Atualiza a senha
-        current_user.set_senha(nova_senha)
+        try:
+            current_user.set_senha(nova_senha)
+        except FilaSenhasCheia:
+            return _fila_senhas_cheia('alterar_senha.html')
         db.session.commit()
         
         flash('Senha alterada com sucesso!', 'success')
@@ -0,0 +1,84 @@
+"""
+Perfis de configuração do engine do banco de dados
+
+- sqlite: WAL, synchronous=NORMAL, busy_timeout, mmap e cache por conexão
+- postgres: pool dimensionado, pre-ping, reciclagem e statement_timeout
+- padrao: sem ajustes (comportamento do SQLAlchemy)
+
+O perfil é escolhido por DB_PERFIL; com 'auto' ele é deduzido da URI.
+"""
+from sqlalchemy import event
+from app import concorrencia
+
+PERFIS = ('auto', 'sqlite', 'postgres', 'padrao')
+
+
+def obter_perfil(config):
+    """Retorna o perfil efetivo para a configuração"""
+    perfil = config.get('DB_PERFIL', 'auto')
+    if perfil not in PERFIS:
+        raise ValueError(f'DB_PERFIL inválido: {perfil} (use {", ".join(PERFIS)})')
+    if perfil != 'auto':
+        return perfil
+
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    if uri.startswith('sqlite'):
+        return 'sqlite'
+    if uri.startswith('postgresql'):
+        return 'postgres'
+    return 'padrao'
+
+
+def _sqlite_em_memoria(uri):
+    return uri.startswith('sqlite') and (':memory:' in uri or uri.rstrip('/') == 'sqlite:')
+
+
+def opcoes_engine(config):
+    """Monta as opções do engine do SQLAlchemy a partir da configuração"""
+    opcoes = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    uri = config['SQLALCHEMY_DATABASE_URI']
+    perfil = obter_perfil(config)
+
+    # SQLite em memória usa uma única conexão estática, sem pool
+    if _sqlite_em_memoria(uri):
+        return opcoes
+
+    opcoes.setdefault('pool_size', config['SQLALCHEMY_POOL_SIZE'])
+    opcoes.setdefault('max_overflow', config['SQLALCHEMY_MAX_OVERFLOW'])
+
+    if perfil == 'postgres':
+        opcoes.setdefault('pool_pre_ping', True)
+        opcoes.setdefault('pool_recycle', config['POSTGRES_POOL_RECYCLE'])
+        opcoes.setdefault('pool_timeout', config['POSTGRES_POOL_TIMEOUT'])
+        if config['POSTGRES_STATEMENT_TIMEOUT_MS']:
+            connect_args = dict(opcoes.get('connect_args', {}))
+            connect_args.setdefault(
+                'options', f'-c statement_timeout={config["POSTGRES_STATEMENT_TIMEOUT_MS"]}'
+            )
+            opcoes['connect_args'] = connect_args
+
+    return opcoes
+
+
+def configurar_engine(engine, config):
+    """Aplica os ajustes por conexão do perfil selecionado"""
+    if obter_perfil(config) != 'sqlite' or engine.dialect.name != 'sqlite':
+        return
+
+    pragmas = [
+        f'PRAGMA journal_mode={config["SQLITE_JOURNAL_MODE"]}',
+        f'PRAGMA synchronous={config["SQLITE_SYNCHRONOUS"]}',
+        f'PRAGMA mmap_size={config["SQLITE_MMAP_SIZE"]}',
+        f'PRAGMA cache_size={config["SQLITE_CACHE_SIZE"]}',
+    ]
+    # Nos modos cooperativos a espera por locks acontece fora da thread
+    # nativa (ver app.concorrencia), então o busy_timeout fica curto
+    if not concorrencia.modo_cooperativo():
+        pragmas.append(f'PRAGMA busy_timeout={config["SQLITE_BUSY_TIMEOUT_MS"]}')
+
+    @event.listens_for(engine, 'connect')
+    def _aplicar_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
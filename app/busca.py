@@ -0,0 +1,256 @@
+"""
+Busca textual em solicitações (cliente, telefone e descrição)
+
+SQLite: uma tabela FTS5 sem conteúdo próprio (solicitacoes_busca), com o
+rowid igual ao id da solicitação, mantida por gatilhos de INSERT, DELETE e
+UPDATE das colunas indexadas (mudanças de status não disparam nada).
+PostgreSQL: uma coluna tsvector gerada (solicitacoes.busca) com índice GIN,
+que o próprio banco recalcula a cada escrita.
+
+Nos dois casos o telefone é indexado como digitado e só com os dígitos, e
+cliente e telefone pesam mais que a descrição. Cada termo da consulta é
+buscado como prefixo e todos precisam aparecer. Telefones, portanto, são
+encontrados pelo começo de um bloco como digitado ("93287" ou "6275" em
+"(11) 93287-6275") ou pelo começo do número só com dígitos, com o DDD
+("1193287"); um trecho do meio ("3287") ou o número sem o DDD
+("932876275") não é encontrado.
+
+A relevância é calculada só sobre as `maximo_candidatos` correspondências
+mais recentes (as de maior id, que o índice percorre sem calcular a
+relevância): calculá-la para todas custa ~1,4 s com um termo presente em
+1 milhão de solicitações, e com o limite (5000) ~40 ms. Correspondências
+mais antigas que isso ficam fora do resultado. A paginação é por cursor
+(relevância, id) da última linha da página, sem OFFSET, então a página
+seguinte custa o mesmo que a primeira. O objeto de banco é criado junto
+com a tabela solicitacoes (db.create_all) e pela migração.
+"""
+import re
+from sqlalchemy import event
+from app.models import db, Solicitacao
+
+TABELA = 'solicitacoes_busca'
+MAXIMO_TERMOS = 8
+
+_RE_TERMO = re.compile(r'[^\W_]+')
+_maximo_candidatos = 5000
+
+
+def configurar(maximo_candidatos):
+    """Correspondências mais recentes consideradas em cada busca (0 considera todas)"""
+    global _maximo_candidatos
+    _maximo_candidatos = int(maximo_candidatos)
+
+
+def _telefone_sqlite(linha):
+    # Sem regex no SQLite: remove os separadores usuais
+    digitos = f"coalesce({linha}.cliente_telefone, '')"
+    for separador in (' ', '(', ')', '-', '+', '.', '/'):
+        digitos = f"replace({digitos}, '{separador}', '')"
+    return f"coalesce({linha}.cliente_telefone, '') || ' ' || {digitos}"
+
+
+def _valores_sqlite(linha):
+    return f"{linha}.id, {linha}.descricao, coalesce({linha}.cliente_nome, ''), {_telefone_sqlite(linha)}"
+
+
+_INSERIR_SQLITE = (f'INSERT INTO {TABELA}(rowid, descricao, cliente_nome, cliente_telefone) '
+                   f'VALUES ({_valores_sqlite("NEW")});')
+# Tabela sem conteúdo: a remoção repete os valores indexados
+_REMOVER_SQLITE = (f"INSERT INTO {TABELA}({TABELA}, rowid, descricao, cliente_nome, cliente_telefone) "
+                   f"VALUES ('delete', {_valores_sqlite('OLD')});")
+
+DDL_SQLITE = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA} USING fts5("
+    f"descricao, cliente_nome, cliente_telefone, content='', "
+    f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+    # Cliente e telefone pesam 3x a descrição em ORDER BY rank
+    f"INSERT INTO {TABELA}({TABELA}, rank) VALUES ('rank', 'bm25(1.0, 3.0, 3.0)')",
+    f"CREATE TRIGGER IF NOT EXISTS {TABELA}_ai AFTER INSERT ON solicitacoes BEGIN "
+    f"{_INSERIR_SQLITE} END",
+    f"CREATE TRIGGER IF NOT EXISTS {TABELA}_ad AFTER DELETE ON solicitacoes BEGIN "
+    f"{_REMOVER_SQLITE} END",
+    f"CREATE TRIGGER IF NOT EXISTS {TABELA}_au AFTER UPDATE OF descricao, cliente_nome, cliente_telefone "
+    f"ON solicitacoes BEGIN {_REMOVER_SQLITE} {_INSERIR_SQLITE} END",
+]
+
+DDL_POSTGRES = [
+    "ALTER TABLE solicitacoes ADD COLUMN IF NOT EXISTS busca tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('simple', coalesce(cliente_nome, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(cliente_telefone, '') || ' ' || "
+    "regexp_replace(coalesce(cliente_telefone, ''), '[^0-9]', '', 'g')), 'A') || "
+    "setweight(to_tsvector('simple', descricao), 'B')) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_solicitacoes_busca ON solicitacoes USING gin (busca)",
+]
+
+REMOVER_GATILHOS_SQLITE = [
+    f'DROP TRIGGER IF EXISTS {TABELA}_ai',
+    f'DROP TRIGGER IF EXISTS {TABELA}_ad',
+    f'DROP TRIGGER IF EXISTS {TABELA}_au',
+]
+
+REMOVER_SQLITE = REMOVER_GATILHOS_SQLITE + [f'DROP TABLE IF EXISTS {TABELA}']
+
+REMOVER_POSTGRES = [
+    'DROP INDEX IF EXISTS ix_solicitacoes_busca',
+    'ALTER TABLE solicitacoes DROP COLUMN IF EXISTS busca',
+]
+
+
+def criar(conexao):
+    """Cria o índice textual no banco da conexão (sem efeito em outros bancos)"""
+    nome = conexao.dialect.name
+    for comando in DDL_SQLITE if nome == 'sqlite' else DDL_POSTGRES if nome == 'postgresql' else ():
+        conexao.exec_driver_sql(comando)
+
+
+def remover(conexao):
+    """Remove o índice textual"""
+    nome = conexao.dialect.name
+    for comando in REMOVER_SQLITE if nome == 'sqlite' else REMOVER_POSTGRES if nome == 'postgresql' else ():
+        conexao.exec_driver_sql(comando)
+
+
+def _indexar_sqlite(conexao, desde_id=0):
+    conexao.exec_driver_sql(
+        f'INSERT INTO {TABELA}(rowid, descricao, cliente_nome, cliente_telefone) '
+        f'SELECT {_valores_sqlite("solicitacoes")} FROM solicitacoes WHERE id >= ?',
+        (desde_id,)
+    )
+
+
+def reindexar(conexao):
+    """Reconstrói o índice a partir de solicitacoes; retorna o número de linhas indexadas"""
+    if conexao.dialect.name == 'sqlite':
+        conexao.exec_driver_sql(f"INSERT INTO {TABELA}({TABELA}) VALUES ('delete-all')")
+        _indexar_sqlite(conexao)
+    elif conexao.dialect.name == 'postgresql':
+        # A coluna gerada já está em dia; só o índice é refeito
+        conexao.exec_driver_sql('REINDEX INDEX ix_solicitacoes_busca')
+    return conexao.exec_driver_sql('SELECT count(*) FROM solicitacoes').scalar()
+
+
+def suspender(conexao):
+    """
+    Remove os gatilhos do SQLite antes de uma carga em massa, que indexados
+    linha a linha deixam a carga 2,5x mais lenta. Retorna se havia índice;
+    nesse caso a carga deve terminar com retomar()
+    """
+    if conexao.dialect.name != 'sqlite':
+        # No PostgreSQL a coluna gerada não tem gatilho a suspender
+        return False
+    existe = conexao.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (TABELA,)
+    ).first()
+    if not existe:
+        return False
+    for comando in REMOVER_GATILHOS_SQLITE:
+        conexao.exec_driver_sql(comando)
+    return True
+
+
+def _configurar_fts(conexao, opcao, valor):
+    conexao.exec_driver_sql(f"INSERT INTO {TABELA}({TABELA}, rank) VALUES (?, ?)", (opcao, valor))
+
+
+def retomar(conexao, desde_id):
+    """Recria os gatilhos e indexa de uma vez as solicitações com id >= desde_id"""
+    criar(conexao)
+    # Menos fusões de segmentos durante a carga (padrões do FTS5: 4 e 16)
+    _configurar_fts(conexao, 'automerge', 0)
+    _configurar_fts(conexao, 'crisismerge', 64)
+    _indexar_sqlite(conexao, desde_id)
+    _configurar_fts(conexao, 'automerge', 4)
+    _configurar_fts(conexao, 'crisismerge', 16)
+
+
+@event.listens_for(Solicitacao.__table__, 'after_create')
+def _criar_com_tabela(tabela, conexao, **kw):
+    criar(conexao)
+
+
+@event.listens_for(Solicitacao.__table__, 'before_drop')
+def _remover_com_tabela(tabela, conexao, **kw):
+    remover(conexao)
+
+
+def incluir_no_autogenerate(objeto, nome, tipo, refletido, comparado_com):
+    """Filtro include_object do Alembic: o índice textual é mantido por busca.criar"""
+    if tipo == 'table' and nome and nome.startswith(TABELA):
+        return False
+    if (tipo, nome) in (('column', 'busca'), ('index', 'ix_solicitacoes_busca')):
+        return False
+    return True
+
+
+def termos(consulta):
+    """Palavras da consulta (letras e dígitos), no máximo MAXIMO_TERMOS"""
+    # Um caractere como prefixo percorreria quase todo o vocabulário
+    return [termo for termo in _RE_TERMO.findall(consulta or '') if len(termo) > 1][:MAXIMO_TERMOS]
+
+
+def cursor(relevancia, solicitacao_id):
+    """Cursor da página seguinte a partir da última linha da página"""
+    return f'{relevancia!r}_{solicitacao_id}'
+
+
+def ler_cursor(texto):
+    """(relevância, id) de um cursor; levanta ValueError se inválido"""
+    relevancia, separador, solicitacao_id = (texto or '').rpartition('_')
+    if not separador:
+        raise ValueError('Cursor inválido')
+    return float(relevancia), int(solicitacao_id)
+
+
+def buscar(consulta, por_pagina=20, apos=None):
+    """
+    Solicitações que contêm todos os termos (como prefixo), das mais relevantes
+    para as menos; empates vão das mais recentes para as mais antigas
+    `apos` é o cursor devolvido com a página anterior
+    Retorna (solicitações da página, cursor da próxima página ou None)
+    """
+    palavras = termos(consulta)
+    if not palavras:
+        return [], None
+
+    from app import replica
+    sessao = replica.sessao_leitura()
+    parametros = {'limite': por_pagina + 1, 'candidatos': _maximo_candidatos}
+    # Relevância crescente nos dois bancos (no PostgreSQL, o ts_rank_cd negado)
+    depois_do_cursor = ''
+    if apos:
+        parametros['relevancia'], parametros['ultimo_id'] = ler_cursor(apos)
+        depois_do_cursor = ('WHERE relevancia > :relevancia OR '
+                            '(relevancia = :relevancia AND id < :ultimo_id)')
+    if sessao.get_bind().dialect.name == 'postgresql':
+        parametros['consulta'] = ' & '.join(f'{palavra}:*' for palavra in palavras)
+        limite_candidatos = 'LIMIT :candidatos' if _maximo_candidatos else ''
+        sql = ("WITH consulta AS (SELECT to_tsquery('simple', :consulta) AS q), "
+               "candidatos AS (SELECT id, busca FROM solicitacoes, consulta WHERE busca @@ q "
+               f"ORDER BY id DESC {limite_candidatos}), "
+               "ranqueadas AS (SELECT id, -CAST(ts_rank_cd(busca, q) AS double precision) AS relevancia "
+               "FROM candidatos, consulta) "
+               f"SELECT id, relevancia FROM ranqueadas {depois_do_cursor} "
+               "ORDER BY relevancia, id DESC LIMIT :limite")
+    else:
+        parametros['consulta'] = ' '.join(f'"{palavra}"*' for palavra in palavras)
+        # O menor id entre os candidatos vira um limite de rowid, que o FTS5 usa
+        # para percorrer só eles ao calcular a relevância
+        limite_candidatos = (
+            f'AND rowid >= coalesce((SELECT rowid FROM {TABELA} WHERE {TABELA} MATCH :consulta '
+            f'ORDER BY rowid DESC LIMIT 1 OFFSET :candidatos - 1), 0)'
+        ) if _maximo_candidatos else ''
+        sql = (f'WITH ranqueadas AS (SELECT rowid AS id, rank AS relevancia FROM {TABELA} '
+               f'WHERE {TABELA} MATCH :consulta {limite_candidatos}) '
+               f'SELECT id, relevancia FROM ranqueadas {depois_do_cursor} '
+               f'ORDER BY relevancia, id DESC LIMIT :limite')
+    linhas = sessao.execute(db.text(sql), parametros).all()
+
+    proximo = None
+    if len(linhas) > por_pagina:
+        ultimo_id, relevancia = linhas[por_pagina - 1]
+        proximo = cursor(relevancia, ultimo_id)
+    ids = [linha[0] for linha in linhas[:por_pagina]]
+    if not ids:
+        return [], proximo
+    por_id = {s.id: s for s in sessao.query(Solicitacao).filter(Solicitacao.id.in_(ids))}
+    return [por_id[i] for i in ids if i in por_id], proximo
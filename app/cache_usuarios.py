@@ -0,0 +1,124 @@
+"""
+Cache em memória dos usuários autenticados
+
+O Flask-Login carrega o usuário em toda requisição HTTP e em todo evento
+SocketIO. Em vez de consultar o banco a cada vez, os campos de identidade
+do colaborador ficam em um cache por processo, com validade curta, e são
+invalidados sempre que a linha é alterada por um commit desta aplicação.
+
+O estado da fila (disponível, em atendimento, posição, atendimentos
+ativos) muda o tempo todo, inclusive por outros processos, e não entra no
+retrato: é lido do modelo na sessão atual. Cada invalidação avança a
+geração do colaborador, e uma leitura que começou antes dela não é
+guardada.
+"""
+import threading
+import time
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.models import db, Colaborador
+
+CAMPOS = ('id', 'nome', 'email')
+
+_ttl = 30
+_tamanho_maximo = 10000
+_itens = {}
+_geracoes = {}
+_geracao_global = 0
+_lock = threading.Lock()
+
+
+class UsuarioSessao(UserMixin):
+    """
+    Retrato leve de um Colaborador, desvinculado da sessão do banco
+    Atributos e métodos fora do retrato carregam o modelo sob demanda
+    """
+
+    def __init__(self, dados):
+        self.__dict__.update(dados)
+
+    @property
+    def colaborador(self):
+        """Instância do modelo na sessão atual (uma consulta por requisição)"""
+        if '_colaborador' not in self.__dict__:
+            self.__dict__['_colaborador'] = db.session.get(Colaborador, self.id)
+        return self.__dict__['_colaborador']
+
+    def __getattr__(self, nome):
+        if nome.startswith('__'):
+            raise AttributeError(nome)
+        return getattr(self.colaborador, nome)
+
+    def __repr__(self):
+        return f'<UsuarioSessao {self.nome}>'
+
+
+def configurar(ttl, tamanho_maximo):
+    """Define a validade (em segundos) e o número máximo de itens"""
+    global _ttl, _tamanho_maximo
+    _ttl = ttl
+    _tamanho_maximo = tamanho_maximo
+    limpar()
+
+
+def carregar(colaborador_id):
+    """Retorna o usuário do cache ou consulta o banco em caso de falha"""
+    agora = time.monotonic()
+    item = _itens.get(colaborador_id)
+    if item and item[0] > agora:
+        return UsuarioSessao(item[1])
+
+    with _lock:
+        geracao = (_geracao_global, _geracoes.get(colaborador_id, 0))
+    colaborador = db.session.get(Colaborador, colaborador_id)
+    if not colaborador:
+        return None
+
+    dados = {campo: getattr(colaborador, campo) for campo in CAMPOS}
+    with _lock:
+        # Invalidado durante a leitura: a linha lida pode ser anterior ao commit
+        if geracao == (_geracao_global, _geracoes.get(colaborador_id, 0)):
+            if len(_itens) >= _tamanho_maximo:
+                _itens.clear()
+            _itens[colaborador_id] = (agora + _ttl, dados)
+    usuario = UsuarioSessao(dados)
+    usuario.__dict__['_colaborador'] = colaborador
+    return usuario
+
+
+def invalidar(colaborador_id):
+    """Remove um colaborador do cache"""
+    with _lock:
+        _geracoes[colaborador_id] = _geracoes.get(colaborador_id, 0) + 1
+        _itens.pop(colaborador_id, None)
+
+
+def limpar():
+    """Esvazia o cache"""
+    global _geracao_global
+    with _lock:
+        _geracao_global += 1
+        _itens.clear()
+
+
+@event.listens_for(Session, 'after_flush')
+def _registrar_alterados(session, flush_context):
+    """Guarda os colaboradores alterados para invalidar após o commit"""
+    alterados = session.info.setdefault('colaboradores_alterados', set())
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Colaborador) and obj.id is not None:
+            alterados.add(obj.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidar_alterados(session):
+    """Invalida o cache dos colaboradores alterados na transação"""
+    for colaborador_id in session.info.pop('colaboradores_alterados', ()):
+        invalidar(colaborador_id)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _descartar_alterados(session, previous_transaction):
+    """Descarta as alterações pendentes de uma transação desfeita"""
+    session.info.pop('colaboradores_alterados', None)
@@ -0,0 +1,120 @@
+"""
+Ciclo de vida dos atendimentos
+
+criada -> distribuída -> notificada -> aceita -> concluída / pulada / timeout
+
+A distribuição e o encerramento já são gravados no atendimento (inicio e
+fim). O momento da notificação fica em memória até o aceite; aceito_em e
+notificado_em vão para a escrita adiada (app.escrita_adiada), que os grava
+em lote ou no UPDATE do encerramento, o que vier primeiro.
+
+Cada etapa alimenta o histograma atendimento_etapa_segundos, exposto em
+/metrics e resumido em percentis por /api/estatisticas/etapas.
+"""
+import threading
+from datetime import datetime
+from app import metricas, escrita_adiada
+
+# Espera em fila e atendimento vão de milissegundos a horas
+LIMITES_ETAPAS = (0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200)
+
+# Pendente -> distribuída, distribuída -> notificada, notificada -> aceita,
+# aceita -> concluída, distribuída -> pulada/timeout e criada -> concluída
+ETAPAS = ('espera', 'notificacao', 'aceite', 'atendimento', 'pulo', 'timeout', 'total')
+
+ETAPA_DURACAO = metricas.Histograma(
+    'atendimento_etapa_segundos',
+    'Duração de cada etapa do ciclo de vida das solicitações',
+    ('etapa',),
+    limites=LIMITES_ETAPAS
+)
+
+# Atendimentos distribuídos por este processo e ainda não encerrados:
+# (colaborador_id, solicitacao_id) -> [distribuido_em, notificado_em]
+MAXIMO_EM_ANDAMENTO = 10000
+_em_andamento = {}
+_lock = threading.Lock()
+
+
+def _segundos(inicio, fim):
+    return max((fim - inicio).total_seconds(), 0.0)
+
+
+def distribuida(colaborador_id, solicitacao_id, inicio, pendente_desde):
+    """Registra a distribuição (após o commit que criou o atendimento)"""
+    ETAPA_DURACAO.observar(_segundos(pendente_desde, inicio), 'espera')
+    with _lock:
+        if len(_em_andamento) >= MAXIMO_EM_ANDAMENTO:
+            # Distribuições nunca encerradas por este processo (ex: outro worker)
+            del _em_andamento[next(iter(_em_andamento))]
+        _em_andamento[(colaborador_id, solicitacao_id)] = [inicio, None]
+
+
+def notificada(colaborador_id, solicitacao_id):
+    """Registra o envio de 'nova_solicitacao_recebida' ao colaborador"""
+    agora = datetime.utcnow()
+    with _lock:
+        registro = _em_andamento.get((colaborador_id, solicitacao_id))
+        if registro is None or registro[1] is not None:
+            return
+        registro[1] = agora
+    ETAPA_DURACAO.observar(_segundos(registro[0], agora), 'notificacao')
+
+
+def _notificado_em(atendimento, remover=False):
+    chave = (atendimento.colaborador_id, atendimento.solicitacao_id)
+    with _lock:
+        registro = _em_andamento.pop(chave, None) if remover else _em_andamento.get(chave)
+    return registro[1] if registro else None
+
+
+def aceito(atendimento):
+    """
+    Preenche aceito_em e notificado_em e os adia para a escrita em lote
+    Retorna False se o atendimento já tinha sido aceito
+    """
+    if atendimento.aceito_em or escrita_adiada.pendente(atendimento, 'aceito_em'):
+        return False
+    atendimento.aceitar(notificado_em=_notificado_em(atendimento))
+    referencia = atendimento.notificado_em or atendimento.inicio
+    ETAPA_DURACAO.observar(_segundos(referencia, atendimento.aceito_em), 'aceite')
+    # Com o buffer cheio seguem no commit do aceite
+    escrita_adiada.adiar(atendimento, 'aceito_em', 'notificado_em')
+    return True
+
+
+def encerrado(atendimento, solicitacao):
+    """Registra o encerramento (após Atendimento.finalizar, antes do commit)"""
+    # Aceite ainda no buffer: entra no UPDATE do encerramento
+    escrita_adiada.aplicar(atendimento)
+    notificado_em = _notificado_em(atendimento, remover=True)
+    if notificado_em and not atendimento.notificado_em:
+        atendimento.notificado_em = notificado_em
+
+    if atendimento.status == 'concluido':
+        inicio = atendimento.aceito_em or atendimento.inicio
+        ETAPA_DURACAO.observar(_segundos(inicio, atendimento.fim), 'atendimento')
+        ETAPA_DURACAO.observar(_segundos(solicitacao.criado_em, atendimento.fim), 'total')
+    elif atendimento.status in ('pulado', 'timeout'):
+        etapa = 'pulo' if atendimento.status == 'pulado' else 'timeout'
+        ETAPA_DURACAO.observar(_segundos(atendimento.inicio, atendimento.fim), etapa)
+
+
+def resumo():
+    """Percentis estimados de cada etapa, desde o início do processo"""
+    etapas = {}
+    for etapa in ETAPAS:
+        total, soma = ETAPA_DURACAO.contagem(etapa)
+        etapas[etapa] = {
+            'total': total,
+            'media_segundos': round(soma / total, 3) if total else None,
+            'p50_segundos': ETAPA_DURACAO.quantil(0.5, etapa),
+            'p90_segundos': ETAPA_DURACAO.quantil(0.9, etapa),
+            'p99_segundos': ETAPA_DURACAO.quantil(0.99, etapa),
+        }
+    return etapas
+
+
+def limpar():
+    with _lock:
+        _em_andamento.clear()
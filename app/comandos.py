@@ -0,0 +1,302 @@
+"""
+Comandos CLI da aplicação (flask <comando>)
+
+Registrados por create_app; cada comando roda no contexto da aplicação.
+"""
+import click
+from app.models import db, Colaborador, ConfiguracaoSistema
+from app.fila import GerenciadorFila
+from app import socketio, scheduler, configuracoes, estrategias, monitor_sql, busca
+
+
+def registrar(app):
+    """Registra os comandos CLI em `app`"""
+    # Comando CLI para inicializar o banco de dados
+    @app.cli.command()
+    def init_db():
+        """Inicializa o banco de dados"""
+        db.create_all()
+        print('Banco de dados inicializado!')
+    
+    # Comando CLI para alterar configurações do sistema sem reiniciar
+    @app.cli.command('definir-configuracao')
+    @click.argument('chave')
+    @click.argument('valor')
+    def definir_configuracao(chave, valor):
+        """Define uma configuração (ex: timeout_minutos 15)"""
+        ConfiguracaoSistema.set_valor(chave, valor)
+        print(f'Configuração {chave}={valor} salva; os processos recarregam em até '
+              f'{app.config["CONFIGURACOES_INTERVALO_SEGUNDOS"]}s')
+    
+    # Comando CLI para definir quantos atendimentos simultâneos um colaborador recebe
+    @app.cli.command('definir-capacidade')
+    @click.argument('email')
+    @click.argument('capacidade', type=click.IntRange(1))
+    def definir_capacidade(email, capacidade):
+        """Define a capacidade de atendimentos simultâneos (ex: joao@empresa.com 3)"""
+        colaborador = Colaborador.query.filter_by(email=email).first()
+        if not colaborador:
+            print(f'Colaborador {email} não encontrado')
+            raise SystemExit(1)
+        colaborador.capacidade = capacidade
+        db.session.commit()
+        # Vagas novas podem atender pendentes imediatamente
+        distribuidas = GerenciadorFila.distribuir_pendentes() if colaborador.esta_disponivel else []
+        print(f'Capacidade de {colaborador.nome}: {capacidade} '
+              f'({len(distribuidas)} pendentes distribuídas)')
+    
+    # Comando CLI para definir o peso de um colaborador no round-robin ponderado
+    @app.cli.command('definir-peso')
+    @click.argument('email')
+    @click.argument('peso', type=click.IntRange(1))
+    def definir_peso(email, peso):
+        """Define o peso na estratégia round_robin_ponderado (ex: joao@empresa.com 2)"""
+        colaborador = Colaborador.query.filter_by(email=email).first()
+        if not colaborador:
+            print(f'Colaborador {email} não encontrado')
+            raise SystemExit(1)
+        colaborador.peso = peso
+        db.session.commit()
+        print(f'Peso de {colaborador.nome}: {peso} '
+              f'(estratégia em uso: {estrategias.atual().nome})')
+    
+    # Comando CLI para gerar massa de dados para benchmarks
+    @app.cli.command('gerar-dados')
+    @click.option('--colaboradores', default=100, show_default=True)
+    @click.option('--solicitacoes', default=10000, show_default=True,
+                  help='Solicitações concluídas, com histórico de atendimentos')
+    @click.option('--pendentes', default=0, show_default=True)
+    @click.option('--na-fila', default=0, show_default=True,
+                  help='Colaboradores que já entram disponíveis na fila')
+    @click.option('--semente', default=42, show_default=True)
+    @click.option('--taxa-pulo', default=0.1, show_default=True)
+    @click.option('--taxa-timeout', default=0.02, show_default=True)
+    @click.option('--dias', default=90, show_default=True)
+    @click.option('--lote', default=20000, show_default=True)
+    @click.option('--limpar', is_flag=True, help='Recria as tabelas antes de gerar')
+    def gerar_dados(colaboradores, solicitacoes, pendentes, na_fila, semente, taxa_pulo,
+                    taxa_timeout, dias, lote, limpar):
+        """Gera dados sintéticos determinísticos (gerados no próprio banco)"""
+        import time
+        from app import dados_sinteticos
+        if limpar:
+            db.drop_all()
+        db.create_all()
+
+        inicio = time.perf_counter()
+        contagem = dados_sinteticos.gerar(
+            colaboradores, solicitacoes, semente=semente, pendentes=pendentes,
+            na_fila=na_fila, taxa_pulo=taxa_pulo, taxa_timeout=taxa_timeout, dias=dias,
+            timeout_minutos=configuracoes.timeout_minutos(), lote=lote,
+            progresso=lambda c: print(f'  {c["solicitacoes"]} solicitações, '
+                                      f'{c["atendimentos"]} atendimentos')
+        )
+        duracao = time.perf_counter() - inicio
+        linhas = sum(contagem.values())
+        print(f'{contagem["colaboradores"]} colaboradores, {contagem["solicitacoes"]} '
+              f'solicitações e {contagem["atendimentos"]} atendimentos em {duracao:.1f}s '
+              f'({linhas / duracao:.0f} linhas/s)')
+
+    # Comando CLI para auditar os planos das consultas mais frequentes
+    @app.cli.command('verificar-planos')
+    def verificar_planos():
+        """Falha se alguma consulta frequente fizer varredura completa"""
+        from app.planos import auditar
+        uri = app.config['SQLALCHEMY_DATABASE_URI']
+        if not (uri.startswith('sqlite') and ':memory:' in uri):
+            print('Execute com um banco SQLite em memória: FLASK_ENV=testing flask verificar-planos')
+            raise SystemExit(2)
+        
+        relatorio = auditar()
+        falhas = [item for item in relatorio if item['varreduras']]
+        for item in relatorio:
+            marcador = 'FALHA' if item['varreduras'] else 'ok'
+            print(f'[{marcador}] {item["fluxo"]}: {" ".join(item["sql"].split())[:120]}')
+            for linha in item['plano']:
+                print(f'        {linha}')
+        
+        print(f'\n{len(relatorio)} consultas verificadas, {len(falhas)} com varredura completa')
+        if falhas:
+            raise SystemExit(1)
+    
+    # Comando CLI para contar as consultas das páginas e eventos principais
+    @app.cli.command('verificar-consultas')
+    @click.option('--orcamento', default=15, show_default=True,
+                  help='Máximo de consultas por página ou evento')
+    def verificar_consultas(orcamento):
+        """Falha se alguma página ou evento tiver N+1 ou exceder o orçamento"""
+        uri = app.config['SQLALCHEMY_DATABASE_URI']
+        if not (uri.startswith('sqlite') and ':memory:' in uri) or not app.config['SQL_MONITOR']:
+            print('Execute com um banco SQLite em memória: FLASK_ENV=testing flask verificar-consultas')
+            raise SystemExit(2)
+        
+        escopos = monitor_sql.auditar(app, socketio)
+        falhas = 0
+        for escopo in escopos:
+            problemas = escopo.problemas()
+            if escopo.consultas > orcamento:
+                problemas.append(f'{escopo.consultas} consultas (orçamento {orcamento})')
+            falhas += bool(problemas)
+            print(f'[{"FALHA" if problemas else "ok"}] {escopo.nome}: {escopo.resumo()}')
+            for problema in problemas:
+                print(f'        {problema}')
+        
+        print(f'\n{len(escopos)} páginas/eventos verificados, {falhas} com problemas')
+        if falhas:
+            raise SystemExit(1)
+    
+    # Comando CLI para coletar o perfil de um servidor em execução
+    @app.cli.command('perfilar')
+    @click.option('--url', default=f'http://localhost:{app.config["PORT"]}', show_default=True)
+    @click.option('--segundos', default=10.0, show_default=True)
+    @click.option('--intervalo-ms', default=app.config['PERFILADOR_INTERVALO_MS'], show_default=True)
+    @click.option('--saida', default='perfil.folded', show_default=True)
+    def perfilar(url, segundos, intervalo_ms, saida):
+        """Grava as pilhas colapsadas de /admin/perfil (requer PERFILADOR_TOKEN)"""
+        from urllib.error import HTTPError
+        from urllib.request import Request, urlopen
+        token = app.config['PERFILADOR_TOKEN']
+        if not token:
+            print('Defina PERFILADOR_TOKEN (o mesmo do servidor)')
+            raise SystemExit(2)
+
+        requisicao = Request(
+            f'{url.rstrip("/")}/admin/perfil?segundos={segundos:g}&intervalo_ms={intervalo_ms:g}',
+            headers={'Authorization': f'Bearer {token}'}
+        )
+        try:
+            with urlopen(requisicao, timeout=segundos + 30) as resposta:
+                conteudo = resposta.read()
+                amostras = resposta.headers.get('X-Perfil-Amostras')
+        except HTTPError as e:
+            print(f'Falha ao coletar o perfil: {e.code} {e.reason}')
+            raise SystemExit(1)
+        with open(saida, 'wb') as arquivo:
+            arquivo.write(conteudo)
+        print(f'{amostras} amostras gravadas em {saida} (ex: flamegraph.pl {saida} > perfil.svg)')
+
+    # Comando CLI para simular a fila com o histórico, por quadro de colaboradores e timeout
+    @app.cli.command('simular')
+    @click.option('--agentes', multiple=True, type=int, default=(5, 10, 15), show_default=True,
+                  help='Colaboradores na fila (repita a opção para comparar)')
+    @click.option('--timeouts', multiple=True, type=int,
+                  help='Timeouts candidatos em minutos (padrão: o configurado)')
+    @click.option('--dias', default=7.0, show_default=True, help='Período simulado')
+    @click.option('--capacidade', default=1, show_default=True)
+    @click.option('--estrategia', help='Estratégia de distribuição (padrão: a em uso)')
+    @click.option('--historico-dias', type=int, help='Ajusta só aos últimos N dias do histórico')
+    @click.option('--modelo', type=click.Path(exists=True, dir_okay=False),
+                  help='Usa um modelo salvo em vez de ajustar ao banco')
+    @click.option('--salvar-modelo', type=click.Path(dir_okay=False))
+    @click.option('--saida', type=click.Path(dir_okay=False), help='Resultados em JSON')
+    @click.option('--semente', default=42, show_default=True)
+    @click.option('--orm', is_flag=True,
+                  help='Executa o GerenciadorFila real em SQLite em memória (lento, para conferência)')
+    def simular(agentes, timeouts, dias, capacidade, estrategia, historico_dias, modelo,
+                salvar_modelo, saida, semente, orm):
+        """Simula a fila (eventos discretos) com chegadas e durações ajustadas ao histórico"""
+        import json
+        from contextlib import nullcontext
+        from app import simulador
+        if estrategia and estrategia not in estrategias.ESTRATEGIAS:
+            print(f'Estratégia inválida: {estrategia} (use {", ".join(estrategias.ESTRATEGIAS)})')
+            raise SystemExit(2)
+        # Os jobs alimentam o mesmo estado em memória que a simulação usa
+        if scheduler.running:
+            scheduler.pause()
+
+        if modelo:
+            with open(modelo, encoding='utf-8') as arquivo:
+                parametros = json.load(arquivo)
+        else:
+            try:
+                parametros = simulador.ajustar(historico_dias)
+            except ValueError as e:
+                print(e)
+                raise SystemExit(1)
+            if salvar_modelo:
+                with open(salvar_modelo, 'w', encoding='utf-8') as arquivo:
+                    json.dump(parametros, arquivo, indent=2, ensure_ascii=False)
+        probabilidades = parametros['probabilidades']
+        print(f'Modelo: {sum(parametros["chegadas_por_hora"]):.0f} chegadas/semana | '
+              f'atendimento médio {parametros["duracao_atendimento"]["media_segundos"]}s | '
+              f'pulo {probabilidades["pulo"]:.1%} | timeout {probabilidades["timeout"]:.1%}')
+
+        resultados = []
+        # Em memória a simulação não usa banco; o modo --orm usa um SQLite próprio
+        with simulador.app_isolada(app).app_context() if orm else nullcontext():
+            for timeout in timeouts or (parametros['timeout_minutos'],):
+                for quantidade in agentes:
+                    resultado = simulador.Simulacao(
+                        parametros, quantidade, timeout, dias, capacidade=capacidade,
+                        estrategia=estrategia, semente=semente
+                    ).executar(orm=orm)
+                    resultados.append(resultado)
+                    espera = [resultado[f'espera_p{p}_segundos'] for p in (50, 90, 99)]
+                    print(f'{quantidade:>4} agentes | timeout {timeout:>3} min | espera p50/p90/p99 '
+                          f'{"/".join("-" if s is None else f"{s:.0f}" for s in espera)}s | '
+                          f'pulo {resultado["taxa_pulo"]:.1%} | timeout {resultado["taxa_timeout"]:.1%} | '
+                          f'utilização {resultado["utilizacao"]:.0%} | '
+                          f'sem atendimento {resultado["sem_atendimento"]} | '
+                          f'{resultado["segundos_execucao"]}s')
+        if saida:
+            with open(saida, 'w', encoding='utf-8') as arquivo:
+                json.dump({'modelo': parametros, 'resultados': resultados}, arquivo,
+                          indent=2, ensure_ascii=False)
+            print(f'resultados gravados em {saida}')
+
+    # Comando CLI para capturar o tráfego de um período para reprodução
+    @app.cli.command('capturar-trafego')
+    @click.option('--desde', type=click.DateTime(), help='Início (UTC; padrão: 24 h antes do fim)')
+    @click.option('--ate', type=click.DateTime(), help='Fim (UTC; padrão: agora)')
+    @click.option('--intervalo-sessao', default=1800, show_default=True,
+                  help='Segundos sem atendimento que encerram a sessão de um colaborador')
+    @click.option('--saida', default='trafego.jsonl.gz', show_default=True)
+    def capturar_trafego(desde, ate, intervalo_sessao, saida):
+        """Grava solicitações e ações dos colaboradores para benchmarks/replay_trafego.py"""
+        from datetime import datetime, timedelta
+        from app import trafego
+        ate = ate or datetime.utcnow()
+        desde = desde or ate - timedelta(days=1)
+        if desde >= ate:
+            print('--desde precisa ser anterior a --ate')
+            raise SystemExit(2)
+
+        contagem = trafego.capturar(saida, desde, ate, intervalo_sessao)
+        print(f'{contagem["solicitacoes"]} solicitações, {contagem["atendimentos"]} atendimentos e '
+              f'{contagem["colaboradores"]} colaboradores de {desde:%Y-%m-%d %H:%M} a '
+              f'{ate:%Y-%m-%d %H:%M} gravados em {saida}')
+
+    # Comando CLI para (re)construir o índice da busca textual
+    @app.cli.command('reindexar-busca')
+    def reindexar_busca():
+        """Cria, se preciso, e reconstrói o índice textual das solicitações"""
+        import time
+        inicio = time.perf_counter()
+        with db.engine.begin() as conexao:
+            busca.criar(conexao)
+            total = busca.reindexar(conexao)
+        print(f'{total} solicitações indexadas em {time.perf_counter() - inicio:.1f}s')
+
+    # Comando CLI para criar usuário admin
+    @app.cli.command()
+    def create_admin():
+        """Cria um usuário administrador"""
+        admin = Colaborador.query.filter_by(email='admin@empresa.com').first()
+        if admin:
+            print('Usuário admin já existe!')
+            return
+        
+        admin = Colaborador(
+            nome='Administrador',
+            email='admin@empresa.com'
+        )
+        admin.set_senha('admin123')
+        
+        db.session.add(admin)
+        db.session.commit()
+        
+        print('Usuário admin criado com sucesso!')
+        print('Email: admin@empresa.com')
+        print('Senha: admin123')
+        print('IMPORTANTE: Altere a senha em produção!')
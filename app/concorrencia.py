@@ -0,0 +1,131 @@
+"""
+Suporte aos modos cooperativos (eventlet/gevent) do servidor SocketIO
+
+Nos modos cooperativos todas as conexões compartilham poucas threads do
+sistema operacional. Como os drivers de banco de dados bloqueiam a thread
+inteira, as chamadas ao banco são executadas em um pool limitado de
+threads nativas, liberando o loop de eventos enquanto aguardam.
+"""
+import sqlite3
+import time
+from sqlalchemy import event
+
+MODOS_COOPERATIVOS = ('eventlet', 'gevent')
+
+# Espera por locks do SQLite: curta dentro da thread nativa, o restante
+# acontece no loop cooperativo para não esgotar o pool de threads
+TIMEOUT_LOCK_THREAD = 0.01
+
+_modo = 'threading'
+_timeout_lock = 5.0
+
+
+def modo_cooperativo(modo=None):
+    """Indica se o modo informado (ou o configurado) é cooperativo"""
+    return (modo or _modo) in MODOS_COOPERATIVOS
+
+
+def configurar(modo, tamanho_pool_threads, database_uri='', timeout_lock=5.0):
+    """Configura o pool de threads nativas usado para acesso ao banco"""
+    global _modo, _timeout_lock
+    _modo = modo
+    _timeout_lock = timeout_lock
+
+    if modo == 'eventlet':
+        from eventlet import tpool
+        tpool.set_num_threads(tamanho_pool_threads)
+    elif modo == 'gevent':
+        import gevent
+        gevent.get_hub().threadpool.maxsize = tamanho_pool_threads
+
+    # Com PostgreSQL o psycopg2 pode cooperar diretamente com o loop
+    if modo_cooperativo(modo) and database_uri.startswith('postgresql'):
+        try:
+            if modo == 'eventlet':
+                from psycogreen.eventlet import patch_psycopg
+            else:
+                from psycogreen.gevent import patch_psycopg
+            patch_psycopg()
+        except ImportError:
+            pass
+
+
+def executar_bloqueante(func, *args):
+    """
+    Executa uma função bloqueante sem travar o loop de eventos
+    No modo threading a função é chamada diretamente
+    """
+    if _modo == 'eventlet':
+        from eventlet import tpool
+        return tpool.execute(func, *args)
+    if _modo == 'gevent':
+        import gevent
+        return gevent.get_hub().threadpool.apply(func, args)
+    return func(*args)
+
+
+def _executar_aguardando_lock(func, *args):
+    """Executa no pool de threads, repetindo enquanto o SQLite estiver bloqueado"""
+    limite = time.monotonic() + _timeout_lock
+    espera = 0.001
+    while True:
+        try:
+            return executar_bloqueante(func, *args)
+        except sqlite3.OperationalError as erro:
+            if 'locked' not in str(erro) or time.monotonic() >= limite:
+                raise
+        # time.sleep é cooperativo após o monkey patching
+        time.sleep(espera)
+        espera = min(espera * 2, 0.05)
+
+
+class _ConexaoCooperativa:
+    """
+    Envolve a conexão DB-API para que commit e rollback também saiam do loop
+    (um commit bloqueado aguardando lock travaria todas as conexões)
+    """
+
+    def __init__(self, conexao):
+        object.__setattr__(self, '_conexao', conexao)
+
+    def commit(self):
+        _executar_aguardando_lock(self._conexao.commit)
+
+    def rollback(self):
+        _executar_aguardando_lock(self._conexao.rollback)
+
+    def __getattr__(self, nome):
+        return getattr(self._conexao, nome)
+
+    def __setattr__(self, nome, valor):
+        setattr(self._conexao, nome, valor)
+
+
+def registrar_execucao_em_threads(engine):
+    """
+    Desvia a execução de comandos SQL do engine para o pool de threads
+    Não tem efeito quando o driver já coopera com o loop (psycogreen)
+    """
+    if not modo_cooperativo() or engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'do_connect')
+    def _do_connect(dialect, conn_rec, cargs, cparams):
+        cparams['check_same_thread'] = False
+        cparams['timeout'] = TIMEOUT_LOCK_THREAD
+        return _ConexaoCooperativa(dialect.loaded_dbapi.connect(*cargs, **cparams))
+
+    @event.listens_for(engine, 'do_execute')
+    def _do_execute(cursor, statement, parameters, context):
+        _executar_aguardando_lock(cursor.execute, statement, parameters)
+        return True
+
+    @event.listens_for(engine, 'do_executemany')
+    def _do_executemany(cursor, statement, parameters, context):
+        _executar_aguardando_lock(cursor.executemany, statement, parameters)
+        return True
+
+    @event.listens_for(engine, 'do_execute_no_params')
+    def _do_execute_no_params(cursor, statement, context):
+        _executar_aguardando_lock(cursor.execute, statement)
+        return True
@@ -0,0 +1,135 @@
+"""
+Cache em memória das configurações do sistema
+
+Os valores de `configuracoes_sistema` ficam em um dicionário por processo,
+lido sem acesso ao banco. Cada alteração incrementa uma linha de versão na
+mesma tabela; um job periódico compara essa versão e recarrega o cache
+quando outro processo alterou alguma configuração.
+"""
+import threading
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.models import db, ConfiguracaoSistema
+
+# Chaves iniciadas por '__' são de controle interno e não entram no cache
+CHAVE_VERSAO = '__versao__'
+TIMEOUT_MINUTOS = 'timeout_minutos'
+
+_valores = {}
+_versao = None
+_carregado = False
+_inicializado = False
+_ouvintes = []
+_lock = threading.Lock()
+
+
+def ao_alterar(func):
+    """Registra uma função chamada com {chave: valor} das configurações alteradas"""
+    _ouvintes.append(func)
+    return func
+
+
+def carregar():
+    """Carrega todas as configurações do banco e notifica as alterações"""
+    global _valores, _versao, _carregado, _inicializado
+    try:
+        linhas = db.session.query(ConfiguracaoSistema.chave, ConfiguracaoSistema.valor).all()
+    except SQLAlchemyError:
+        # Tabela ainda não criada: mantém os padrões e tenta de novo depois
+        db.session.rollback()
+        _carregado = True
+        return {}
+
+    novos = {chave: valor for chave, valor in linhas if not chave.startswith('__')}
+    with _lock:
+        antigos = _valores
+        notificar = _inicializado
+        _versao = dict(linhas).get(CHAVE_VERSAO)
+        _valores = novos
+        _carregado = _inicializado = True
+
+    alterados = {chave: valor for chave, valor in novos.items() if antigos.get(chave) != valor}
+    alterados.update({chave: None for chave in antigos if chave not in novos})
+    if alterados and notificar:
+        for ouvinte in _ouvintes:
+            ouvinte(alterados)
+    return alterados
+
+
+def sincronizar():
+    """
+    Recarrega o cache se a versão no banco mudou (alteração em outro processo)
+    Retorna as configurações alteradas
+    """
+    try:
+        versao = db.session.query(ConfiguracaoSistema.valor).filter_by(chave=CHAVE_VERSAO).scalar()
+    except SQLAlchemyError:
+        db.session.rollback()
+        return {}
+    if _carregado and versao == _versao:
+        return {}
+    return carregar()
+
+
+def obter(chave, padrao=None):
+    """Retorna o valor de uma configuração sem acessar o banco"""
+    if not _carregado:
+        carregar()
+    return _valores.get(chave, padrao)
+
+
+def definir(chave, valor, descricao=None):
+    """
+    Altera uma configuração e incrementa a versão na transação atual
+    O cache local é atualizado após o commit
+    """
+    config = ConfiguracaoSistema.query.filter_by(chave=chave).first()
+    if config:
+        config.valor = valor
+        if descricao:
+            config.descricao = descricao
+    else:
+        config = ConfiguracaoSistema(chave=chave, valor=valor, descricao=descricao)
+        db.session.add(config)
+
+    versao = ConfiguracaoSistema.query.filter_by(chave=CHAVE_VERSAO).first()
+    if versao:
+        versao.valor = str(int(versao.valor or 0) + 1)
+    else:
+        db.session.add(ConfiguracaoSistema(chave=CHAVE_VERSAO, valor='1',
+                                           descricao='Versão das configurações'))
+    db.session.info['configuracoes_alteradas'] = True
+
+
+def timeout_minutos():
+    """Timeout de atendimento em minutos (configuração do sistema ou Config)"""
+    valor = obter(TIMEOUT_MINUTOS)
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return current_app.config.get('TIMEOUT_MINUTOS', 20)
+
+
+def limpar():
+    """Descarta o cache (o próximo acesso recarrega do banco)"""
+    global _valores, _versao, _carregado, _inicializado
+    with _lock:
+        _valores = {}
+        _versao = None
+        _carregado = _inicializado = False
+
+
+@event.listens_for(Session, 'after_commit')
+def _recarregar_apos_commit(session):
+    """Marca o cache local para recarga após o commit de uma alteração"""
+    global _carregado
+    if session.info.pop('configuracoes_alteradas', False):
+        # O recarregamento acontece no próximo acesso, fora do commit
+        _carregado = False
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _descartar_alteracao(session, previous_transaction):
+    session.info.pop('configuracoes_alteradas', None)
@@ -0,0 +1,413 @@
+"""
+Gerador de dados sintéticos para benchmarks
+
+Cria colaboradores, solicitações e históricos de atendimento sem passar
+pelo ORM. Solicitações e atendimentos são gerados pelo próprio banco, em
+INSERT ... SELECT sobre uma sequência de números: cada sorteio é um hash
+da semente, do número da linha e do fluxo, calculado em SQL, e as linhas
+nunca passam pelo Python. Os dados dependem apenas da semente (nem do
+tamanho do lote): a mesma semente gera sempre as mesmas linhas, inclusive
+as datas, que são calculadas a partir de uma data de referência fixa.
+Assim execuções de benchmark diferentes são comparáveis.
+
+Cada solicitação concluída tem zero ou mais tentativas puladas ou expiradas
+(taxas taxa_pulo e taxa_timeout) seguidas do atendimento concluído, com
+duração em distribuição log-normal.
+
+Uso: flask gerar-dados --colaboradores 100 --solicitacoes 1000000 --semente 42
+"""
+import calendar
+import math
+import random
+from datetime import datetime, timedelta
+from sqlalchemy.exc import OperationalError
+from app.models import db, Colaborador, Solicitacao, Atendimento
+from app import senhas, busca
+
+REFERENCIA = datetime(2025, 1, 1)
+# Base usada pelo SQLAlchemy para guardar Interval como data no SQLite
+EPOCA = datetime.utcfromtimestamp(0)
+SENHA_PADRAO = 'senha123'
+
+# Duração dos atendimentos concluídos: mediana de ~8 minutos
+DURACAO_MEDIANA_SEGUNDOS = 480
+DURACAO_DISPERSAO = 0.6
+
+# Um colaborador leva de 5 a 90 segundos para pular uma solicitação
+PULO_SEGUNDOS = (5, 90)
+
+# Limite de tentativas frustradas por solicitação
+MAXIMO_TENTATIVAS = 5
+
+DESCRICOES = [
+    'Problema de acesso ao sistema',
+    'Dúvida sobre fatura',
+    'Solicitação de segunda via',
+    'Alteração de cadastro',
+    'Cancelamento de serviço',
+    'Reclamação sobre atendimento anterior',
+    'Suporte técnico - equipamento',
+    'Informações sobre produtos',
+]
+NOMES = ['Ana', 'Bruno', 'Carla', 'Diego', 'Elisa', 'Fábio', 'Gabriela', 'Heitor',
+         'Isabela', 'João', 'Karina', 'Lucas', 'Mariana', 'Nelson', 'Olívia', 'Pedro']
+SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Costa', 'Pereira', 'Lima',
+              'Almeida', 'Ferreira', 'Gomes', 'Ribeiro', 'Martins']
+
+
+def _proximo_id(modelo):
+    """Primeiro id livre da tabela (os ids são atribuídos aqui, sem RETURNING)"""
+    return (db.session.query(db.func.max(modelo.id)).scalar() or 0) + 1
+
+
+def _conversor_sqlite(tipo):
+    """Converte o valor Python para o formato gravado pelo SQLAlchemy no SQLite"""
+    if isinstance(tipo, db.Interval):
+        return lambda valor: valor if valor is None else (EPOCA + valor).isoformat(' ', 'microseconds')
+    if isinstance(tipo, db.DateTime):
+        return lambda valor: valor if valor is None else valor.isoformat(' ', 'microseconds')
+    return None
+
+
+def _inserir(tabela, linhas):
+    """Insere as linhas (dicionários com as mesmas chaves) em um único executemany"""
+    if not linhas:
+        return
+    conexao = db.session.connection()
+    if conexao.dialect.name != 'sqlite':
+        conexao.execute(tabela.insert(), linhas)
+        return
+
+    colunas = list(linhas[0])
+    conversores = [_conversor_sqlite(tabela.c[coluna].type) for coluna in colunas]
+    sql = (f'INSERT INTO {tabela.name} ({", ".join(colunas)}) '
+           f'VALUES ({", ".join("?" * len(colunas))})')
+    conexao.exec_driver_sql(sql, [
+        tuple(valor if conversor is None else conversor(valor)
+              for conversor, valor in zip(conversores, linha.values()))
+        for linha in linhas
+    ])
+
+
+def gerar_colaboradores(rng, total, na_fila=0, senha_hash=None):
+    """
+    Insere `total` colaboradores; os `na_fila` primeiros entram disponíveis na fila
+    Retorna a lista de ids criados
+    """
+    senha_hash = senha_hash or senhas.gerar_hash(SENHA_PADRAO)
+    primeiro_id = _proximo_id(Colaborador)
+    posicao = (db.session.query(db.func.max(Colaborador.posicao_fila)).scalar() or 0) + 1
+
+    linhas = []
+    for i in range(total):
+        colaborador_id = primeiro_id + i
+        disponivel = i < na_fila
+        criado_em = REFERENCIA - timedelta(days=rng.randint(60, 720))
+        linhas.append({
+            'id': colaborador_id,
+            'nome': f'{rng.choice(NOMES)} {rng.choice(SOBRENOMES)}',
+            'email': f'colab{colaborador_id}@sintetico.local',
+            'senha_hash': senha_hash,
+            'esta_disponivel': disponivel,
+            'esta_em_atendimento': False,
+            'posicao_fila': posicao + i if disponivel else None,
+            'liberado_em': criado_em if disponivel else None,
+            'criado_em': criado_em,
+            'atualizado_em': criado_em,
+        })
+    _inserir(Colaborador.__table__, linhas)
+    return [linha['id'] for linha in linhas]
+
+
+# Gerador pseudoaleatório em SQL: hash de 32 bits (xorshift-multiply) de
+# (semente, chave, fluxo). As multiplicações cabem em um inteiro de 64 bits
+# com sinal, que o SQLite converteria para REAL e o PostgreSQL recusaria
+_MASCARA = 0xFFFFFFFF
+_MULTIPLICADORES = (0x21F0AAAD, 0x735A2D97)
+_DOURADO = 0x9E3779B1
+_FLUXO = 0x85EBCA6B
+
+# Um hash por fluxo; quando bastam menos bits, um hash serve a vários sorteios
+FLUXOS = {
+    # Por solicitação (chave: i)
+    'chegada_falhas': 1,
+    'cadastro': 2,      # descrição, nome e sobrenome
+    'telefone': 3,
+    # Por tentativa (chave: i * (MAXIMO_TENTATIVAS + 1) + t)
+    'tipo_colaborador': 4,
+    'duracao': 5,
+    'duracao_pausa': 6,  # Box-Muller e a espera antes da tentativa
+}
+
+
+def _xor_deslocado(coluna, bits):
+    # x ^ (x >> n) sem o operador XOR, que o SQLite não tem
+    return f'(({coluna} | ({coluna} >> {bits})) - ({coluna} & ({coluna} >> {bits})))'
+
+
+def _texto(valor):
+    return "'" + valor.replace("'", "''") + "'"
+
+
+def _escolha(sorteio, opcoes):
+    casos = ' '.join(f'WHEN {i} THEN {_texto(opcao)}' for i, opcao in enumerate(opcoes))
+    return f'(CASE {sorteio} % {len(opcoes)} {casos} END)'
+
+
+def _metade(coluna, alta):
+    """Uniforme em [0, 1) com 16 bits do hash"""
+    return f'(({coluna} >> 16) / 65536.0)' if alta else f'(({coluna} & 65535) / 65536.0)'
+
+
+class _Consulta:
+    """
+    Consulta montada em camadas (CTEs), cada uma lendo a anterior; camadas
+    aninhadas estourariam a pilha do parser do SQLite
+    """
+
+    def __init__(self, dialeto, semente):
+        self.sqlite = dialeto == 'sqlite'
+        self.semente = semente
+        # Impede que o banco copie as expressões de uma camada para dentro da
+        # seguinte, o que recalcularia o hash uma vez por referência
+        self.barreira = 'LIMIT -1 OFFSET 0' if self.sqlite else 'OFFSET 0'
+        self.camadas = []
+
+    def camada(self, corpo, barreira=True):
+        """Acrescenta uma camada e retorna o nome dela"""
+        nome = f'c{len(self.camadas)}'
+        self.camadas.append(f'{nome} AS ({corpo}{" " + self.barreira if barreira else ""})')
+        return nome
+
+    def sql(self, final):
+        return f'WITH RECURSIVE {", ".join(self.camadas)} {final}'
+
+    def sequencia(self, inicio, fim):
+        """Camada com os números de inicio a fim - 1, na coluna i"""
+        nome = f'c{len(self.camadas)}'
+        if self.sqlite:
+            self.camadas.append(f'{nome}(i) AS (SELECT {inicio} UNION ALL '
+                                f'SELECT i + 1 FROM {nome} WHERE i < {fim - 1})')
+        else:
+            self.camadas.append(f'{nome} AS (SELECT i FROM generate_series({inicio}, {fim - 1}) AS i)')
+        return nome
+
+    def momento(self, segundos):
+        """Data a partir de segundos desde 1970, no formato gravado pelo SQLAlchemy"""
+        if self.sqlite:
+            # strftime('%f') é lento e só tem milissegundos
+            return (f"(datetime(CAST({segundos} AS INTEGER), 'unixepoch') || "
+                    f"printf('.%06d', ({segundos} - CAST({segundos} AS INTEGER)) * 1000000))")
+        return f"(to_timestamp({segundos}) AT TIME ZONE 'UTC')"
+
+    def intervalo(self, segundos):
+        # No SQLite o Interval é gravado como a data EPOCA + intervalo
+        return self.momento(segundos) if self.sqlite else f'make_interval(secs => {segundos})'
+
+    def sorteios(self, origem, colunas, chave, fluxos):
+        """
+        Camada com as `colunas` de `origem` e, por fluxo, um inteiro de 32 bits
+        (h_<fluxo>) e um uniforme em [0, 1) (u_<fluxo>), função só da semente,
+        de `chave` (expressão sobre as colunas) e do fluxo
+        """
+        base = (self.semente * _DOURADO) & _MASCARA
+        hashes = [f'h_{fluxo}' for fluxo in fluxos]
+        mantidas = ', '.join(colunas)
+
+        camada = ', '.join(
+            f'(({base} + {chave} * {_DOURADO} + {FLUXOS[fluxo] * _FLUXO}) & {_MASCARA}) AS {h}'
+            for fluxo, h in zip(fluxos, hashes)
+        )
+        nome = self.camada(f'SELECT {mantidas}, {camada} FROM {origem}')
+        for bits, multiplicador in zip((16, 15), _MULTIPLICADORES):
+            camada = ', '.join(
+                f'(({_xor_deslocado(h, bits)} * {multiplicador}) & {_MASCARA}) AS {h}' for h in hashes
+            )
+            nome = self.camada(f'SELECT {mantidas}, {camada} FROM {nome}')
+        camada = ', '.join(f'{_xor_deslocado(h, 15)} AS {h}' for h in hashes)
+        nome = self.camada(f'SELECT {mantidas}, {camada} FROM {nome}')
+        uniformes = ', '.join(f'{h}, {h} / 4294967296.0 AS u_{fluxo}' for h, fluxo in zip(hashes, fluxos))
+        return self.camada(f'SELECT {mantidas}, {uniformes} FROM {nome}', barreira=False)
+
+    def chegadas(self, origem, colunas, inicio_periodo, intervalo, taxa_falha):
+        """
+        Camada com as `colunas` de `origem` (que tem i) e, da solicitação i, a
+        chegada e o número de tentativas frustradas (geométrica, limitada a
+        MAXIMO_TENTATIVAS)
+        """
+        sorteios = self.sorteios(origem, colunas, 'i', ('chegada_falhas',))
+        u_falhas = _metade('h_chegada_falhas', alta=False)
+        falhas = ' + '.join(
+            f'(CASE WHEN {u_falhas} < {taxa_falha ** n!r} THEN 1 ELSE 0 END)'
+            for n in range(1, MAXIMO_TENTATIVAS + 1)
+        ) if taxa_falha else '0'
+        return self.camada(
+            f'SELECT {", ".join(colunas)}, {inicio_periodo} + '
+            f"(i + {_metade('h_chegada_falhas', alta=True)}) * {intervalo!r} AS chegada, "
+            f'{falhas} AS falhas FROM {sorteios}'
+        )
+
+    def cadastro(self, origem, colunas):
+        """Camada com as `colunas` de `origem` e a descrição, o nome e o telefone da solicitação i"""
+        sorteios = self.sorteios(origem, colunas, 'i', ('cadastro', 'telefone'))
+        return self.camada(
+            f'SELECT {", ".join(colunas)}, '
+            f'{_escolha("h_cadastro", DESCRICOES)} AS descricao, '
+            f"{_escolha(f'(h_cadastro >> 8)', NOMES)} || ' ' || "
+            f"{_escolha(f'(h_cadastro >> 16)', SOBRENOMES)} AS cliente_nome, "
+            f"'(11) 9' || CAST(1000 + h_telefone % 9000 AS TEXT) || '-' || "
+            f'CAST(1000 + (h_telefone >> 16) % 9000 AS TEXT) AS cliente_telefone '
+            f'FROM {sorteios}',
+            barreira=False
+        )
+
+    def tentativas(self, chegadas, ids_colaboradores, taxa_pulo, taxa_falha, timeout_segundos):
+        """
+        Camada com as tentativas de atendimento das solicitações de `chegadas`:
+        `falhas` puladas ou expiradas e a conclusão, cada uma após a anterior
+        """
+        numeros = ' UNION ALL '.join(f'SELECT {n} AS t' for n in range(MAXIMO_TENTATIVAS + 1))
+        colunas = ['i', 't', 'falhas', 'chegada']
+        origem = self.camada(
+            f'SELECT s.i, numeros.t, s.falhas, s.chegada '
+            f'FROM {chegadas} AS s JOIN ({numeros}) AS numeros ON numeros.t <= s.falhas',
+            barreira=False
+        )
+        sorteios = self.sorteios(origem, colunas, f'i * {MAXIMO_TENTATIVAS + 1} + t',
+                                 ('tipo_colaborador', 'duracao', 'duracao_pausa'))
+        pulado = f'u_tipo_colaborador < {taxa_pulo / taxa_falha if taxa_falha else 0!r}'
+        u_pausa = _metade('h_duracao_pausa', alta=False)
+        minimo, maximo = PULO_SEGUNDOS
+        tentativas = self.camada(
+            f'SELECT {", ".join(colunas)}, '
+            f"CASE WHEN t < falhas AND {pulado} THEN 'pulado' "
+            f"WHEN t < falhas THEN 'timeout' ELSE 'concluido' END AS status, "
+            f'CASE WHEN t < falhas AND {pulado} THEN {minimo} + {maximo - minimo} * u_duracao '
+            f'WHEN t < falhas THEN {timeout_segundos} + 60 * u_duracao '
+            # Log-normal pela transformação de Box-Muller
+            f'ELSE exp({math.log(DURACAO_MEDIANA_SEGUNDOS)!r} + {DURACAO_DISPERSAO!r} * '
+            f"sqrt(-2 * ln(1 - u_duracao)) * cos({2 * math.pi!r} * {_metade('h_duracao_pausa', alta=True)})) "
+            f'END AS duracao, '
+            f'{ids_colaboradores[0]} + (h_tipo_colaborador & 65535) % {len(ids_colaboradores)} AS colaborador_id, '
+            # Antes da primeira tentativa, ~30 s de fila; entre tentativas, de 1 a 10 s
+            f'CASE WHEN t = 0 THEN -30 * ln(1 - {u_pausa}) ELSE 1 + 9 * {u_pausa} END AS pausa '
+            f'FROM {sorteios}'
+        )
+        return self.camada(
+            f'SELECT i, t, falhas, chegada, colaborador_id, status, '
+            f'chegada + SUM(pausa + duracao) OVER (PARTITION BY i ORDER BY t) - duracao AS inicio, duracao '
+            f'FROM {tentativas}',
+            barreira=False
+        )
+
+
+def _garantir_funcoes_matematicas(conexao):
+    """SQLite compilado sem ln/exp/sqrt/cos: registra as do Python na conexão"""
+    try:
+        conexao.exec_driver_sql('SELECT ln(1), exp(0), sqrt(1), cos(0)')
+    except OperationalError:
+        bruta = conexao.connection.driver_connection
+        for nome, funcao in (('ln', math.log), ('exp', math.exp), ('sqrt', math.sqrt), ('cos', math.cos)):
+            bruta.create_function(nome, 1, funcao, deterministic=True)
+
+
+def gerar(colaboradores, solicitacoes, semente=42, pendentes=0, na_fila=0,
+          taxa_pulo=0.1, taxa_timeout=0.02, dias=90, timeout_minutos=20,
+          lote=100000, progresso=None):
+    """
+    Gera o conjunto de dados e faz commit a cada lote de solicitações
+
+    As `solicitacoes` concluídas recebem histórico de atendimentos; as
+    `pendentes` são as mais recentes e ficam sem atendimento.
+    Retorna a quantidade de linhas inseridas por tabela.
+    """
+    if colaboradores < 1 and solicitacoes:
+        raise ValueError('É preciso ao menos um colaborador para gerar atendimentos')
+    if taxa_pulo + taxa_timeout >= 1:
+        raise ValueError('taxa_pulo + taxa_timeout deve ser menor que 1')
+
+    rng = random.Random(semente)
+    ids_colaboradores = gerar_colaboradores(rng, colaboradores, na_fila)
+    db.session.commit()
+
+    conexao = db.session.connection()
+    dialeto = conexao.dialect.name
+    if dialeto == 'sqlite':
+        _garantir_funcoes_matematicas(conexao)
+
+    total = solicitacoes + pendentes
+    primeiro_id = _proximo_id(Solicitacao)
+    inicio_periodo = calendar.timegm((REFERENCIA - timedelta(days=dias)).timetuple())
+    intervalo = (dias * 86400) / max(total, 1)
+    taxa_falha = taxa_pulo + taxa_timeout
+    contagem = {'colaboradores': len(ids_colaboradores), 'solicitacoes': 0, 'atendimentos': 0}
+
+    # Índice textual: os gatilhos saem durante a carga e as linhas novas
+    # são indexadas de uma vez no fim (inclusive se a carga falhar no meio)
+    indice = busca.suspender(db.session.connection())
+    try:
+        for inicio_lote in range(0, total, lote):
+            fim_lote = min(inicio_lote + lote, total)
+            conexao = db.session.connection()
+
+            # Concluídas: tentativas em uma tabela temporária, de onde saem as duas tabelas
+            if inicio_lote < solicitacoes:
+                consulta = _Consulta(dialeto, semente)
+                chegadas = consulta.chegadas(consulta.sequencia(inicio_lote, min(fim_lote, solicitacoes)),
+                                             ['i'], inicio_periodo, intervalo, taxa_falha)
+                tentativas = consulta.tentativas(chegadas, ids_colaboradores, taxa_pulo, taxa_falha,
+                                                 timeout_minutos * 60)
+                conexao.exec_driver_sql('DROP TABLE IF EXISTS tentativas_sinteticas')
+                conexao.exec_driver_sql('CREATE TEMPORARY TABLE tentativas_sinteticas AS ' +
+                                        consulta.sql(f'SELECT * FROM {tentativas}'))
+
+                # Os campos da solicitação são sorteados de novo a partir de i, sem junção
+                consulta = _Consulta(dialeto, semente)
+                concluidas = consulta.camada(
+                    'SELECT i, chegada, inicio + duracao AS fim FROM tentativas_sinteticas WHERE t = falhas',
+                    barreira=False
+                )
+                concluidas = consulta.cadastro(concluidas, ['i', 'chegada', 'fim'])
+                conexao.exec_driver_sql(
+                    'INSERT INTO solicitacoes (id, descricao, cliente_nome, cliente_telefone, status, '
+                    'criado_em, atualizado_em) ' + consulta.sql(
+                        f"SELECT {primeiro_id} + i, descricao, cliente_nome, cliente_telefone, 'concluido', "
+                        f"{consulta.momento('chegada')}, {consulta.momento('fim')} FROM {concluidas} ORDER BY i"
+                    )
+                )
+                contagem['atendimentos'] += conexao.exec_driver_sql(
+                    'INSERT INTO atendimentos (solicitacao_id, colaborador_id, status, inicio, fim, '
+                    f'duracao, foi_pulado, foi_timeout) SELECT {primeiro_id} + i, colaborador_id, status, '
+                    f"{consulta.momento('inicio')}, {consulta.momento('inicio + duracao')}, "
+                    f"{consulta.intervalo('duracao')}, status = 'pulado', status = 'timeout' "
+                    f'FROM tentativas_sinteticas ORDER BY i, t'
+                ).rowcount
+                conexao.exec_driver_sql('DROP TABLE tentativas_sinteticas')
+
+            # Pendentes: as mais recentes, sem atendimento
+            if fim_lote > solicitacoes:
+                consulta = _Consulta(dialeto, semente)
+                recentes = consulta.cadastro(
+                    consulta.chegadas(consulta.sequencia(max(inicio_lote, solicitacoes), fim_lote),
+                                      ['i'], inicio_periodo, intervalo, taxa_falha),
+                    ['i', 'chegada']
+                )
+                conexao.exec_driver_sql(
+                    'INSERT INTO solicitacoes (id, descricao, cliente_nome, cliente_telefone, status, '
+                    'criado_em, atualizado_em) ' + consulta.sql(
+                        f"SELECT {primeiro_id} + i, descricao, cliente_nome, cliente_telefone, 'pendente', "
+                        f"{consulta.momento('chegada')}, {consulta.momento('chegada')} FROM {recentes} ORDER BY i"
+                    )
+                )
+
+            db.session.commit()
+            contagem['solicitacoes'] += fim_lote - inicio_lote
+            if progresso:
+                progresso(contagem)
+    finally:
+        if indice:
+            db.session.rollback()
+            busca.retomar(db.session.connection(), primeiro_id)
+            db.session.commit()
+
+    return contagem
@@ -0,0 +1,174 @@
+"""
+Escrita adiada (write-behind) de colunas que não decidem a fila
+
+Horários do ciclo de vida (aceito_em, notificado_em) e observações não são
+lidos pela distribuição; gravá-los na transação do aceite ou do
+encerramento só alonga o caminho crítico. `adiar` tira essas colunas da
+transação atual (o objeto continua com o valor em memória) e as guarda em
+um buffer por linha; um job grava o buffer em lote, um UPDATE por chave
+primária em executemany e um único commit.
+
+Os valores adiados só entram no buffer quando a transação que os adiou é
+confirmada; com rollback são descartados, como o resto da transação.
+
+O buffer é limitado: cheio, `adiar` recusa e a alteração segue na
+transação do chamador. Quando a linha volta a ser gravada pelo caminho
+crítico (ex: o encerramento de um atendimento aceito), `aplicar` devolve
+os valores pendentes ao objeto e eles entram no mesmo UPDATE (com
+rollback, voltam ao buffer). O buffer é gravado também ao encerrar o
+processo; uma queda perde no máximo um intervalo dessas colunas.
+"""
+import atexit
+import threading
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from app import metricas
+
+_pendentes = {}        # (modelo, id) -> {coluna: valor}
+_maximo = 10000
+_app = None
+_lock = threading.Lock()
+
+GRAVADAS = metricas.Contador(
+    'atendimento_escrita_adiada_linhas_total',
+    'Linhas gravadas pela escrita adiada, por resultado',
+    ('resultado',)
+)
+
+
+@metricas.indicador('atendimento_escrita_adiada_pendentes', 'Linhas aguardando a escrita adiada')
+def tamanho():
+    with _lock:
+        return len(_pendentes)
+
+
+def configurar(app, maximo):
+    """Define o limite do buffer (0 desativa) e grava o que restar ao encerrar o processo"""
+    global _app, _maximo
+    if _app is None:
+        atexit.register(encerrar)
+    _app, _maximo = app, int(maximo)
+
+
+def _da_transacao(chave_info, criar=True):
+    """Valores guardados na sessão atual até o fim da transação"""
+    from app.models import db
+    if criar:
+        return db.session.info.setdefault(chave_info, {})
+    return db.session.info.get(chave_info, {})
+
+
+def adiar(objeto, *colunas):
+    """
+    Retira `colunas` de `objeto` da transação atual e as agenda para a próxima gravação
+    após o commit; retorna False (nada muda) se o buffer estiver cheio ou o objeto
+    ainda não tiver id
+    """
+    if objeto.id is None or not _maximo:
+        return False
+    chave = (type(objeto), objeto.id)
+    valores = {coluna: getattr(objeto, coluna) for coluna in colunas}
+    with _lock:
+        if chave not in _pendentes and len(_pendentes) >= _maximo:
+            GRAVADAS.incrementar('buffer_cheio')
+            return False
+    _da_transacao('escrita_adiada').setdefault(chave, {}).update(valores)
+    for coluna, valor in valores.items():
+        set_committed_value(objeto, coluna, valor)
+    return True
+
+
+def pendente(objeto, coluna):
+    """Valor de `coluna` ainda não gravado (desta transação ou do buffer), ou None"""
+    chave = (type(objeto), objeto.id)
+    valor = _da_transacao('escrita_adiada', criar=False).get(chave, {}).get(coluna)
+    if valor is not None:
+        return valor
+    with _lock:
+        return _pendentes.get(chave, {}).get(coluna)
+
+
+def aplicar(objeto):
+    """Devolve ao objeto, como alteração da transação atual, os valores pendentes da linha"""
+    chave = (type(objeto), objeto.id)
+    with _lock:
+        do_buffer = _pendentes.pop(chave, None)
+    if do_buffer:
+        # Voltam ao buffer se a transação for desfeita
+        _da_transacao('escrita_adiada_aplicada')[chave] = do_buffer
+    valores = dict(do_buffer or {}, **_da_transacao('escrita_adiada').pop(chave, {}))
+    for coluna, valor in valores.items():
+        setattr(objeto, coluna, valor)
+    return bool(valores)
+
+
+def _incluir_no_buffer(lote):
+    # Chamado com o lock; valores já no buffer são mais recentes e prevalecem
+    for chave, valores in lote.items():
+        _pendentes[chave] = dict(valores, **_pendentes.get(chave, {}))
+
+
+@event.listens_for(Session, 'after_commit')
+def _agendar_confirmadas(session):
+    """Leva ao buffer os valores adiados pela transação confirmada"""
+    session.info.pop('escrita_adiada_aplicada', None)
+    adiadas = session.info.pop('escrita_adiada', None)
+    if adiadas:
+        with _lock:
+            for chave, valores in adiadas.items():
+                _pendentes.setdefault(chave, {}).update(valores)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _descartar_desfeitas(session, previous_transaction):
+    session.info.pop('escrita_adiada', None)
+    aplicadas = session.info.pop('escrita_adiada_aplicada', None)
+    if aplicadas:
+        with _lock:
+            _incluir_no_buffer(aplicadas)
+
+
+def descarregar():
+    """Grava o buffer em uma transação; em caso de erro as linhas voltam ao buffer"""
+    from app.models import db
+    global _pendentes
+    with _lock:
+        lote, _pendentes = _pendentes, {}
+    if not lote:
+        return 0
+
+    por_modelo = {}
+    for (modelo, linha_id), valores in lote.items():
+        por_modelo.setdefault(modelo, []).append(dict(valores, id=linha_id))
+    try:
+        for modelo, linhas in por_modelo.items():
+            # UPDATE por chave primária em lote (agrupado pelas colunas de cada linha)
+            db.session.execute(db.update(modelo), linhas)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        with _lock:
+            # Valores adiados depois da falha são mais recentes e prevalecem
+            _incluir_no_buffer(lote)
+        GRAVADAS.incrementar('erro', quantidade=len(lote))
+        raise
+    GRAVADAS.incrementar('gravada', quantidade=len(lote))
+    return len(lote)
+
+
+def encerrar():
+    """Grava o que restou no buffer (registrado no atexit por configurar)"""
+    if _app is None or not tamanho():
+        return
+    with _app.app_context():
+        try:
+            total = descarregar()
+            _app.logger.info('Escrita adiada: %d linhas gravadas ao encerrar', total)
+        except Exception:
+            _app.logger.exception('Erro ao gravar a escrita adiada ao encerrar')
+
+
+def limpar():
+    with _lock:
+        _pendentes.clear()
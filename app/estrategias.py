@@ -0,0 +1,194 @@
+"""
+Estratégias de escolha do próximo colaborador da fila
+
+Todas escolhem entre os colaboradores disponíveis com vaga e mantêm a
+própria ordem com escritas simples na linha de quem recebe ou libera um
+atendimento. Cada uma tem um índice parcial (apenas colaboradores com
+vaga) na ordem em que a escolha é feita, então o próximo é a primeira
+entrada do índice:
+
+- circular: menos ocupado e, no empate, a menor posição; quem libera uma
+  vaga vai para o fim da fila (MAX(posicao_fila) + 1)
+- menos_recente: menos ocupado e, no empate, quem liberou uma vaga há
+  mais tempo; grava só o horário, sem consultar a fila
+- menor_tempo_hoje: menos ocupado e, no empate, quem acumulou menos tempo
+  de atendimento no dia (UTC)
+- round_robin_ponderado: cada colaborador recebe na proporção do seu
+  `peso` (escalonamento por passos: quem recebe avança 1/peso e o próximo
+  é o de menor passo), independentemente dos atendimentos ativos
+
+A estratégia vem da configuração do sistema 'estrategia_distribuicao'
+(alterável sem reiniciar) ou de ESTRATEGIA_DISTRIBUICAO.
+"""
+from contextlib import contextmanager
+from datetime import datetime
+from flask import current_app
+from app.models import db, Colaborador
+from app import configuracoes
+
+CHAVE_CONFIGURACAO = 'estrategia_distribuicao'
+PADRAO = 'circular'
+
+_forcada = None
+_invalidas_avisadas = set()
+
+
+def _com_vaga():
+    return db.and_(Colaborador.esta_disponivel == True,
+                   Colaborador.atendimentos_ativos < Colaborador.capacidade)
+
+
+class _Banco:
+    """Agregados da fila que as estratégias consultam, lidos do banco"""
+
+    @staticmethod
+    def ultima_posicao():
+        return db.session.query(db.func.max(Colaborador.posicao_fila)).scalar() or 0
+
+    @staticmethod
+    def menor_passe(colaborador_id):
+        """Menor passo entre os outros colaboradores com vaga (None se não há)"""
+        return db.session.query(db.func.min(Colaborador.passe)).filter(
+            _com_vaga(), Colaborador.id != colaborador_id
+        ).scalar()
+
+
+def acumular_tempo(colaborador, segundos, agora=None):
+    """Soma ao tempo de atendimento do dia, zerando na virada do dia (UTC)"""
+    hoje = (agora or datetime.utcnow()).date()
+    if colaborador.dia_atendimento != hoje:
+        colaborador.dia_atendimento = hoje
+        colaborador.segundos_atendimento_hoje = 0
+    colaborador.segundos_atendimento_hoje = (colaborador.segundos_atendimento_hoje or 0) + segundos
+
+
+class Estrategia:
+    """
+    Ordem de escolha e manutenção das colunas que a sustentam
+    Os ganchos só alteram atributos do colaborador e consultam a fila por
+    `fila` (o banco por padrão): a fila em memória do simulador usa as
+    mesmas regras com os próprios agregados e o relógio simulado (`agora`)
+    """
+    nome = None
+    descricao = ''
+    campos = ()  # colunas da escolha, na ordem do índice da estratégia
+
+    def __init__(self, fila=_Banco):
+        self.fila = fila
+
+    def ordem(self):
+        """Colunas de ordenação da escolha (a mesma do índice da estratégia)"""
+        return tuple(getattr(Colaborador, campo) for campo in self.campos)
+
+    def chave(self, colaborador):
+        """A ordem de escolha sobre os atributos de um colaborador (ou de um registro em memória)"""
+        return tuple(getattr(colaborador, campo) for campo in self.campos)
+
+    def proximo(self, excluir=()):
+        """Próximo colaborador com vaga, fora os ids em `excluir`, ou None"""
+        consulta = Colaborador.query.filter(_com_vaga())
+        if excluir:
+            consulta = consulta.filter(Colaborador.id.notin_(excluir))
+        return consulta.order_by(*self.ordem()).first()
+
+    def ao_entrar(self, colaborador, agora=None):
+        """Colaborador entrou na fila (antes do commit)"""
+
+    def ao_receber(self, colaborador, atendimento):
+        """Colaborador recebeu um atendimento (antes do commit)"""
+
+    def ao_liberar(self, colaborador, atendimento, agora=None):
+        """Colaborador finalizou, pulou ou perdeu por timeout um atendimento (antes do commit)"""
+
+
+class Circular(Estrategia):
+    nome = 'circular'
+    descricao = 'Menos ocupado; no empate, a menor posição (quem libera vai para o fim)'
+    campos = ('atendimentos_ativos', 'posicao_fila')
+
+    def ao_liberar(self, colaborador, atendimento, agora=None):
+        colaborador.posicao_fila = self.fila.ultima_posicao() + 1
+
+
+class MenosRecente(Estrategia):
+    nome = 'menos_recente'
+    descricao = 'Menos ocupado; no empate, quem liberou uma vaga há mais tempo'
+    campos = ('atendimentos_ativos', 'liberado_em')
+
+    def ao_entrar(self, colaborador, agora=None):
+        colaborador.liberado_em = agora or datetime.utcnow()
+
+    def ao_liberar(self, colaborador, atendimento, agora=None):
+        colaborador.liberado_em = atendimento.fim or agora or datetime.utcnow()
+
+
+class MenorTempoHoje(Estrategia):
+    nome = 'menor_tempo_hoje'
+    descricao = 'Menos ocupado; no empate, quem acumulou menos tempo de atendimento hoje'
+    campos = ('atendimentos_ativos', 'segundos_atendimento_hoje')
+
+    def ao_entrar(self, colaborador, agora=None):
+        acumular_tempo(colaborador, 0, agora)
+
+    def ao_liberar(self, colaborador, atendimento, agora=None):
+        duracao = atendimento.duracao.total_seconds() if atendimento.duracao else 0
+        acumular_tempo(colaborador, duracao, agora)
+
+
+class RoundRobinPonderado(Estrategia):
+    nome = 'round_robin_ponderado'
+    descricao = 'Distribui na proporção do peso de cada colaborador'
+    campos = ('passe',)
+
+    def ao_entrar(self, colaborador, agora=None):
+        # Quem chega começa no menor passo atual: não recebe tudo até alcançar os demais
+        menor = self.fila.menor_passe(colaborador.id)
+        if menor is not None and (colaborador.passe or 0) < menor:
+            colaborador.passe = menor
+
+    def ao_receber(self, colaborador, atendimento):
+        colaborador.passe = (colaborador.passe or 0) + 1.0 / max(colaborador.peso or 1, 1)
+
+
+ESTRATEGIAS = {estrategia.nome: estrategia() for estrategia in
+               (Circular, MenosRecente, MenorTempoHoje, RoundRobinPonderado)}
+
+
+def atual():
+    """Estratégia em uso (configuração do sistema, Config ou a circular)"""
+    nome = _forcada or configuracoes.obter(CHAVE_CONFIGURACAO) \
+        or current_app.config.get('ESTRATEGIA_DISTRIBUICAO') or PADRAO
+    estrategia = ESTRATEGIAS.get(nome)
+    if estrategia is None:
+        if nome not in _invalidas_avisadas:
+            _invalidas_avisadas.add(nome)
+            print(f'Estratégia de distribuição desconhecida: {nome} (usando {PADRAO})')
+        estrategia = ESTRATEGIAS[PADRAO]
+    return estrategia
+
+
+@contextmanager
+def usar(nome):
+    """Usa a estratégia `nome` neste processo durante o bloco (auditorias e benchmarks)"""
+    global _forcada
+    if nome not in ESTRATEGIAS:
+        raise ValueError(f'Estratégia inválida: {nome} (use {", ".join(ESTRATEGIAS)})')
+    anterior, _forcada = _forcada, nome
+    try:
+        yield ESTRATEGIAS[nome]
+    finally:
+        _forcada = anterior
+
+
+def zerar_tempo_do_dia():
+    """
+    Zera o tempo de atendimento acumulado em dias anteriores (UTC)
+    Sem isso, quem ainda não atendeu hoje carregaria o total de ontem na ordem
+    """
+    hoje = datetime.utcnow().date()
+    total = Colaborador.query.filter(
+        db.or_(Colaborador.dia_atendimento < hoje, Colaborador.dia_atendimento.is_(None)),
+        Colaborador.segundos_atendimento_hoje != 0
+    ).update({'segundos_atendimento_hoje': 0, 'dia_atendimento': hoje}, synchronize_session=False)
+    db.session.commit()
+    return total
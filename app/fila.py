@@ -3,7 +3,18 @@ Lógica da fila circular de atendimento
 """
 from datetime import datetime, timedelta
 from app.models import db, Colaborador, Solicitacao, Atendimento
-from flask import current_app
+from app import configuracoes, replica, ciclo_vida, pendentes, estrategias, previsao, escrita_adiada
+
+_ouvintes_distribuicao = []
+
+
+def ao_distribuir(func):
+    """
+    Registra uma função chamada a cada distribuição, após o commit, com os
+    dados da solicitação e o id do colaborador que a recebeu
+    """
+    _ouvintes_distribuicao.append(func)
+    return func
 
 
 class GerenciadorFila:
@@ -29,8 +40,14 @@ class GerenciadorFila:
         # Define a posição na fila (última posição)
         ultima_posicao = db.session.query(db.func.max(Colaborador.posicao_fila)).scalar() or 0
         colaborador.posicao_fila = ultima_posicao + 1
+        estrategias.atual().ao_entrar(colaborador)
+        capacidade = colaborador.capacidade
         
         db.session.commit()
+        previsao.entrou(colaborador_id, capacidade)
+        
+        # Um colaborador livre a mais: atende as pendentes, se houver
+        GerenciadorFila.distribuir_pendentes()
         return True
     
     @staticmethod
@@ -60,25 +77,23 @@ class GerenciadorFila:
                 colab.posicao_fila -= 1
         
         db.session.commit()
+        previsao.saiu(colaborador_id)
         return True
     
     @staticmethod
     def obter_proximo_colaborador():
         """
-        Retorna o próximo colaborador disponível na fila
-        (aquele que não está em atendimento e tem a menor posição)
+        Retorna o próximo colaborador disponível na fila, entre os que têm vaga,
+        segundo a estratégia de distribuição em uso (ver app.estrategias)
         """
-        return Colaborador.query.filter_by(
-            esta_disponivel=True,
-            esta_em_atendimento=False
-        ).order_by(Colaborador.posicao_fila).first()
+        return estrategias.atual().proximo()
     
     @staticmethod
     def obter_fila_completa():
-        """Retorna todos os colaboradores na fila, ordenados por posição"""
+        """Retorna todos os colaboradores na fila, na ordem da estratégia de distribuição"""
         return Colaborador.query.filter_by(
             esta_disponivel=True
-        ).order_by(Colaborador.posicao_fila).all()
+        ).order_by(*estrategias.atual().ordem(), Colaborador.posicao_fila).all()
     
     @staticmethod
     def obter_colaboradores_em_atendimento():
@@ -89,9 +104,21 @@ class GerenciadorFila:
         ).all()
     
     @staticmethod
-    def distribuir_solicitacao(solicitacao_id):
+    def _alterar_status(solicitacao, de, para):
+        """Muda o status no banco só se ele ainda for `de`; retorna se mudou"""
+        alteradas = db.session.execute(
+            db.update(Solicitacao)
+            .where(Solicitacao.id == solicitacao.id, Solicitacao.status == de)
+            .values(status=para)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.expire(solicitacao, ['status', 'atualizado_em'])
+        return alteradas == 1
+    
+    @staticmethod
+    def distribuir_solicitacao(solicitacao_id, excluir=()):
         """
-        Distribui uma solicitação para o próximo colaborador da fila
+        Distribui uma solicitação para o próximo colaborador da fila, fora os ids em `excluir`
         Retorna o colaborador que recebeu a solicitação ou None
         """
         solicitacao = Solicitacao.query.get(solicitacao_id)
@@ -99,26 +126,101 @@ class GerenciadorFila:
             return None
         
         # Obtém o próximo colaborador
-        colaborador = GerenciadorFila.obter_proximo_colaborador()
+        estrategia = estrategias.atual()
+        colaborador = estrategia.proximo(excluir)
         if not colaborador:
             return None
         
+        # atualizado_em marca a última mudança de status (criação ou volta para pendente)
+        pendente_desde = solicitacao.atualizado_em or solicitacao.criado_em
+        dados = {
+            'solicitacao_id': solicitacao.id,
+            'descricao': solicitacao.descricao,
+            'cliente_nome': solicitacao.cliente_nome,
+            'cliente_telefone': solicitacao.cliente_telefone,
+            'prioridade': solicitacao.prioridade,
+        }
+        
+        # Reserva a solicitação no banco: cada processo tem seu heap (e a recarga
+        # periódica pode trazer de volta uma que já está sendo distribuída), então
+        # só o UPDATE que ainda a encontra pendente segue com a distribuição
+        if not GerenciadorFila._alterar_status(solicitacao, 'pendente', 'em_atendimento'):
+            return None
+        
+        # Ocupa a vaga; se outro processo ocupou a última, tenta o próximo
+        while not colaborador.iniciar_atendimento():
+            colaborador = estrategia.proximo(excluir)
+            if not colaborador:
+                GerenciadorFila._alterar_status(solicitacao, 'em_atendimento', 'pendente')
+                return None
+        
         # Cria o atendimento
+        inicio = datetime.utcnow()
+        colaborador_id = colaborador.id
         atendimento = Atendimento(
             solicitacao_id=solicitacao_id,
-            colaborador_id=colaborador.id,
-            status='em_atendimento'
+            colaborador_id=colaborador_id,
+            status='em_atendimento',
+            inicio=inicio
         )
-        
-        # Atualiza status
-        solicitacao.status = 'em_atendimento'
-        colaborador.iniciar_atendimento()
+        estrategia.ao_receber(colaborador, atendimento)
         
         db.session.add(atendimento)
         db.session.commit()
+        ciclo_vida.distribuida(colaborador_id, solicitacao_id, inicio, pendente_desde)
+        for ouvinte in _ouvintes_distribuicao:
+            ouvinte(dados, colaborador_id)
         
         return colaborador
     
+    @staticmethod
+    def enfileirar(solicitacao):
+        """
+        Inclui uma solicitação pendente na fila de prioridades e distribui as pendentes
+        Retorna o colaborador que recebeu esta solicitação ou None (aguardando)
+        """
+        pendentes.adicionar(solicitacao.id, solicitacao.prioridade, solicitacao.criado_em)
+        return dict(GerenciadorFila.distribuir_pendentes()).get(solicitacao.id)
+    
+    @staticmethod
+    def enfileirar_lote(solicitacoes):
+        """
+        Inclui várias pendentes, dadas como (id, prioridade, criado_em), e as distribui em uma passada
+        Retorna {solicitacao_id: colaborador} das distribuídas nesta passada
+        """
+        for solicitacao_id, prioridade, criado_em in solicitacoes:
+            pendentes.adicionar(solicitacao_id, prioridade, criado_em)
+        return dict(GerenciadorFila.distribuir_pendentes())
+    
+    @staticmethod
+    def distribuir_pendentes(excluir=None):
+        """
+        Distribui as pendentes mais prioritárias enquanto houver colaborador livre
+        `excluir` mapeia solicitacao_id -> ids de colaboradores que não devem recebê-la
+        Retorna a lista de (solicitacao_id, colaborador)
+        """
+        excluir = excluir or {}
+        distribuidas = []
+        adiadas = []
+        while pendentes.tamanho():
+            entrada = pendentes.retirar()
+            solicitacao_id = entrada[2]
+            colaborador = GerenciadorFila.distribuir_solicitacao(
+                solicitacao_id, excluir.get(solicitacao_id, ()))
+            if colaborador:
+                distribuidas.append((solicitacao_id, colaborador))
+            elif GerenciadorFila.obter_proximo_colaborador() is None:
+                # Ninguém livre: a solicitação volta para o heap
+                pendentes.devolver(entrada)
+                break
+            elif solicitacao_id in excluir:
+                # Só os excluídos estão livres: fica para depois, as seguintes podem ir para eles
+                adiadas.append(entrada)
+            # Caso contrário já não estava pendente (distribuída por outro caminho)
+        for entrada in adiadas:
+            pendentes.devolver(entrada)
+        return distribuidas
+    
     @staticmethod
     def aceitar_atendimento(colaborador_id, solicitacao_id):
         """
@@ -134,8 +236,10 @@ class GerenciadorFila:
         if not atendimento:
             return False
         
-        # Atendimento já está marcado como em_atendimento
-        # Apenas confirma que o colaborador aceitou
+        # Atendimento já está marcado como em_atendimento; registra o aceite
+        # (um segundo aceite não altera o horário). Os horários vão para a
+        # escrita adiada: o commit só grava algo com o buffer cheio
+        ciclo_vida.aceito(atendimento)
         db.session.commit()
         return True
     
@@ -163,17 +267,21 @@ class GerenciadorFila:
         
         # Finaliza o atendimento
         atendimento.finalizar(observacoes=observacoes)
+        ciclo_vida.encerrado(atendimento, solicitacao)
+        if observacoes:
+            # Não decidem a fila: gravadas em lote pela escrita adiada
+            escrita_adiada.adiar(atendimento, 'observacoes')
         
         # Atualiza status da solicitação
         solicitacao.status = 'concluido'
         
-        # Retorna colaborador ao final da fila
+        # Libera a vaga; a estratégia reposiciona o colaborador na fila
         colaborador.finalizar_atendimento()
+        estrategias.atual().ao_liberar(colaborador, atendimento)
         
-        # Reposiciona no final da fila
-        ultima_posicao = db.session.query(db.func.max(Colaborador.posicao_fila)).scalar() or 0
-        colaborador.posicao_fila = ultima_posicao + 1
-        
+        # O colaborador está livre: atende as pendentes, se houver. A liberação
+        # é gravada no commit da primeira distribuição (ou no final, sem nenhuma)
+        GerenciadorFila.distribuir_pendentes()
         db.session.commit()
         return True
     
@@ -201,19 +309,22 @@ class GerenciadorFila:
         
         # Marca como pulado
         atendimento.finalizar(foi_pulado=True)
+        ciclo_vida.encerrado(atendimento, solicitacao)
         
-        # Retorna colaborador ao final da fila
+        # Libera a vaga; a estratégia reposiciona o colaborador na fila
         colaborador.finalizar_atendimento()
-        ultima_posicao = db.session.query(db.func.max(Colaborador.posicao_fila)).scalar() or 0
-        colaborador.posicao_fila = ultima_posicao + 1
+        estrategias.atual().ao_liberar(colaborador, atendimento)
         
-        # Marca solicitação como pendente novamente
+        # Marca solicitação como pendente novamente (mantém a posição pela criação)
         solicitacao.status = 'pendente'
+        solicitacao_id = solicitacao.id
+        pendentes.adicionar(solicitacao_id, solicitacao.prioridade, solicitacao.criado_em)
         
+        # Distribui as pendentes por prioridade, na mesma transação da liberação;
+        # esta não volta para quem a liberou. Retorna quem a recebeu
+        distribuidas = GerenciadorFila.distribuir_pendentes({solicitacao_id: {colaborador_id}})
         db.session.commit()
-        
-        # Distribui para o próximo colaborador
-        return GerenciadorFila.distribuir_solicitacao(solicitacao_id)
+        return dict(distribuidas).get(solicitacao_id)
     
     @staticmethod
     def processar_timeout(colaborador_id, solicitacao_id):
@@ -238,7 +349,7 @@ class GerenciadorFila:
             return None
         
         # Verifica se realmente passou do timeout
-        timeout_minutos = current_app.config.get('TIMEOUT_MINUTOS', 20)
+        timeout_minutos = configuracoes.timeout_minutos()
         tempo_decorrido = datetime.utcnow() - atendimento.inicio
         
         if tempo_decorrido < timedelta(minutes=timeout_minutos):
@@ -246,19 +357,22 @@ class GerenciadorFila:
         
         # Marca como timeout
         atendimento.finalizar(foi_timeout=True)
+        ciclo_vida.encerrado(atendimento, solicitacao)
         
-        # Retorna colaborador ao final da fila
+        # Libera a vaga; a estratégia reposiciona o colaborador na fila
         colaborador.finalizar_atendimento()
-        ultima_posicao = db.session.query(db.func.max(Colaborador.posicao_fila)).scalar() or 0
-        colaborador.posicao_fila = ultima_posicao + 1
+        estrategias.atual().ao_liberar(colaborador, atendimento)
         
-        # Marca solicitação como pendente novamente
+        # Marca solicitação como pendente novamente (mantém a posição pela criação)
         solicitacao.status = 'pendente'
+        solicitacao_id = solicitacao.id
+        pendentes.adicionar(solicitacao_id, solicitacao.prioridade, solicitacao.criado_em)
         
+        # Distribui as pendentes por prioridade, na mesma transação da liberação;
+        # esta não volta para quem a liberou. Retorna quem a recebeu
+        distribuidas = GerenciadorFila.distribuir_pendentes({solicitacao_id: {colaborador_id}})
         db.session.commit()
-        
-        # Distribui para o próximo colaborador
-        return GerenciadorFila.distribuir_solicitacao(solicitacao_id)
+        return dict(distribuidas).get(solicitacao_id)
     
     @staticmethod
     def verificar_timeouts():
@@ -266,7 +380,7 @@ class GerenciadorFila:
         Verifica todos os atendimentos em andamento e processa timeouts
         Deve ser chamado periodicamente (ex: a cada minuto)
         """
-        timeout_minutos = current_app.config.get('TIMEOUT_MINUTOS', 20)
+        timeout_minutos = configuracoes.timeout_minutos()
         tempo_limite = datetime.utcnow() - timedelta(minutes=timeout_minutos)
         
         # Busca atendimentos que passaram do tempo
@@ -292,20 +406,26 @@ class GerenciadorFila:
     
     @staticmethod
     def obter_estatisticas_gerais():
-        """Retorna estatísticas gerais do sistema"""
-        total_colaboradores = Colaborador.query.count()
-        colaboradores_disponiveis = Colaborador.query.filter_by(esta_disponivel=True).count()
-        colaboradores_atendendo = Colaborador.query.filter_by(esta_em_atendimento=True).count()
-        
-        total_solicitacoes = Solicitacao.query.count()
-        solicitacoes_pendentes = Solicitacao.query.filter_by(status='pendente').count()
-        solicitacoes_em_atendimento = Solicitacao.query.filter_by(status='em_atendimento').count()
-        solicitacoes_concluidas = Solicitacao.query.filter_by(status='concluido').count()
-        
-        total_atendimentos = Atendimento.query.count()
-        atendimentos_concluidos = Atendimento.query.filter_by(status='concluido').count()
-        atendimentos_pulados = Atendimento.query.filter_by(foi_pulado=True).count()
-        atendimentos_timeout = Atendimento.query.filter_by(foi_timeout=True).count()
+        """Retorna estatísticas gerais do sistema (lidas da réplica, se houver)"""
+        sessao = replica.sessao_leitura()
+        total_colaboradores = sessao.query(Colaborador).count()
+        colaboradores_disponiveis = sessao.query(Colaborador).filter_by(esta_disponivel=True).count()
+        # Quem está em atendimento está sempre disponível (usa o índice da fila)
+        colaboradores_atendendo = sessao.query(Colaborador).filter_by(
+            esta_disponivel=True,
+            esta_em_atendimento=True
+        ).count()
+        
+        total_solicitacoes = sessao.query(Solicitacao).count()
+        solicitacoes_pendentes = sessao.query(Solicitacao).filter_by(status='pendente').count()
+        solicitacoes_em_atendimento = sessao.query(Solicitacao).filter_by(status='em_atendimento').count()
+        solicitacoes_concluidas = sessao.query(Solicitacao).filter_by(status='concluido').count()
+        
+        total_atendimentos = sessao.query(Atendimento).count()
+        atendimentos_concluidos = sessao.query(Atendimento).filter_by(status='concluido').count()
+        # O status reflete as flags (ver Atendimento.finalizar) e é indexado
+        atendimentos_pulados = sessao.query(Atendimento).filter_by(status='pulado').count()
+        atendimentos_timeout = sessao.query(Atendimento).filter_by(status='timeout').count()
         
         return {
             'colaboradores': {
@@ -0,0 +1,189 @@
+"""
+Criação idempotente de solicitações
+
+O cliente pode enviar uma chave (cabeçalho Idempotency-Key ou campo
+chave_idempotencia). Ao repetir a requisição depois de uma falha de
+conexão, ele recebe a solicitação criada na primeira tentativa; sem a
+chave, cada repetição criaria outra solicitação, que ocuparia outro
+colaborador e outro ciclo de timeout.
+
+A chave é gravada, prefixada pelo usuário, em uma coluna única de
+solicitacoes. É a coluna que decide a corrida entre tentativas
+simultâneas, e ela vale entre processos e reinícios. O resultado da
+primeira tentativa fica também em um cache limitado por processo, com
+validade, que dispensa a consulta nas repetições mais comuns (segundos
+depois da original).
+
+`criar_solicitacoes` faz o mesmo para um lote (/api/solicitacoes/lote):
+uma consulta para as chaves, uma transação para as novas e uma passada
+de distribuição.
+"""
+import threading
+import time
+from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from app.models import db, Solicitacao, Atendimento
+
+TAMANHO_MAXIMO_CHAVE = 64
+
+_ttl = 3600
+_tamanho_maximo = 10000
+_itens = {}
+_lock = threading.Lock()
+
+
+def configurar(ttl, tamanho_maximo):
+    """Define a validade (em segundos) e o número máximo de itens"""
+    global _ttl, _tamanho_maximo
+    _ttl = ttl
+    _tamanho_maximo = tamanho_maximo
+    limpar()
+
+
+def normalizar_chave(valor):
+    """Valida a chave enviada pelo cliente; None ou vazia desativa a idempotência"""
+    if valor is None or valor == '':
+        return None
+    if not isinstance(valor, str) or len(valor) > TAMANHO_MAXIMO_CHAVE or not valor.isprintable():
+        raise ValueError(f'Chave de idempotência inválida: use até {TAMANHO_MAXIMO_CHAVE} caracteres imprimíveis')
+    return valor
+
+
+def _armazenada(usuario_id, chave):
+    # Chaves iguais de usuários diferentes não se confundem
+    return f'{usuario_id}:{chave}'
+
+
+def _guardar(armazenada, resultado):
+    with _lock:
+        if len(_itens) >= _tamanho_maximo:
+            _itens.clear()
+        _itens[armazenada] = (time.monotonic() + _ttl, resultado)
+
+
+def _resultado(solicitacao_id, colaborador):
+    return {
+        'solicitacao_id': solicitacao_id,
+        'colaborador_id': colaborador.id if colaborador else None,
+        'colaborador_nome': colaborador.nome if colaborador else None,
+    }
+
+
+def _anteriores(armazenadas):
+    """
+    Resultados das primeiras tentativas: do cache ou, em caso de falha, do banco
+    Retorna {chave armazenada: resultado} só das chaves já usadas
+    """
+    agora = time.monotonic()
+    resultados, faltantes = {}, []
+    for armazenada in armazenadas:
+        item = _itens.get(armazenada)
+        if item and item[0] > agora:
+            resultados[armazenada] = item[1]
+        else:
+            faltantes.append(armazenada)
+    if not faltantes:
+        return resultados
+
+    solicitacoes = Solicitacao.query.filter(Solicitacao.chave_idempotencia.in_(faltantes)).all()
+    if not solicitacoes:
+        return resultados
+    # Fora do cache (outro processo, reinício): responde com a atribuição atual
+    atendimentos = Atendimento.query.options(db.joinedload(Atendimento.colaborador)).filter(
+        Atendimento.solicitacao_id.in_([s.id for s in solicitacoes]),
+        Atendimento.status == 'em_atendimento'
+    ).all()
+    colaboradores = {a.solicitacao_id: a.colaborador for a in atendimentos}
+    for solicitacao in solicitacoes:
+        resultado = _resultado(solicitacao.id, colaboradores.get(solicitacao.id))
+        _guardar(solicitacao.chave_idempotencia, resultado)
+        resultados[solicitacao.chave_idempotencia] = resultado
+    return resultados
+
+
+def criar_solicitacao(usuario_id, chave, **campos):
+    """
+    Cria a solicitação e a inclui na fila, a menos que a chave já tenha sido usada
+    Retorna (resultado, repetida); resultado tem solicitacao_id, colaborador_id e colaborador_nome
+    """
+    from app.fila import GerenciadorFila
+    armazenada = _armazenada(usuario_id, chave) if chave else None
+    if armazenada:
+        resultado = _anteriores([armazenada]).get(armazenada)
+        if resultado:
+            return resultado, True
+
+    solicitacao = Solicitacao(status='pendente', chave_idempotencia=armazenada, **campos)
+    db.session.add(solicitacao)
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Tentativa simultânea com a mesma chave gravou primeiro
+        db.session.rollback()
+        resultado = _anteriores([armazenada]).get(armazenada) if armazenada else None
+        if resultado is None:
+            raise
+        return resultado, True
+
+    colaborador = GerenciadorFila.enfileirar(solicitacao)
+    resultado = _resultado(solicitacao.id, colaborador)
+    if armazenada:
+        _guardar(armazenada, resultado)
+    return resultado, False
+
+
+def criar_solicitacoes(usuario_id, itens):
+    """
+    Cria em lote as solicitações de `itens`, uma lista de (chave ou None, campos),
+    com um único INSERT em lote e uma passada de distribuição
+    Retorna a lista de (resultado, repetida) na ordem de `itens`; chaves já usadas,
+    inclusive repetidas dentro do lote, devolvem a solicitação da primeira vez
+    """
+    from app.fila import GerenciadorFila
+    armazenadas = [_armazenada(usuario_id, chave) if chave else None for chave, _ in itens]
+    anteriores = _anteriores({a for a in armazenadas if a})
+
+    for tentativa in range(2):
+        novas, vistas = [], set()
+        agora = datetime.utcnow()
+        for indice, (armazenada, (_, campos)) in enumerate(zip(armazenadas, itens)):
+            if armazenada in anteriores or armazenada in vistas:
+                continue
+            if armazenada:
+                vistas.add(armazenada)
+            novas.append((indice, Solicitacao(status='pendente', chave_idempotencia=armazenada,
+                                               criado_em=agora, atualizado_em=agora, **campos)))
+        db.session.add_all([solicitacao for _, solicitacao in novas])
+        try:
+            db.session.flush()
+            # Lidos antes do commit, que expira os objetos
+            criadas = [(indice, solicitacao.id, solicitacao.prioridade) for indice, solicitacao in novas]
+            db.session.commit()
+            break
+        except IntegrityError:
+            # Outra requisição gravou alguma das chaves: refaz sem elas
+            db.session.rollback()
+            if tentativa:
+                raise
+            anteriores.update(_anteriores(vistas))
+
+    distribuidas = GerenciadorFila.enfileirar_lote(
+        [(solicitacao_id, prioridade, agora) for _, solicitacao_id, prioridade in criadas]
+    )
+    por_indice = {}
+    for indice, solicitacao_id, _ in criadas:
+        por_indice[indice] = _resultado(solicitacao_id, distribuidas.get(solicitacao_id))
+        if armazenadas[indice]:
+            anteriores[armazenadas[indice]] = por_indice[indice]
+            _guardar(armazenadas[indice], por_indice[indice])
+
+    return [
+        (por_indice[indice], False) if indice in por_indice else (anteriores[armazenada], True)
+        for indice, armazenada in enumerate(armazenadas)
+    ]
+
+
+def limpar():
+    """Esvazia o cache"""
+    with _lock:
+        _itens.clear()
@@ -0,0 +1,263 @@
+"""
+Métricas no formato de exposição de texto do Prometheus
+
+Registra histogramas de latência por rota Flask e por evento SocketIO e
+calcula os indicadores da fila (tamanho, colaboradores ocupados, pendências
+e idade da pendência mais antiga) apenas no momento da coleta em /metrics.
+
+O custo por requisição é uma busca binária no vetor de limites e um
+incremento protegido por lock; não há dependência externa.
+"""
+import bisect
+import threading
+import time
+from datetime import datetime
+from functools import wraps
+from flask import g, request
+
+# Limites padrão dos histogramas do Prometheus (segundos)
+LIMITES_PADRAO = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_metricas = []
+_indicadores = []
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _rotulos(nomes, valores, extra=None):
+    pares = list(zip(nomes, valores))
+    if extra:
+        pares.append(extra)
+    if not pares:
+        return ''
+    return '{' + ','.join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares) + '}'
+
+
+def _numero(valor):
+    if valor == float('inf'):
+        return '+Inf'
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Contador:
+    """Contador monotônico com rótulos"""
+    tipo = 'counter'
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome, self.ajuda, self.rotulos = nome, ajuda, tuple(rotulos)
+        self._valores = {}
+        self._lock = threading.Lock()
+        _metricas.append(self)
+
+    def incrementar(self, *valores, quantidade=1):
+        with self._lock:
+            self._valores[valores] = self._valores.get(valores, 0) + quantidade
+
+    def exportar(self):
+        with self._lock:
+            itens = list(self._valores.items()) or ([((), 0)] if not self.rotulos else [])
+        return [f'{self.nome}{_rotulos(self.rotulos, valores)} {_numero(total)}'
+                for valores, total in sorted(itens)]
+
+    def limpar(self):
+        with self._lock:
+            self._valores = {}
+
+
+class Histograma:
+    """Histograma cumulativo com rótulos (contagem por limite, soma e total)"""
+    tipo = 'histogram'
+
+    def __init__(self, nome, ajuda, rotulos=(), limites=LIMITES_PADRAO):
+        self.nome, self.ajuda, self.rotulos = nome, ajuda, tuple(rotulos)
+        self.limites = tuple(limites)
+        self._series = {}
+        self._lock = threading.Lock()
+        _metricas.append(self)
+
+    def observar(self, valor, *valores):
+        indice = bisect.bisect_left(self.limites, valor)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * (len(self.limites) + 1), 0.0, 0]
+            serie[0][indice] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def contagem(self, *valores):
+        """(total de observações, soma) de uma série"""
+        with self._lock:
+            serie = self._series.get(valores)
+            return (serie[2], serie[1]) if serie else (0, 0.0)
+
+    def quantil(self, q, *valores):
+        """Estimativa do quantil por interpolação nos baldes (como histogram_quantile)"""
+        with self._lock:
+            serie = self._series.get(valores)
+            baldes = list(serie[0]) if serie else []
+        total = sum(baldes)
+        if not total:
+            return None
+        alvo = q * total
+        acumulado = 0
+        for indice, quantidade in enumerate(baldes):
+            if acumulado + quantidade >= alvo and quantidade:
+                if indice == len(self.limites):
+                    return self.limites[-1]
+                inferior = self.limites[indice - 1] if indice else 0.0
+                superior = self.limites[indice]
+                return round(inferior + (superior - inferior) * (alvo - acumulado) / quantidade, 3)
+            acumulado += quantidade
+        return self.limites[-1]
+
+    def exportar(self):
+        with self._lock:
+            itens = [(valores, (list(s[0]), s[1], s[2])) for valores, s in self._series.items()]
+        linhas = []
+        for valores, (baldes, soma, total) in sorted(itens):
+            acumulado = 0
+            for limite, quantidade in zip(self.limites + (float('inf'),), baldes):
+                acumulado += quantidade
+                linhas.append(f'{self.nome}_bucket'
+                              f'{_rotulos(self.rotulos, valores, ("le", _numero(limite)))} {acumulado}')
+            linhas.append(f'{self.nome}_sum{_rotulos(self.rotulos, valores)} {_numero(soma)}')
+            linhas.append(f'{self.nome}_count{_rotulos(self.rotulos, valores)} {total}')
+        return linhas
+
+    def limpar(self):
+        with self._lock:
+            self._series = {}
+
+
+def indicador(nome, ajuda):
+    """Registra uma função que calcula um gauge no momento da coleta"""
+    def decorador(func):
+        _indicadores.append((nome, ajuda, func))
+        return func
+    return decorador
+
+
+HTTP_DURACAO = Histograma(
+    'atendimento_http_requisicao_segundos',
+    'Duração das requisições HTTP por rota',
+    ('metodo', 'rota', 'status')
+)
+SOCKETIO_DURACAO = Histograma(
+    'atendimento_socketio_evento_segundos',
+    'Duração dos handlers de eventos SocketIO',
+    ('evento',)
+)
+SOCKETIO_ERROS = Contador(
+    'atendimento_socketio_evento_erros_total',
+    'Exceções levantadas pelos handlers de eventos SocketIO',
+    ('evento',)
+)
+TIMEOUTS = Contador(
+    'atendimento_timeouts_processados_total',
+    'Atendimentos encerrados por timeout pelo job periódico'
+)
+
+
+@indicador('atendimento_fila_tamanho', 'Colaboradores na fila (disponíveis)')
+def _tamanho_fila():
+    from app.models import Colaborador
+    return Colaborador.query.filter_by(esta_disponivel=True).count()
+
+
+@indicador('atendimento_colaboradores_ocupados', 'Colaboradores em atendimento')
+def _colaboradores_ocupados():
+    from app.models import Colaborador
+    # Quem está em atendimento está sempre disponível (usa o índice da fila)
+    return Colaborador.query.filter_by(esta_disponivel=True, esta_em_atendimento=True).count()
+
+
+@indicador('atendimento_vagas_livres', 'Atendimentos que os colaboradores na fila ainda podem receber')
+def _vagas_livres():
+    from app.models import db, Colaborador
+    return db.session.query(
+        db.func.coalesce(db.func.sum(Colaborador.capacidade - Colaborador.atendimentos_ativos), 0)
+    ).filter(Colaborador.esta_disponivel == True).scalar()
+
+
+@indicador('atendimento_solicitacoes_pendentes', 'Solicitações aguardando distribuição')
+def _solicitacoes_pendentes():
+    from app.models import Solicitacao
+    return Solicitacao.query.filter_by(status='pendente').count()
+
+
+@indicador('atendimento_pendente_mais_antiga_segundos',
+           'Idade da solicitação pendente mais antiga (0 sem pendências)')
+def _pendente_mais_antiga():
+    from app.models import db, Solicitacao
+    mais_antiga = db.session.query(db.func.min(Solicitacao.criado_em)).filter(
+        Solicitacao.status == 'pendente'
+    ).scalar()
+    if not mais_antiga:
+        return 0
+    return max((datetime.utcnow() - mais_antiga).total_seconds(), 0.0)
+
+
+def exportar():
+    """Texto no formato de exposição do Prometheus (versão 0.0.4)"""
+    linhas = []
+    for metrica in _metricas:
+        linhas.append(f'# HELP {metrica.nome} {metrica.ajuda}')
+        linhas.append(f'# TYPE {metrica.nome} {metrica.tipo}')
+        linhas.extend(metrica.exportar())
+    for nome, ajuda, func in _indicadores:
+        linhas.append(f'# HELP {nome} {ajuda}')
+        linhas.append(f'# TYPE {nome} gauge')
+        linhas.append(f'{nome} {_numero(func())}')
+    return '\n'.join(linhas) + '\n'
+
+
+def limpar():
+    """Zera as métricas acumuladas"""
+    for metrica in _metricas:
+        metrica.limpar()
+
+
+def _inicio_requisicao():
+    g.metricas_inicio = time.perf_counter()
+
+
+def _fim_requisicao(resposta):
+    inicio = g.pop('metricas_inicio', None)
+    if inicio is not None:
+        # O padrão da rota (ex: /solicitacao/<int:solicitacao_id>) mantém os rótulos limitados
+        regra = request.url_rule.rule if request.url_rule else 'sem_rota'
+        HTTP_DURACAO.observar(time.perf_counter() - inicio,
+                              request.method, regra, resposta.status_code)
+    return resposta
+
+
+def _instrumentar_handler(evento, handler):
+    if getattr(handler, '_metricas', False):
+        return handler
+
+    @wraps(handler)
+    def medido(*args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return handler(*args, **kwargs)
+        except Exception:
+            SOCKETIO_ERROS.incrementar(evento)
+            raise
+        finally:
+            SOCKETIO_DURACAO.observar(time.perf_counter() - inicio, evento)
+
+    medido._metricas = True
+    return medido
+
+
+def instrumentar(app, socketio):
+    """Registra a medição das rotas da app e dos eventos já registrados no socketio"""
+    app.before_request(_inicio_requisicao)
+    app.after_request(_fim_requisicao)
+
+    for handlers in socketio.server.handlers.values():
+        for evento, handler in list(handlers.items()):
+            handlers[evento] = _instrumentar_handler(evento, handler)
@@ -4,7 +4,7 @@ Modelos do banco de dados para o sistema de fila de atendimento
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from app import senhas
 
 db = SQLAlchemy()
 
@@ -12,6 +12,27 @@ db = SQLAlchemy()
 class Colaborador(UserMixin, db.Model):
     """Modelo para colaboradores/usuários do sistema"""
     __tablename__ = 'colaboradores'
+    __table_args__ = (
+        # Próximo da fila, fila completa e colaboradores em atendimento
+        db.Index('ix_colaboradores_fila', 'esta_disponivel', 'esta_em_atendimento', 'posicao_fila'),
+        # Próximo colaborador com vaga: menos ocupado e, no empate, o primeiro da fila.
+        # Só entram no índice os que têm vaga, então a busca não percorre os lotados
+        db.Index('ix_colaboradores_vagas', 'esta_disponivel', 'atendimentos_ativos', 'posicao_fila',
+                 sqlite_where=db.text('atendimentos_ativos < capacidade'),
+                 postgresql_where=db.text('atendimentos_ativos < capacidade')),
+        # Um índice parcial por estratégia de distribuição, na ordem da escolha (ver app.estrategias)
+        db.Index('ix_colaboradores_vagas_liberacao', 'esta_disponivel', 'atendimentos_ativos',
+                 'liberado_em',
+                 sqlite_where=db.text('atendimentos_ativos < capacidade'),
+                 postgresql_where=db.text('atendimentos_ativos < capacidade')),
+        db.Index('ix_colaboradores_vagas_tempo_hoje', 'esta_disponivel', 'atendimentos_ativos',
+                 'segundos_atendimento_hoje',
+                 sqlite_where=db.text('atendimentos_ativos < capacidade'),
+                 postgresql_where=db.text('atendimentos_ativos < capacidade')),
+        db.Index('ix_colaboradores_vagas_passe', 'esta_disponivel', 'passe',
+                 sqlite_where=db.text('atendimentos_ativos < capacidade'),
+                 postgresql_where=db.text('atendimentos_ativos < capacidade')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     nome = db.Column(db.String(100), nullable=False)
@@ -21,7 +42,20 @@ class Colaborador(UserMixin, db.Model):
     # Status do colaborador
     esta_disponivel = db.Column(db.Boolean, default=False)
     esta_em_atendimento = db.Column(db.Boolean, default=False)
-    posicao_fila = db.Column(db.Integer, nullable=True)
+    posicao_fila = db.Column(db.Integer, nullable=True, index=True)
+    
+    # Atendimentos simultâneos permitidos e em andamento
+    # (esta_em_atendimento indica se há ao menos um)
+    capacidade = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    atendimentos_ativos = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
+    # Ordem das estratégias de distribuição (ver app.estrategias): última vaga liberada,
+    # tempo de atendimento acumulado no dia (UTC) e passo/peso do round-robin ponderado
+    liberado_em = db.Column(db.DateTime, nullable=True)
+    segundos_atendimento_hoje = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    dia_atendimento = db.Column(db.Date, nullable=True)
+    peso = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    passe = db.Column(db.Float, nullable=False, default=0, server_default='0')
     
     # Timestamps
     criado_em = db.Column(db.DateTime, default=datetime.utcnow)
@@ -32,36 +66,81 @@ class Colaborador(UserMixin, db.Model):
     
     def set_senha(self, senha):
         """Define a senha do colaborador (hash)"""
-        self.senha_hash = generate_password_hash(senha)
+        self.senha_hash = senhas.gerar_hash(senha)
     
     def verificar_senha(self, senha):
         """Verifica se a senha está correta"""
-        return check_password_hash(self.senha_hash, senha)
+        return senhas.verificar(self.senha_hash, senha)
+    
+    def atualizar_hash_senha(self, senha):
+        """
+        Refaz o hash se os parâmetros de custo mudaram
+        Deve ser chamado após verificar a senha; retorna True se atualizou
+        Com o pool de senhas cheio a atualização fica para o próximo login
+        """
+        if not senhas.hash_desatualizado(self.senha_hash):
+            return False
+        try:
+            self.set_senha(senha)
+        except senhas.FilaSenhasCheia:
+            return False
+        return True
     
     def entrar_na_fila(self):
         """Marca o colaborador como disponível e adiciona à fila"""
         self.esta_disponivel = True
         self.esta_em_atendimento = False
+        self.atendimentos_ativos = 0
         # A posição será definida pela lógica da fila
     
     def sair_da_fila(self):
         """Remove o colaborador da fila"""
         self.esta_disponivel = False
         self.esta_em_atendimento = False
+        self.atendimentos_ativos = 0
         self.posicao_fila = None
     
+    @property
+    def vagas(self):
+        """Atendimentos que ainda podem ser recebidos"""
+        return max((self.capacidade or 1) - (self.atendimentos_ativos or 0), 0)
+    
+    def _atualizar_vagas(self, filtro, valores):
+        # O contador muda no próprio UPDATE: ler, somar e gravar no Python perde
+        # as alterações concorrentes de outros processos
+        alteradas = db.session.execute(
+            db.update(Colaborador).where(Colaborador.id == self.id, *filtro).values(**valores)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.expire(self, ['atendimentos_ativos', 'esta_em_atendimento'])
+        return alteradas == 1
+    
     def iniciar_atendimento(self):
-        """Marca o colaborador como em atendimento"""
-        self.esta_em_atendimento = True
+        """
+        Ocupa uma vaga de atendimento, se ainda houver uma no banco
+        Retorna False se outro processo ocupou a última vaga
+        """
+        return self._atualizar_vagas(
+            (Colaborador.esta_disponivel == True,
+             Colaborador.atendimentos_ativos < Colaborador.capacidade),
+            {'atendimentos_ativos': Colaborador.atendimentos_ativos + 1, 'esta_em_atendimento': True}
+        )
     
     def finalizar_atendimento(self):
-        """Marca o colaborador como disponível novamente"""
-        self.esta_em_atendimento = False
+        """Libera uma vaga de atendimento"""
+        # No SET as colunas valem o que valiam antes do UPDATE
+        self._atualizar_vagas((), {
+            'atendimentos_ativos': db.case((Colaborador.atendimentos_ativos > 0,
+                                            Colaborador.atendimentos_ativos - 1), else_=0),
+            'esta_em_atendimento': Colaborador.atendimentos_ativos > 1,
+        })
     
     def get_estatisticas(self):
-        """Retorna estatísticas do colaborador"""
-        atendimentos_concluidos = self.atendimentos.filter_by(status='concluido').all()
-        atendimentos_pulados = self.atendimentos.filter_by(foi_pulado=True).count()
+        """Retorna estatísticas do colaborador (lidas da réplica, se houver)"""
+        from app import replica
+        atendimentos = replica.sessao_leitura().query(Atendimento).filter_by(colaborador_id=self.id)
+        atendimentos_concluidos = atendimentos.filter_by(status='concluido').all()
+        atendimentos_pulados = atendimentos.filter_by(foi_pulado=True).count()
         
         total_atendimentos = len(atendimentos_concluidos)
         
@@ -77,6 +156,37 @@ class Colaborador(UserMixin, db.Model):
             'tempo_medio_minutos': round(tempo_medio, 2)
         }
     
+    @staticmethod
+    def get_estatisticas_todos():
+        """
+        Estatísticas de todos os colaboradores em duas consultas
+        Retorna {colaborador_id: estatísticas}, no formato de get_estatisticas
+        """
+        from app import replica
+        sessao = replica.sessao_leitura()
+        
+        concluidos = {}
+        for colaborador_id, duracao in sessao.query(
+            Atendimento.colaborador_id, Atendimento.duracao
+        ).filter(Atendimento.status == 'concluido'):
+            total, segundos = concluidos.get(colaborador_id, (0, 0.0))
+            concluidos[colaborador_id] = (total + 1, segundos + (duracao.total_seconds() if duracao else 0))
+        
+        # O status reflete foi_pulado (ver Atendimento.finalizar) e é indexado
+        pulados = dict(sessao.query(
+            Atendimento.colaborador_id, db.func.count(Atendimento.id)
+        ).filter(Atendimento.status == 'pulado').group_by(Atendimento.colaborador_id))
+        
+        estatisticas = {}
+        for colaborador_id in set(concluidos) | set(pulados):
+            total, segundos = concluidos.get(colaborador_id, (0, 0.0))
+            estatisticas[colaborador_id] = {
+                'total_atendimentos': total,
+                'total_pulados': pulados.get(colaborador_id, 0),
+                'tempo_medio_minutos': round(segundos / total / 60, 2) if total else 0
+            }
+        return estatisticas
+    
     def __repr__(self):
         return f'<Colaborador {self.nome}>'
 
@@ -84,6 +194,10 @@ class Colaborador(UserMixin, db.Model):
 class Solicitacao(db.Model):
     """Modelo para solicitações de atendimento"""
     __tablename__ = 'solicitacoes'
+    __table_args__ = (
+        # Solicitações por status, das mais recentes para as mais antigas
+        db.Index('ix_solicitacoes_status_criado_em', 'status', 'criado_em'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     descricao = db.Column(db.Text, nullable=False)
@@ -91,7 +205,13 @@ class Solicitacao(db.Model):
     cliente_telefone = db.Column(db.String(20))
     
     # Status: pendente, em_atendimento, concluido, pulado
-    status = db.Column(db.String(20), default='pendente', index=True)
+    status = db.Column(db.String(20), default='pendente')
+    
+    # Prioridade: 0 baixa, 1 normal, 2 alta, 3 urgente (ver app.pendentes)
+    prioridade = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    
+    # Chave de idempotência enviada pelo cliente, prefixada pelo usuário (ver app.idempotencia)
+    chave_idempotencia = db.Column(db.String(100), unique=True, index=True)
     
     # Timestamps
     criado_em = db.Column(db.DateTime, default=datetime.utcnow, index=True)
@@ -115,6 +235,14 @@ class Solicitacao(db.Model):
 class Atendimento(db.Model):
     """Modelo para registro de atendimentos"""
     __tablename__ = 'atendimentos'
+    __table_args__ = (
+        # Atendimento atual de um colaborador e estatísticas por colaborador
+        db.Index('ix_atendimentos_colaborador_status', 'colaborador_id', 'status'),
+        # Verificação de timeouts e contagens por status
+        db.Index('ix_atendimentos_status_inicio', 'status', 'inicio'),
+        # Histórico e atendimento atual de uma solicitação
+        db.Index('ix_atendimentos_solicitacao_status', 'solicitacao_id', 'status'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     
@@ -130,6 +258,10 @@ class Atendimento(db.Model):
     fim = db.Column(db.DateTime, nullable=True)
     duracao = db.Column(db.Interval, nullable=True)
     
+    # Ciclo de vida: inicio é a distribuição e fim o encerramento (ver app.ciclo_vida)
+    notificado_em = db.Column(db.DateTime, nullable=True)
+    aceito_em = db.Column(db.DateTime, nullable=True)
+    
     # Flags
     foi_pulado = db.Column(db.Boolean, default=False)
     foi_timeout = db.Column(db.Boolean, default=False)
@@ -137,6 +269,12 @@ class Atendimento(db.Model):
     # Observações
     observacoes = db.Column(db.Text)
     
+    def aceitar(self, notificado_em=None):
+        """Registra o aceite do colaborador"""
+        self.aceito_em = datetime.utcnow()
+        if notificado_em and not self.notificado_em:
+            self.notificado_em = notificado_em
+    
     def finalizar(self, foi_pulado=False, foi_timeout=False, observacoes=None):
         """Finaliza o atendimento"""
         self.fim = datetime.utcnow()
@@ -153,6 +291,12 @@ class Atendimento(db.Model):
         
         if observacoes:
             self.observacoes = observacoes
+        
+        # Os concluídos alimentam a previsão de espera (após o commit), como
+        # na carga inicial das médias
+        if self.status == 'concluido':
+            from app import previsao
+            previsao.registrar_apos_commit(self.colaborador_id, self.duracao.total_seconds())
     
     def get_duracao_minutos(self):
         """Retorna a duração em minutos"""
@@ -179,22 +323,20 @@ class ConfiguracaoSistema(db.Model):
     
     @staticmethod
     def get_valor(chave, padrao=None):
-        """Obtém um valor de configuração"""
-        config = ConfiguracaoSistema.query.filter_by(chave=chave).first()
-        return config.valor if config else padrao
+        """Obtém um valor de configuração (do cache em memória)"""
+        from app import configuracoes
+        return configuracoes.obter(chave, padrao)
     
     @staticmethod
-    def set_valor(chave, valor, descricao=None):
-        """Define um valor de configuração"""
-        config = ConfiguracaoSistema.query.filter_by(chave=chave).first()
-        if config:
-            config.valor = valor
-            if descricao:
-                config.descricao = descricao
-        else:
-            config = ConfiguracaoSistema(chave=chave, valor=valor, descricao=descricao)
-            db.session.add(config)
-        db.session.commit()
+    def set_valor(chave, valor, descricao=None, commit=True):
+        """
+        Define um valor de configuração
+        Com commit=False a alteração entra na transação do chamador
+        """
+        from app import configuracoes
+        configuracoes.definir(chave, valor, descricao)
+        if commit:
+            db.session.commit()
     
     def __repr__(self):
         return f'<ConfiguracaoSistema {self.chave}={self.valor}>'
@@ -0,0 +1,242 @@
+"""
+Contagem de consultas SQL por requisição e por evento SocketIO
+
+Com SQL_MONITOR ativo, os eventos do SQLAlchemy somam a quantidade de
+consultas e o tempo gasto no banco no escopo atual (uma requisição HTTP ou
+um handler de evento). O mesmo SQL executado várias vezes com parâmetros
+diferentes no mesmo escopo é sinalizado como N+1.
+
+O resultado vai para o cabeçalho X-Consultas-SQL das respostas e, quando
+há N+1 ou o orçamento (SQL_ORCAMENTO_CONSULTAS) é excedido, para o log.
+Com SQL_ORCAMENTO_ESTRITO o escopo falha com OrcamentoSQLExcedido.
+
+Uso: FLASK_ENV=testing flask verificar-consultas
+"""
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_local = threading.local()
+_ouvintes = []
+_config = {'limiar_n_mais_1': 5, 'orcamento': 0, 'estrito': False}
+_registrado = False
+
+
+class OrcamentoSQLExcedido(Exception):
+    """Escopo com N+1 ou mais consultas que o orçamento (modo estrito)"""
+
+
+class Escopo:
+    """Consultas executadas em uma requisição ou evento"""
+
+    def __init__(self, nome):
+        self.nome = nome
+        self.consultas = 0
+        self.tempo = 0.0
+        self._execucoes = {}
+
+    def registrar(self, sql, parametros, duracao):
+        self.consultas += 1
+        self.tempo += duracao
+        try:
+            chave = hash(repr(parametros))
+        except Exception:
+            chave = id(parametros)
+        self._execucoes.setdefault(sql, set()).add(chave)
+
+    def n_mais_1(self):
+        """Lista (sql, execuções distintas) das consultas repetidas acima do limiar"""
+        return sorted(
+            ((sql, len(parametros)) for sql, parametros in self._execucoes.items()
+             if len(parametros) >= _config['limiar_n_mais_1']),
+            key=lambda item: -item[1]
+        )
+
+    def problemas(self):
+        """Descrição das violações do escopo (vazia se estiver tudo certo)"""
+        problemas = [f'N+1 ({vezes}x): {" ".join(sql.split())[:160]}'
+                     for sql, vezes in self.n_mais_1()]
+        if _config['orcamento'] and self.consultas > _config['orcamento']:
+            problemas.append(f'{self.consultas} consultas (orçamento {_config["orcamento"]})')
+        return problemas
+
+    def resumo(self):
+        return (f'{self.consultas} consultas; {self.tempo * 1000:.1f} ms; '
+                f'N+1: {len(self.n_mais_1())}')
+
+
+def ao_encerrar(func):
+    """Registra uma função chamada com cada escopo encerrado"""
+    _ouvintes.append(func)
+    return func
+
+
+def escopo_atual():
+    return getattr(_local, 'escopo', None)
+
+
+def _iniciar(nome):
+    escopo = Escopo(nome)
+    _local.escopo = escopo
+    return escopo
+
+
+def _encerrar(escopo):
+    _local.escopo = None
+    for ouvinte in _ouvintes:
+        ouvinte(escopo)
+    problemas = escopo.problemas()
+    if problemas:
+        print(f'[sql] {escopo.nome}: {escopo.resumo()}')
+        for problema in problemas:
+            print(f'[sql]   {problema}')
+        if _config['estrito']:
+            raise OrcamentoSQLExcedido(f'{escopo.nome}: {"; ".join(problemas)}')
+
+
+@contextmanager
+def monitorar(nome):
+    """Conta as consultas do bloco (fora de requisições, ex: jobs e scripts)"""
+    anterior = escopo_atual()
+    escopo = _iniciar(nome)
+    try:
+        yield escopo
+    finally:
+        try:
+            _encerrar(escopo)
+        finally:
+            _local.escopo = anterior
+
+
+def _antes_execucao(conn, cursor, statement, parameters, context, executemany):
+    if escopo_atual() is not None:
+        context._monitor_sql_inicio = time.perf_counter()
+
+
+def _depois_execucao(conn, cursor, statement, parameters, context, executemany):
+    escopo = escopo_atual()
+    inicio = getattr(context, '_monitor_sql_inicio', None)
+    if escopo is not None and inicio is not None:
+        escopo.registrar(statement, parameters, time.perf_counter() - inicio)
+
+
+def _inicio_requisicao():
+    _iniciar(f'{request.method} {request.path}')
+
+
+def _fim_requisicao(resposta):
+    escopo = escopo_atual()
+    if escopo is not None:
+        resposta.headers['X-Consultas-SQL'] = escopo.resumo()
+        _encerrar(escopo)
+    return resposta
+
+
+def _descartar_escopo(exc=None):
+    _local.escopo = None
+
+
+def _instrumentar_handler(evento, handler):
+    if getattr(handler, '_monitor_sql', False):
+        return handler
+
+    @wraps(handler)
+    def monitorado(*args, **kwargs):
+        escopo = _iniciar(f'socketio {evento}')
+        try:
+            resultado = handler(*args, **kwargs)
+        except Exception:
+            _local.escopo = None
+            raise
+        _encerrar(escopo)
+        return resultado
+
+    monitorado._monitor_sql = True
+    return monitorado
+
+
+def configurar(app, socketio):
+    """Ativa a contagem para as rotas da app e os eventos registrados no socketio"""
+    global _registrado
+    _config.update(
+        limiar_n_mais_1=app.config['SQL_LIMIAR_N_MAIS_1'],
+        orcamento=app.config['SQL_ORCAMENTO_CONSULTAS'],
+        estrito=app.config['SQL_ORCAMENTO_ESTRITO'],
+    )
+    if not _registrado:
+        # Vale para todos os engines (principal e réplica)
+        event.listen(Engine, 'before_cursor_execute', _antes_execucao)
+        event.listen(Engine, 'after_cursor_execute', _depois_execucao)
+        _registrado = True
+
+    app.before_request(_inicio_requisicao)
+    app.after_request(_fim_requisicao)
+    app.teardown_request(_descartar_escopo)
+
+    for handlers in socketio.server.handlers.values():
+        for evento, handler in list(handlers.items()):
+            handlers[evento] = _instrumentar_handler(evento, handler)
+
+
+# Páginas e eventos exercitados por `flask verificar-consultas`
+PAGINAS = [
+    '/dashboard',
+    '/estatisticas',
+    '/solicitacoes',
+    '/api/fila',
+    '/api/estatisticas',
+    '/api/minhas-estatisticas',
+    '/api/solicitacoes/pendentes',
+    '/api/atendimento/atual',
+    '/api/solicitacoes/1/eta',
+]
+EVENTOS = [
+    ('entrar_fila', None),
+    ('nova_solicitacao', {'descricao': 'verificação de consultas'}),
+    ('obter_estatisticas', None),
+    ('obter_minhas_estatisticas', None),
+    ('sair_fila', None),
+]
+
+
+def auditar(app, socketio, colaboradores=20, solicitacoes=200):
+    """
+    Popula um banco vazio, percorre as páginas e eventos principais
+    e retorna os escopos registrados
+    """
+    from app.models import db
+    from app import dados_sinteticos
+
+    from app.fila import GerenciadorFila
+
+    db.create_all()
+    dados_sinteticos.gerar(colaboradores, solicitacoes, pendentes=5, na_fila=colaboradores // 2)
+    # Como o job de pendentes faria: o acúmulo inicial não entra na medição dos eventos
+    GerenciadorFila.distribuir_pendentes()
+
+    escopos = []
+    _ouvintes.append(escopos.append)
+    estrito, _config['estrito'] = _config['estrito'], False
+    try:
+        cliente = app.test_client()
+        cliente.post('/login', data={'email': 'colab1@sintetico.local',
+                                     'senha': dados_sinteticos.SENHA_PADRAO})
+        del escopos[:]
+        for pagina in PAGINAS:
+            cliente.get(pagina)
+
+        cliente_socket = socketio.test_client(app, flask_test_client=cliente)
+        for evento, dados in EVENTOS:
+            if dados is None:
+                cliente_socket.emit(evento)
+            else:
+                cliente_socket.emit(evento, dados)
+        cliente_socket.disconnect()
+    finally:
+        _ouvintes.remove(escopos.append)
+        _config['estrito'] = estrito
+    return escopos
@@ -0,0 +1,144 @@
+"""
+Painel (wallboard) por Server-Sent Events
+
+Os painéis de TV só mostram o tamanho da fila, os colaboradores ocupados e
+as pendentes. Em vez de um socket e do dashboard completo por painel, um
+job calcula o resumo uma vez por intervalo (duas consultas agregadas) e
+guarda o evento SSE já serializado. Cada assinante só espera a próxima
+versão e repete os mesmos bytes, sem acesso ao banco. Um resumo igual ao
+anterior não gera evento; os assinantes recebem apenas um comentário de
+heartbeat, que mantém a conexão aberta e detecta quem desconectou.
+
+Cada assinante ocupa uma conexão aberta: para milhares de painéis em um
+processo use um modo cooperativo (SOCKETIO_ASYNC_MODE=eventlet ou gevent).
+"""
+import json
+import threading
+from app import metricas, pendentes, previsao
+
+# Intervalo de reconexão sugerido ao EventSource
+RECONEXAO_MS = 3000
+
+NOMES_PRIORIDADES = {valor: nome for nome, valor in pendentes.PRIORIDADES.items()}
+
+_resumo = None
+_quadro = None     # último evento SSE, já codificado
+_versao = 0
+_assinantes = 0
+_maximo_assinantes = 5000
+_condicao = threading.Condition()
+
+
+@metricas.indicador('atendimento_painel_assinantes', 'Conexões abertas no painel por SSE')
+def assinantes():
+    with _condicao:
+        return _assinantes
+
+
+def configurar(maximo_assinantes):
+    """Define o número máximo de assinantes simultâneos por processo"""
+    global _maximo_assinantes
+    _maximo_assinantes = int(maximo_assinantes)
+
+
+def calcular():
+    """Resumo da fila e das pendentes (no contexto da aplicação)"""
+    from app.models import db, Colaborador, Solicitacao
+    fila, ocupados, vagas_livres, em_atendimento = db.session.query(
+        db.func.count(),
+        db.func.coalesce(db.func.sum(db.case((Colaborador.esta_em_atendimento == True, 1), else_=0)), 0),
+        db.func.coalesce(db.func.sum(Colaborador.capacidade - Colaborador.atendimentos_ativos), 0),
+        db.func.coalesce(db.func.sum(Colaborador.atendimentos_ativos), 0)
+    ).filter(Colaborador.esta_disponivel == True).one()
+
+    por_prioridade = {nome: 0 for nome in pendentes.PRIORIDADES}
+    mais_antiga = None
+    for prioridade, total, criado_em in db.session.query(
+        Solicitacao.prioridade, db.func.count(), db.func.min(Solicitacao.criado_em)
+    ).filter(Solicitacao.status == 'pendente').group_by(Solicitacao.prioridade):
+        por_prioridade[NOMES_PRIORIDADES.get(prioridade, str(prioridade))] = total
+        if mais_antiga is None or criado_em < mais_antiga:
+            mais_antiga = criado_em
+
+    return {
+        'fila': fila,
+        'ocupados': int(ocupados),
+        'vagas_livres': int(vagas_livres),
+        'em_atendimento': int(em_atendimento),
+        'pendentes': sum(por_prioridade.values()),
+        'pendentes_por_prioridade': por_prioridade,
+        # O painel calcula a idade; assim o resumo só muda com a fila
+        'pendente_mais_antiga_em': mais_antiga.isoformat() + 'Z' if mais_antiga else None,
+        'espera_estimada_segundos': previsao.resumo()['espera_estimada_segundos'],
+    }
+
+
+def atualizar():
+    """Recalcula o resumo e acorda os assinantes se ele mudou"""
+    global _resumo, _quadro, _versao
+    resumo = calcular()
+    if resumo == _resumo:
+        return False
+    dados = json.dumps(resumo, separators=(',', ':'))
+    with _condicao:
+        _versao += 1
+        _resumo = resumo
+        _quadro = f'id: {_versao}\ndata: {dados}\n\n'.encode()
+        _condicao.notify_all()
+    return True
+
+
+def reservar():
+    """Reserva uma vaga de assinante; False se o limite foi atingido"""
+    global _assinantes
+    with _condicao:
+        if _assinantes >= _maximo_assinantes:
+            return False
+        _assinantes += 1
+        return True
+
+
+def sem_acumulo(wsgi_app, caminho='/painel/eventos'):
+    """
+    Middleware WSGI: o servidor do eventlet acumula 4 KB antes de enviar, e
+    cada evento deve sair na hora. Fica por fora do middleware do SocketIO,
+    que repassa ao Flask uma cópia do environ
+    """
+    def aplicacao(environ, start_response):
+        if environ.get('PATH_INFO') == caminho:
+            environ['eventlet.minimum_write_chunk_size'] = 0
+        return wsgi_app(environ, start_response)
+    return aplicacao
+
+
+def liberar():
+    """Devolve a vaga ao encerrar a resposta (Response.call_on_close)"""
+    global _assinantes
+    with _condicao:
+        _assinantes -= 1
+
+
+def transmitir(heartbeat_segundos):
+    """
+    Gerador do corpo da resposta de um assinante (após `reservar`)
+    Envia o último resumo e, a seguir, cada nova versão ou um heartbeat
+    """
+    yield f'retry: {RECONEXAO_MS}\n\n'.encode()
+    versao = 0
+    while True:
+        with _condicao:
+            if _versao == versao or _quadro is None:
+                _condicao.wait(heartbeat_segundos)
+            quadro, atual = _quadro, _versao
+        if quadro and atual != versao:
+            versao = atual
+            yield quadro
+        else:
+            yield b':\n\n'
+
+
+def limpar():
+    # A versão não volta a zero: assinantes abertos continuam válidos
+    global _resumo, _quadro
+    with _condicao:
+        _resumo, _quadro = None, None
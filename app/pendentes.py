@@ -0,0 +1,235 @@
+"""
+Solicitações pendentes ordenadas por prioridade, em um heap por processo
+
+Uma solicitação de prioridade p criada em t é atendida antes de outra se
+t - p * envelhecimento for menor. Como todas envelhecem no mesmo ritmo, a
+chave não muda com o tempo e o heap dispensa reordenações: cada nível de
+prioridade equivale a `envelhecimento` segundos de espera, então uma
+urgente passa à frente das mais novas, mas uma baixa que espera o
+bastante não fica para trás indefinidamente.
+
+O heap é montado do banco no primeiro uso e recarregado periodicamente
+(pendências criadas por outros processos). Entradas já distribuídas por
+outro caminho são descartadas ao serem retiradas.
+
+As mesmas chaves ficam também em uma _Ordem (blocos ordenados com uma
+árvore de Fenwick sobre o tamanho dos blocos), que inclui, remove e
+responde quantas pendentes estão à frente de uma solicitação em O(log n),
+usada pela previsão de espera. Cada solicitação tem uma única chave
+vigente: incluí-la de novo substitui a anterior, e entradas substituídas
+que ainda estejam no heap são ignoradas ao serem retiradas.
+"""
+import bisect
+import heapq
+import itertools
+import threading
+from datetime import datetime
+from app.models import db, Solicitacao
+
+PRIORIDADES = {'baixa': 0, 'normal': 1, 'alta': 2, 'urgente': 3}
+PRIORIDADE_PADRAO = PRIORIDADES['normal']
+
+EPOCA = datetime(2020, 1, 1)
+
+
+class _Ordem:
+    """Multiconjunto ordenado com inclusão, remoção e posição em O(log n)"""
+
+    CARGA = 512
+
+    def __init__(self, valores=()):
+        valores = sorted(valores)
+        self._blocos = [valores[i:i + self.CARGA] for i in range(0, len(valores), self.CARGA)]
+        self._reconstruir()
+
+    def _reconstruir(self):
+        # Árvore de Fenwick sobre o tamanho dos blocos, montada em O(blocos)
+        self._maximos = [bloco[-1] for bloco in self._blocos]
+        arvore = [0] + [len(bloco) for bloco in self._blocos]
+        for i in range(1, len(arvore)):
+            pai = i + (i & -i)
+            if pai < len(arvore):
+                arvore[pai] += arvore[i]
+        self._arvore = arvore
+
+    def _somar(self, bloco, delta):
+        i = bloco + 1
+        while i < len(self._arvore):
+            self._arvore[i] += delta
+            i += i & -i
+
+    def _anteriores(self, bloco):
+        # Quantos valores há nos blocos antes de `bloco`
+        total, i = 0, bloco
+        while i > 0:
+            total += self._arvore[i]
+            i -= i & -i
+        return total
+
+    def incluir(self, valor):
+        if not self._blocos:
+            self._blocos = [[valor]]
+            self._reconstruir()
+            return
+        indice = min(bisect.bisect_left(self._maximos, valor), len(self._blocos) - 1)
+        bloco = self._blocos[indice]
+        bisect.insort(bloco, valor)
+        self._maximos[indice] = bloco[-1]
+        if len(bloco) > 2 * self.CARGA:
+            self._blocos[indice:indice + 1] = [bloco[:self.CARGA], bloco[self.CARGA:]]
+            self._reconstruir()
+        else:
+            self._somar(indice, 1)
+
+    def remover(self, valor):
+        """Remove uma ocorrência de valor; retorna False se não havia"""
+        indice = bisect.bisect_left(self._maximos, valor)
+        if indice == len(self._blocos):
+            return False
+        bloco = self._blocos[indice]
+        posicao = bisect.bisect_left(bloco, valor)
+        if posicao == len(bloco) or bloco[posicao] != valor:
+            return False
+        del bloco[posicao]
+        if bloco:
+            self._maximos[indice] = bloco[-1]
+            self._somar(indice, -1)
+        else:
+            del self._blocos[indice]
+            self._reconstruir()
+        return True
+
+    def posicao(self, valor):
+        """Quantos valores são menores que valor"""
+        indice = bisect.bisect_left(self._maximos, valor)
+        if indice == len(self._blocos):
+            return self._anteriores(indice)
+        return self._anteriores(indice) + bisect.bisect_left(self._blocos[indice], valor)
+
+
+_envelhecimento = 300.0
+_heap = []
+_ordem = _Ordem()  # (chave, seq) vigente de cada solicitação, em ordem
+_chaves = {}   # solicitacao_id -> (chave, seq) vigente
+_sequencia = itertools.count()
+_carregado = False
+_lock = threading.Lock()
+
+
+def configurar(envelhecimento_segundos):
+    """Define quantos segundos de espera equivalem a um nível de prioridade"""
+    global _envelhecimento
+    _envelhecimento = float(envelhecimento_segundos)
+    limpar()
+
+
+def normalizar_prioridade(valor):
+    """Converte o nome ou número recebido da API; levanta ValueError se inválido"""
+    if valor is None or valor == '':
+        return PRIORIDADE_PADRAO
+    if isinstance(valor, str) and valor.lower() in PRIORIDADES:
+        return PRIORIDADES[valor.lower()]
+    try:
+        prioridade = int(valor)
+    except (TypeError, ValueError):
+        prioridade = None
+    if prioridade not in PRIORIDADES.values():
+        raise ValueError(f'Prioridade inválida: {valor} (use {", ".join(PRIORIDADES)})')
+    return prioridade
+
+
+def chave(prioridade, criado_em):
+    return (criado_em - EPOCA).total_seconds() - prioridade * _envelhecimento
+
+
+def _entrada(solicitacao_id, prioridade, criado_em):
+    prioridade = PRIORIDADE_PADRAO if prioridade is None else prioridade
+    return (chave(prioridade, criado_em), next(_sequencia), solicitacao_id, prioridade, criado_em)
+
+
+def _incluir(entrada):
+    anterior = _chaves.get(entrada[2])
+    if anterior is not None:
+        # A chave substituída inflaria a contagem das que estão à frente
+        _ordem.remover(anterior)
+    heapq.heappush(_heap, entrada)
+    _ordem.incluir(entrada[:2])
+    _chaves[entrada[2]] = entrada[:2]
+
+
+def recarregar():
+    """Remonta o heap com as pendentes do banco (usa o índice de status)"""
+    global _heap, _ordem, _chaves, _carregado
+    linhas = db.session.query(
+        Solicitacao.id, Solicitacao.prioridade, Solicitacao.criado_em
+    ).filter(Solicitacao.status == 'pendente').all()
+    heap = [_entrada(*linha) for linha in linhas]
+    heapq.heapify(heap)
+    with _lock:
+        _heap = heap
+        _chaves = {entrada[2]: entrada[:2] for entrada in heap}
+        _ordem = _Ordem(_chaves.values())
+        _carregado = True
+    return len(heap)
+
+
+def _garantir_carregado():
+    if not _carregado:
+        recarregar()
+
+
+def adicionar(solicitacao_id, prioridade, criado_em):
+    """Inclui uma solicitação pendente"""
+    _garantir_carregado()
+    with _lock:
+        _incluir(_entrada(solicitacao_id, prioridade, criado_em))
+
+
+def retirar():
+    """Remove e retorna a entrada mais prioritária (ou None)"""
+    _garantir_carregado()
+    with _lock:
+        while _heap:
+            entrada = heapq.heappop(_heap)
+            if _chaves.get(entrada[2]) == entrada[:2]:
+                del _chaves[entrada[2]]
+                _ordem.remover(entrada[:2])
+                return entrada
+            # Substituída por uma inclusão posterior da mesma solicitação
+        return None
+
+
+def devolver(entrada):
+    """Recoloca uma entrada retirada que não pôde ser distribuída"""
+    with _lock:
+        _incluir(entrada)
+
+
+def tamanho():
+    _garantir_carregado()
+    return len(_chaves)
+
+
+def a_frente(solicitacao_id=None, chave_referencia=None):
+    """
+    Quantas pendentes serão atendidas antes da solicitação (ou de uma chave)
+    Retorna None se a solicitação não está no heap deste processo
+    """
+    _garantir_carregado()
+    with _lock:
+        if solicitacao_id is not None:
+            referencia = _chaves.get(solicitacao_id)
+            if referencia is None:
+                return None
+        else:
+            referencia = (chave_referencia, -1)
+        return _ordem.posicao(referencia)
+
+
+def limpar():
+    global _heap, _ordem, _chaves, _carregado
+    with _lock:
+        _heap = []
+        _ordem = _Ordem()
+        _chaves = {}
+        _carregado = False
@@ -0,0 +1,163 @@
+"""
+Perfil por amostragem do processo em execução
+
+Uma thread nativa lê as pilhas de todas as threads (sys._current_frames)
+a cada intervalo, durante o tempo pedido, e conta as pilhas idênticas.
+O resultado sai no formato de pilhas colapsadas
+("thread;func (arquivo:linha);... contagem"), aceito por flamegraph.pl,
+speedscope e pelo inferno.
+
+A amostragem é de tempo de parede: threads esperando o banco ou um lock
+também aparecem. Nada é instrumentado; o custo fica na thread de
+amostragem e só existe enquanto o perfil está em andamento. Apenas um
+perfil roda por vez.
+
+Nos modos eventlet/gevent os greenlets dividem a thread principal e só o
+que está executando no instante da amostra aparece (os que aguardam I/O
+não são vistos); as threads do pool de banco aparecem normalmente.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from app import concorrencia
+
+PROFUNDIDADE_MAXIMA = 128
+
+_em_andamento = threading.Lock()
+_raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class PerfilEmAndamento(Exception):
+    """Já existe um perfil sendo coletado neste processo"""
+
+
+def _primitivas_nativas():
+    """Módulos _thread e time do sistema operacional, mesmo com monkey patching"""
+    # Uma thread verde só rodaria quando as demais cedessem o controle
+    if concorrencia.modo_cooperativo():
+        if 'eventlet' in sys.modules:
+            from eventlet import patcher
+            if patcher.is_monkey_patched('thread'):
+                return patcher.original('_thread'), patcher.original('time')
+        if 'gevent' in sys.modules:
+            from gevent import monkey
+            if monkey.is_module_patched('threading'):
+                return _Nativo(monkey, '_thread'), _Nativo(monkey, 'time')
+    import _thread
+    return _thread, time
+
+
+class _Nativo:
+    """Atributos originais (anteriores ao monkey patching do gevent) de um módulo"""
+
+    def __init__(self, monkey, modulo):
+        self._monkey, self._modulo = monkey, modulo
+
+    def __getattr__(self, nome):
+        return self._monkey.get_original(self._modulo, nome)
+
+
+def _nome_arquivo(caminho):
+    indice = caminho.rfind('site-packages' + os.sep)
+    if indice >= 0:
+        return caminho[indice + len('site-packages') + 1:]
+    if caminho.startswith(_raiz):
+        return os.path.relpath(caminho, _raiz)
+    return os.path.basename(caminho)
+
+
+class Amostrador:
+    """Coleta as pilhas de todas as threads em intervalos fixos"""
+
+    def __init__(self, intervalo, ignorar=(), nomes=None):
+        self.intervalo = intervalo
+        self.ignorar = set(ignorar)
+        self.nomes = dict(nomes or {})
+        self.pilhas = {}
+        self.amostras = 0
+        self.custo = 0.0
+        self._rotulos = {}
+        self._parar = False
+        self._concluido = False
+
+    def _rotulo(self, codigo):
+        rotulo = self._rotulos.get(codigo)
+        if rotulo is None:
+            nome = getattr(codigo, 'co_qualname', codigo.co_name)
+            rotulo = f'{nome} ({_nome_arquivo(codigo.co_filename)}:{codigo.co_firstlineno})'
+            rotulo = self._rotulos[codigo] = rotulo.replace(';', ':')
+        return rotulo
+
+    def _nomes_threads(self):
+        # Numeração das threads agrupada: "Thread-N (process_request_thread)"
+        nomes = {thread.ident: re.sub(r'\d+', 'N', thread.name)
+                 for thread in threading.enumerate()}
+        nomes.update(self.nomes)
+        return nomes
+
+    def amostrar(self, nomes):
+        inicio = time.perf_counter()
+        for ident, frame in sys._current_frames().items():
+            if ident in self.ignorar:
+                continue
+            pilha = []
+            while frame is not None and len(pilha) < PROFUNDIDADE_MAXIMA:
+                pilha.append(self._rotulo(frame.f_code))
+                frame = frame.f_back
+            pilha.append(nomes.get(ident, 'thread nativa'))
+            chave = ';'.join(reversed(pilha))
+            self.pilhas[chave] = self.pilhas.get(chave, 0) + 1
+        self.amostras += 1
+        self.custo += time.perf_counter() - inicio
+
+    def _executar(self, dormir, ident):
+        self.ignorar.add(ident())
+        nomes = self._nomes_threads()
+        try:
+            while not self._parar:
+                if self.amostras % 100 == 0:
+                    nomes = self._nomes_threads()
+                self.amostrar(nomes)
+                dormir(self.intervalo)
+        finally:
+            self._concluido = True
+
+    def iniciar(self):
+        nativo, tempo = _primitivas_nativas()
+        nativo.start_new_thread(self._executar, (tempo.sleep, nativo.get_ident))
+
+    def parar(self):
+        self._parar = True
+        while not self._concluido:
+            time.sleep(self.intervalo)
+
+    def colapsado(self):
+        """Pilhas no formato colapsado, da mais frequente para a menos"""
+        itens = sorted(self.pilhas.items(), key=lambda item: -item[1])
+        return ''.join(f'{pilha} {total}\n' for pilha, total in itens)
+
+
+def perfilar(segundos, intervalo=0.01):
+    """
+    Amostra o processo por `segundos` e retorna o Amostrador
+    Bloqueia quem chama (sem ocupar a CPU) durante a coleta
+    """
+    if not _em_andamento.acquire(blocking=False):
+        raise PerfilEmAndamento('já existe um perfil em andamento')
+    try:
+        if concorrencia.modo_cooperativo():
+            # Quem chama é um greenlet da thread principal, que continua sendo amostrada
+            nativo, _ = _primitivas_nativas()
+            amostrador = Amostrador(intervalo, nomes={nativo.get_ident(): 'greenlets'})
+        else:
+            amostrador = Amostrador(intervalo, ignorar=(threading.get_ident(),))
+        amostrador.iniciar()
+        try:
+            time.sleep(segundos)
+        finally:
+            amostrador.parar()
+        return amostrador
+    finally:
+        _em_andamento.release()
@@ -0,0 +1,194 @@
+"""
+Auditoria dos planos de consulta das operações mais frequentes
+
+Executa os fluxos da fila, das rotas e das estatísticas em um banco SQLite
+em memória, captura cada SQL emitido e roda EXPLAIN QUERY PLAN sobre ele.
+Uma consulta com filtro (WHERE) ou agregação MIN/MAX que faz varredura
+completa de uma tabela é considerada uma regressão de índice.
+
+Uso: FLASK_ENV=testing flask verificar-planos
+"""
+import re
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import event
+from app.models import db, Colaborador, Solicitacao, Atendimento
+from app.fila import GerenciadorFila
+from app import metricas, monitor_sql, estrategias, previsao, idempotencia, painel, busca
+
+SENHA = 'auditoria'
+
+_RE_SCAN = re.compile(r'^SCAN (\w+)')
+_RE_FILTRO = re.compile(r'\b(WHERE|MAX\(|MIN\()', re.IGNORECASE)
+
+
+@contextmanager
+def capturar_consultas():
+    """Registra (sql, parâmetros) de cada SELECT executado no bloco"""
+    consultas = []
+
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            consultas.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', _antes)
+    try:
+        yield consultas
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', _antes)
+
+
+def varreduras_completas(sql, plano):
+    """Retorna as tabelas varridas por completo em uma consulta que não deveria"""
+    if not _RE_FILTRO.search(sql):
+        return []
+
+    tabelas = set(db.metadata.tables)
+    varridas = []
+    for linha in plano:
+        encontrado = _RE_SCAN.match(linha)
+        if encontrado and encontrado.group(1) in tabelas:
+            varridas.append(encontrado.group(1))
+    return varridas
+
+
+def explicar(sql, parametros):
+    """Retorna as linhas do EXPLAIN QUERY PLAN de uma consulta"""
+    conexao = db.session.connection()
+    resultado = conexao.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}', parametros)
+    return [linha[-1] for linha in resultado]
+
+
+def _popular():
+    """Cria um conjunto mínimo de dados para exercitar os fluxos"""
+    for i in range(4):
+        colaborador = Colaborador(nome=f'Colaborador {i}', email=f'auditoria{i}@empresa.com')
+        colaborador.set_senha(SENHA)
+        db.session.add(colaborador)
+    db.session.commit()
+
+
+def _fluxos():
+    """Fluxos que cobrem as consultas de fila.py, routes.py e models.py"""
+    colaboradores = [c.id for c in Colaborador.query.order_by(Colaborador.id).all()]
+
+    def criar_solicitacao():
+        solicitacao = Solicitacao(descricao='auditoria', status='pendente')
+        db.session.add(solicitacao)
+        db.session.commit()
+        return solicitacao.id
+
+    def fila():
+        for colaborador_id in colaboradores:
+            GerenciadorFila.adicionar_colaborador(colaborador_id)
+        GerenciadorFila.obter_fila_completa()
+        GerenciadorFila.obter_colaboradores_em_atendimento()
+
+    def distribuir_e_finalizar():
+        solicitacao_id = criar_solicitacao()
+        colaborador = GerenciadorFila.distribuir_solicitacao(solicitacao_id)
+        GerenciadorFila.aceitar_atendimento(colaborador.id, solicitacao_id)
+        GerenciadorFila.finalizar_atendimento(colaborador.id, solicitacao_id, 'ok')
+
+    def pular():
+        solicitacao_id = criar_solicitacao()
+        colaborador = GerenciadorFila.distribuir_solicitacao(solicitacao_id)
+        GerenciadorFila.pular_atendimento(colaborador.id, solicitacao_id)
+
+    def timeout():
+        solicitacao_id = criar_solicitacao()
+        GerenciadorFila.distribuir_solicitacao(solicitacao_id)
+        for atendimento in Atendimento.query.filter_by(status='em_atendimento').all():
+            atendimento.inicio = datetime.utcnow() - timedelta(days=1)
+        db.session.commit()
+        GerenciadorFila.verificar_timeouts()
+
+    def paginas():
+        # As mesmas páginas e APIs que verificar-consultas percorre, pelas rotas reais
+        cliente = current_app.test_client()
+        cliente.post('/login', data={'email': 'auditoria0@empresa.com', 'senha': SENHA})
+        for pagina in monitor_sql.PAGINAS:
+            cliente.get(pagina)
+        cliente.get('/api/solicitacoes/busca?q=auditoria')
+        # Indicadores da fila calculados a cada coleta de /metrics
+        metricas.exportar()
+        # Início das médias e recomposição da fila da previsão de espera
+        previsao.limpar()
+        previsao.recarregar()
+        # Resumo do painel de TV (uma vez por intervalo)
+        painel.calcular()
+
+    def estrategias_distribuicao():
+        # Escolha, fila, recebimento, liberação e reentrada em cada estratégia
+        for nome in estrategias.ESTRATEGIAS:
+            with estrategias.usar(nome):
+                distribuir_e_finalizar()
+                GerenciadorFila.obter_fila_completa()
+                GerenciadorFila.remover_colaborador(colaboradores[-1])
+                GerenciadorFila.adicionar_colaborador(colaboradores[-1])
+        estrategias.zerar_tempo_do_dia()
+    
+    def criacao_idempotente():
+        # Repetição com a mesma chave, com e sem o resultado em cache
+        idempotencia.criar_solicitacao(colaboradores[0], 'auditoria', descricao='auditoria')
+        idempotencia.limpar()
+        idempotencia.criar_solicitacao(colaboradores[0], 'auditoria', descricao='auditoria')
+        # Lote com chaves novas, repetidas e já usadas
+        idempotencia.limpar()
+        idempotencia.criar_solicitacoes(colaboradores[0], [
+            ('auditoria', {'descricao': 'auditoria'}),
+            ('lote', {'descricao': 'auditoria'}),
+            ('lote', {'descricao': 'auditoria'}),
+            (None, {'descricao': 'auditoria'}),
+        ])
+    
+    def busca_textual():
+        # Página de resultados: ids pelo índice textual e solicitações pela chave primária
+        busca.buscar('auditoria')
+        _, proximo = busca.buscar('audit', por_pagina=1)
+        busca.buscar('audit', por_pagina=1, apos=proximo)
+    
+    def saida():
+        for colaborador_id in colaboradores:
+            GerenciadorFila.remover_colaborador(colaborador_id)
+
+    return [
+        ('fila', fila),
+        ('distribuir_e_finalizar', distribuir_e_finalizar),
+        ('pular', pular),
+        ('timeout', timeout),
+        ('paginas', paginas),
+        ('estrategias', estrategias_distribuicao),
+        ('idempotencia', criacao_idempotente),
+        ('busca', busca_textual),
+        ('saida', saida),
+    ]
+
+
+def auditar():
+    """
+    Executa os fluxos e retorna uma lista de dicionários com
+    fluxo, sql, plano e tabelas varridas por completo
+    """
+    db.create_all()
+    _popular()
+
+    relatorio = []
+    vistos = set()
+    for nome, fluxo in _fluxos():
+        with capturar_consultas() as consultas:
+            fluxo()
+        for sql, parametros in consultas:
+            if sql in vistos:
+                continue
+            vistos.add(sql)
+            plano = explicar(sql, parametros)
+            relatorio.append({
+                'fluxo': nome,
+                'sql': sql,
+                'plano': plano,
+                'varreduras': varreduras_completas(sql, plano)
+            })
+    db.session.rollback()
+    return relatorio
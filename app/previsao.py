@@ -0,0 +1,215 @@
+"""
+Previsão do tempo de espera das solicitações pendentes
+
+Cada atendimento concluído (Atendimento.finalizar) atualiza, quando a
+transação é confirmada, uma média móvel exponencial da duração, global e
+por colaborador; pulos e timeouts ficam de fora, como na carga inicial, e
+conclusões desfeitas por rollback não contam. Um colaborador na
+fila com capacidade c e duração média d libera c/d atendimentos por
+segundo; a soma dessas taxas (a vazão da fila) é mantida incrementalmente
+a cada conclusão, entrada e saída da fila.
+
+Enquanto houver pendentes todas as vagas estão ocupadas, então a
+solicitação com k pendentes à frente é atendida após k + 1 liberações:
+espera ≈ (k + 1) / vazão. A posição vem da ordem do heap de pendentes
+(app.pendentes); nenhuma consulta ao histórico é feita na leitura.
+
+O estado é por processo: o início usa os últimos atendimentos concluídos
+e um job periódico recompõe os colaboradores na fila a partir do banco.
+"""
+import threading
+from datetime import datetime
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import pendentes
+
+# Atendimentos concluídos usados para iniciar as médias
+AMOSTRA_INICIAL = 500
+
+_alfa = 0.1
+_duracao_global = None
+_duracoes = {}       # colaborador_id -> duração média (segundos)
+_capacidades = {}    # colaborador_id -> capacidade, dos que estão na fila
+_taxa_com_media = 0.0          # soma de c/d de quem tem média própria
+_capacidade_sem_media = 0      # capacidade de quem ainda usa a média global
+_carregado = False
+_lock = threading.Lock()
+
+
+def configurar(alfa):
+    """Define o peso de cada novo atendimento nas médias (0 a 1)"""
+    global _alfa
+    _alfa = float(alfa)
+    limpar()
+
+
+def _media(anterior, valor):
+    return valor if anterior is None else anterior + _alfa * (valor - anterior)
+
+
+def _taxa(colaborador_id, capacidade):
+    return capacidade / max(_duracoes[colaborador_id], 1.0)
+
+
+def registrar(colaborador_id, segundos):
+    """Inclui a duração de um atendimento concluído nas médias"""
+    global _duracao_global, _taxa_com_media, _capacidade_sem_media
+    segundos = max(float(segundos), 0.0)
+    with _lock:
+        _duracao_global = _media(_duracao_global, segundos)
+        capacidade = _capacidades.get(colaborador_id)
+        if capacidade is not None:
+            if colaborador_id in _duracoes:
+                _taxa_com_media -= _taxa(colaborador_id, capacidade)
+            else:
+                _capacidade_sem_media -= capacidade
+        _duracoes[colaborador_id] = _media(_duracoes.get(colaborador_id), segundos)
+        if capacidade is not None:
+            _taxa_com_media += _taxa(colaborador_id, capacidade)
+
+
+def registrar_apos_commit(colaborador_id, segundos):
+    """Registra a duração quando a transação da sessão atual for confirmada"""
+    from app.models import db
+    db.session.info.setdefault('duracoes_concluidas', []).append((colaborador_id, segundos))
+
+
+@event.listens_for(Session, 'after_commit')
+def _registrar_confirmadas(session):
+    """Inclui nas médias as conclusões da transação confirmada"""
+    for colaborador_id, segundos in session.info.pop('duracoes_concluidas', ()):
+        registrar(colaborador_id, segundos)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _descartar_desfeitas(session, previous_transaction):
+    session.info.pop('duracoes_concluidas', None)
+
+
+def _remover(colaborador_id):
+    global _taxa_com_media, _capacidade_sem_media
+    capacidade = _capacidades.pop(colaborador_id, None)
+    if capacidade is None:
+        return
+    if colaborador_id in _duracoes:
+        _taxa_com_media -= _taxa(colaborador_id, capacidade)
+    else:
+        _capacidade_sem_media -= capacidade
+
+
+def _incluir(colaborador_id, capacidade):
+    global _taxa_com_media, _capacidade_sem_media
+    _capacidades[colaborador_id] = capacidade
+    if colaborador_id in _duracoes:
+        _taxa_com_media += _taxa(colaborador_id, capacidade)
+    else:
+        _capacidade_sem_media += capacidade
+
+
+def entrou(colaborador_id, capacidade):
+    """Colaborador entrou na fila (ou mudou de capacidade)"""
+    with _lock:
+        _remover(colaborador_id)
+        _incluir(colaborador_id, max(capacidade or 1, 1))
+
+
+def saiu(colaborador_id):
+    """Colaborador saiu da fila"""
+    with _lock:
+        _remover(colaborador_id)
+
+
+def vazao():
+    """Atendimentos liberados por segundo pela fila atual (0 sem dados)"""
+    with _lock:
+        taxa = _taxa_com_media
+        if _capacidade_sem_media and _duracao_global:
+            taxa += _capacidade_sem_media / max(_duracao_global, 1.0)
+    return max(taxa, 0.0)
+
+
+def _espera(a_frente, taxa):
+    if not taxa:
+        return None
+    return round((a_frente + 1) / taxa, 1)
+
+
+def _garantir_carregado():
+    if not _carregado:
+        recarregar()
+
+
+def estimar(solicitacao_id):
+    """
+    (posição, segundos estimados) de uma solicitação pendente
+    A posição começa em 1; segundos é None sem colaboradores ou histórico
+    """
+    _garantir_carregado()
+    a_frente = pendentes.a_frente(solicitacao_id)
+    if a_frente is None:
+        # Criada por outro processo e ainda não recarregada: vai para o fim
+        a_frente = pendentes.tamanho()
+    return a_frente + 1, _espera(a_frente, vazao())
+
+
+def resumo():
+    """Espera estimada para uma nova solicitação de prioridade normal e a base do cálculo"""
+    _garantir_carregado()
+    taxa = vazao()
+    total = pendentes.tamanho()
+    if total:
+        referencia = pendentes.chave(pendentes.PRIORIDADE_PADRAO, datetime.utcnow())
+        espera = _espera(pendentes.a_frente(chave_referencia=referencia), taxa)
+    else:
+        # Sem pendentes presume-se uma vaga livre
+        espera = 0.0
+    with _lock:
+        duracao = _duracao_global
+        colaboradores = len(_capacidades)
+    return {
+        'espera_estimada_segundos': espera,
+        'pendentes': total,
+        'colaboradores_na_fila': colaboradores,
+        'duracao_media_segundos': round(duracao, 1) if duracao is not None else None,
+        'atendimentos_por_minuto': round(taxa * 60, 2),
+    }
+
+
+def recarregar():
+    """
+    Recompõe os colaboradores na fila a partir do banco (inclusive de outros
+    processos) e, na primeira vez, inicia as médias com os últimos concluídos
+    """
+    global _carregado, _taxa_com_media, _capacidade_sem_media
+    from app.models import db, Colaborador, Atendimento
+    if not _carregado:
+        # Índice (status, inicio): os mais recentes sem ordenar a tabela
+        recentes = db.session.query(Atendimento.colaborador_id, Atendimento.duracao).filter(
+            Atendimento.status == 'concluido'
+        ).order_by(Atendimento.inicio.desc()).limit(AMOSTRA_INICIAL).all()
+        for colaborador_id, duracao in reversed(recentes):
+            if duracao is not None:
+                registrar(colaborador_id, duracao.total_seconds())
+        _carregado = True
+
+    na_fila = db.session.query(Colaborador.id, Colaborador.capacidade).filter(
+        Colaborador.esta_disponivel == True
+    ).all()
+    with _lock:
+        _capacidades.clear()
+        _taxa_com_media = 0.0
+        _capacidade_sem_media = 0
+        for colaborador_id, capacidade in na_fila:
+            _incluir(colaborador_id, max(capacidade or 1, 1))
+    return len(na_fila)
+
+
+def limpar():
+    global _duracao_global, _taxa_com_media, _capacidade_sem_media, _carregado
+    with _lock:
+        _duracao_global = None
+        _duracoes.clear()
+        _capacidades.clear()
+        _taxa_com_media = 0.0
+        _capacidade_sem_media = 0
+        _carregado = False
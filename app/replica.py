@@ -0,0 +1,115 @@
+"""
+Roteamento das consultas de relatório para uma réplica de leitura
+
+As consultas pesadas de estatísticas e listagens usam `sessao_leitura()`,
+que aponta para o bind 'replica' (SQLALCHEMY_BINDS) enquanto ela estiver
+saudável; as mutações da fila continuam sempre no banco principal.
+
+O atraso da réplica é medido por um heartbeat: o processo principal grava
+periodicamente a hora atual em `configuracoes_sistema` e a réplica só é
+usada se o heartbeat lido nela tiver no máximo REPLICA_ATRASO_MAXIMO_SEGUNDOS.
+"""
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import datetime
+from flask import current_app, g
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.models import db, ConfiguracaoSistema
+
+BIND = 'replica'
+CHAVE_HEARTBEAT = '__heartbeat__'
+
+_estado = {'verificado_em': 0.0, 'atraso': None, 'saudavel': False}
+_lock = threading.Lock()
+
+
+def configurada():
+    """Indica se há uma réplica configurada"""
+    return BIND in (current_app.config.get('SQLALCHEMY_BINDS') or {})
+
+
+def sessao_leitura():
+    """
+    Sessão para consultas somente leitura de relatórios
+    Usa a réplica quando ela está dentro do atraso máximo, senão o principal
+    """
+    if not configurada() or not replica_saudavel():
+        return db.session
+    if 'sessao_replica' not in g:
+        g.sessao_replica = Session(bind=db.engines[BIND])
+    return g.sessao_replica
+
+
+def encerrar_sessao(exc=None):
+    """Fecha a sessão da réplica ao final do contexto da aplicação"""
+    sessao = g.pop('sessao_replica', None)
+    if sessao is not None:
+        sessao.close()
+
+
+def medir_atraso():
+    """Retorna o atraso da réplica em segundos (None se indisponível)"""
+    try:
+        with Session(bind=db.engines[BIND]) as sessao:
+            valor = sessao.query(ConfiguracaoSistema.valor).filter_by(
+                chave=CHAVE_HEARTBEAT
+            ).scalar()
+    except SQLAlchemyError:
+        return None
+    if not valor:
+        return None
+    return (datetime.utcnow() - datetime.fromisoformat(valor)).total_seconds()
+
+
+def replica_saudavel():
+    """Verifica (no máximo a cada REPLICA_VERIFICACAO_SEGUNDOS) se a réplica pode ser usada"""
+    agora = time.monotonic()
+    if agora - _estado['verificado_em'] < current_app.config['REPLICA_VERIFICACAO_SEGUNDOS']:
+        return _estado['saudavel']
+
+    with _lock:
+        if agora - _estado['verificado_em'] >= current_app.config['REPLICA_VERIFICACAO_SEGUNDOS']:
+            atraso = medir_atraso()
+            _estado['atraso'] = atraso
+            _estado['saudavel'] = (
+                atraso is not None
+                and atraso <= current_app.config['REPLICA_ATRASO_MAXIMO_SEGUNDOS']
+            )
+            _estado['verificado_em'] = agora
+    return _estado['saudavel']
+
+
+def obter_estado():
+    """Retorna o último estado conhecido da réplica"""
+    return {
+        'configurada': configurada(),
+        'saudavel': _estado['saudavel'],
+        'atraso_segundos': _estado['atraso']
+    }
+
+
+def registrar_heartbeat():
+    """Grava a hora atual no banco principal para medir o atraso da réplica"""
+    agora = datetime.utcnow().isoformat()
+    config = ConfiguracaoSistema.query.filter_by(chave=CHAVE_HEARTBEAT).first()
+    if config:
+        config.valor = agora
+    else:
+        db.session.add(ConfiguracaoSistema(chave=CHAVE_HEARTBEAT, valor=agora,
+                                           descricao='Heartbeat da réplica de leitura'))
+    db.session.commit()
+
+
+def copiar_sqlite():
+    """
+    Copia o banco SQLite principal para o arquivo da réplica (API de backup)
+    Útil em desenvolvimento e testes, onde não há replicação de verdade
+    """
+    origem = db.engines[None].url.database
+    destino = db.engines[BIND].url.database
+    with closing(sqlite3.connect(origem)) as conexao_origem, \
+            closing(sqlite3.connect(destino)) as conexao_destino:
+        conexao_origem.backup(conexao_destino)
@@ -1,10 +1,14 @@
 """
 Rotas principais da aplicação
 """
-from flask import Blueprint, render_template, request, jsonify
+import json
+from datetime import datetime
+from flask import Blueprint, render_template, request, jsonify, current_app, abort, Response, redirect, url_for
 from flask_login import login_required, current_user
 from app.models import db, Colaborador, Solicitacao, Atendimento
 from app.fila import GerenciadorFila
+from app import socketio, replica, metricas, perfilador, ciclo_vida, pendentes, previsao, idempotencia, painel, busca
+from app.auth import eh_administrador
 
 main_bp = Blueprint('main', __name__)
 
@@ -39,7 +43,9 @@ def index():
             colaboradores_atendendo=colaboradores_atendendo,
             solicitacoes_pendentes=solicitacoes_pendentes,
             atendimento_atual=atendimento_atual,
-            estatisticas=estatisticas
+            estatisticas=estatisticas,
+            espera=previsao.resumo(),
+            estimativas={s.id: previsao.estimar(s.id) for s in solicitacoes_pendentes}
         )
     return render_template('login.html')
 
@@ -74,7 +80,9 @@ def dashboard():
         colaboradores_atendendo=colaboradores_atendendo,
         solicitacoes_pendentes=solicitacoes_pendentes,
         atendimento_atual=atendimento_atual,
-        estatisticas=estatisticas
+        estatisticas=estatisticas,
+        espera=previsao.resumo(),
+        estimativas={s.id: previsao.estimar(s.id) for s in solicitacoes_pendentes}
     )
 
 
@@ -85,12 +93,17 @@ def estatisticas():
     # Estatísticas gerais do sistema
     stats_gerais = GerenciadorFila.obter_estatisticas_gerais()
     
+    # Consultas de relatório vão para a réplica de leitura, se configurada
+    sessao = replica.sessao_leitura()
+    
     # Ranking de colaboradores por atendimentos
-    colaboradores = Colaborador.query.all()
+    colaboradores = sessao.query(Colaborador).all()
+    estatisticas_colaboradores = Colaborador.get_estatisticas_todos()
+    vazias = {'total_atendimentos': 0, 'total_pulados': 0, 'tempo_medio_minutos': 0}
     ranking = []
     
     for colaborador in colaboradores:
-        stats = colaborador.get_estatisticas()
+        stats = estatisticas_colaboradores.get(colaborador.id, vazias)
         ranking.append({
             'colaborador': colaborador,
             'total_atendimentos': stats['total_atendimentos'],
@@ -102,7 +115,10 @@ def estatisticas():
     ranking.sort(key=lambda x: x['total_atendimentos'], reverse=True)
     
     # Histórico recente de atendimentos
-    historico = Atendimento.query.filter(
+    historico = sessao.query(Atendimento).options(
+        db.joinedload(Atendimento.colaborador),
+        db.joinedload(Atendimento.solicitacao)
+    ).filter(
         Atendimento.status.in_(['concluido', 'pulado', 'timeout'])
     ).order_by(Atendimento.fim.desc()).limit(20).all()
     
@@ -120,7 +136,7 @@ def listar_solicitacoes():
     """Lista todas as solicitações"""
     status_filtro = request.args.get('status', 'todas')
     
-    query = Solicitacao.query
+    query = replica.sessao_leitura().query(Solicitacao)
     
     if status_filtro != 'todas':
         query = query.filter_by(status=status_filtro)
@@ -148,6 +164,86 @@ def detalhes_solicitacao(solicitacao_id):
     )
 
 
+@main_bp.route('/metrics')
+def metrics():
+    """Métricas no formato de exposição do Prometheus"""
+    if not current_app.config['METRICAS_HABILITADAS']:
+        return Response(status=404)
+    token = current_app.config['METRICAS_TOKEN']
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        abort(401)
+    return Response(metricas.exportar(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+
+def _painel_autorizado():
+    """Colaborador logado ou PAINEL_TOKEN em ?token= (o EventSource não envia cabeçalhos)"""
+    if current_user.is_authenticated:
+        return True
+    token = current_app.config['PAINEL_TOKEN']
+    return bool(token) and token in (
+        request.args.get('token'),
+        request.headers.get('Authorization', '').removeprefix('Bearer ')
+    )
+
+
+@main_bp.route('/painel')
+def painel_tv():
+    """Painel somente leitura para TVs, atualizado por SSE"""
+    if not _painel_autorizado():
+        return redirect(url_for('auth.login'))
+    return render_template('painel.html', token=request.args.get('token', ''))
+
+
+@main_bp.route('/painel/eventos')
+def painel_eventos():
+    """Resumo da fila por Server-Sent Events, o mesmo para todos os assinantes"""
+    if not _painel_autorizado():
+        return jsonify({'sucesso': False, 'mensagem': 'Não autorizado'}), 401
+    if not painel.reservar():
+        return jsonify({'sucesso': False, 'mensagem': 'Limite de painéis conectados atingido'}), 503
+    
+    resposta = Response(painel.transmitir(current_app.config['PAINEL_HEARTBEAT_SEGUNDOS']),
+                        mimetype='text/event-stream')
+    resposta.headers['Cache-Control'] = 'no-cache'
+    # Proxies como o nginx não devem acumular o fluxo
+    resposta.headers['X-Accel-Buffering'] = 'no'
+    resposta.call_on_close(painel.liberar)
+    return resposta
+
+
+@main_bp.route('/admin/perfil')
+def admin_perfil():
+    """
+    Perfil por amostragem do processo durante ?segundos=N
+    Retorna pilhas colapsadas (flamegraph.pl, speedscope)
+    """
+    token = current_app.config['PERFILADOR_TOKEN']
+    if not (token and request.headers.get('Authorization') == f'Bearer {token}'):
+        if not current_user.is_authenticated:
+            abort(401)
+        if not eh_administrador(current_user):
+            abort(403)
+    
+    maximo = current_app.config['PERFILADOR_MAXIMO_SEGUNDOS']
+    segundos = min(max(request.args.get('segundos', 10, type=float), 0.1), maximo)
+    intervalo_ms = max(request.args.get('intervalo_ms', current_app.config['PERFILADOR_INTERVALO_MS'],
+                                        type=float), 1)
+    try:
+        amostrador = perfilador.perfilar(segundos, intervalo_ms / 1000)
+    except perfilador.PerfilEmAndamento as e:
+        return Response(f'{e}\n', status=409, mimetype='text/plain')
+    
+    current_app.logger.info('Perfil: %d amostras em %gs; custo da amostragem %.0f ms',
+                            amostrador.amostras, segundos, amostrador.custo * 1000)
+    resposta = Response(amostrador.colapsado(), mimetype='text/plain; charset=utf-8')
+    resposta.headers['Content-Disposition'] = (
+        f'attachment; filename=perfil-{datetime.utcnow():%Y%m%d-%H%M%S}.folded'
+    )
+    resposta.headers['X-Perfil-Amostras'] = str(amostrador.amostras)
+    resposta.headers['X-Perfil-Custo-Ms'] = f'{amostrador.custo * 1000:.1f}'
+    return resposta
+
+
 # API Endpoints (JSON)
 
 @main_bp.route('/api/fila')
@@ -161,7 +257,9 @@ def api_fila():
             'id': c.id,
             'nome': c.nome,
             'posicao': c.posicao_fila,
-            'em_atendimento': c.esta_em_atendimento
+            'em_atendimento': c.esta_em_atendimento,
+            'atendimentos_ativos': c.atendimentos_ativos,
+            'capacidade': c.capacidade
         } for c in fila]
     })
 
@@ -174,6 +272,13 @@ def api_estatisticas():
     return jsonify(stats)
 
 
+@main_bp.route('/api/estatisticas/etapas')
+@login_required
+def api_estatisticas_etapas():
+    """Percentis da duração de cada etapa do ciclo de vida (JSON, por processo)"""
+    return jsonify(ciclo_vida.resumo())
+
+
 @main_bp.route('/api/minhas-estatisticas')
 @login_required
 def api_minhas_estatisticas():
@@ -196,11 +301,67 @@ def api_solicitacoes_pendentes():
             'descricao': s.descricao,
             'cliente_nome': s.cliente_nome,
             'cliente_telefone': s.cliente_telefone,
+            'prioridade': s.prioridade,
             'criado_em': s.criado_em.isoformat()
         } for s in solicitacoes]
     })
 
 
+@main_bp.route('/api/solicitacoes/busca')
+@login_required
+def api_buscar_solicitacoes():
+    """Busca textual por cliente, telefone ou descrição, ordenada por relevância"""
+    consulta = request.args.get('q', '')
+    if not busca.termos(consulta):
+        return jsonify({'sucesso': False, 'mensagem': 'Informe em q ao menos uma palavra com 2 caracteres'}), 400
+    
+    por_pagina = request.args.get('por_pagina', 20, type=int)
+    if not 1 <= por_pagina <= 100:
+        return jsonify({'sucesso': False, 'mensagem': 'Use por_pagina de 1 a 100'}), 400
+    
+    # Página seguinte: o cursor `proximo` da resposta anterior
+    try:
+        solicitacoes, proximo = busca.buscar(consulta, por_pagina, request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({'sucesso': False, 'mensagem': str(e)}), 400
+    return jsonify({
+        'sucesso': True,
+        'q': consulta,
+        'por_pagina': por_pagina,
+        'tem_mais': proximo is not None,
+        'proximo': proximo,
+        'solicitacoes': [{
+            'id': s.id,
+            'descricao': s.descricao,
+            'cliente_nome': s.cliente_nome,
+            'cliente_telefone': s.cliente_telefone,
+            'status': s.status,
+            'prioridade': s.prioridade,
+            'criado_em': s.criado_em.isoformat()
+        } for s in solicitacoes]
+    })
+
+
+@main_bp.route('/api/solicitacoes/<int:solicitacao_id>/eta')
+@login_required
+def api_solicitacao_eta(solicitacao_id):
+    """Posição e espera estimada de uma solicitação (JSON, sem consultar o histórico)"""
+    solicitacao = db.session.get(Solicitacao, solicitacao_id)
+    if not solicitacao:
+        return jsonify({'sucesso': False, 'mensagem': 'Solicitação não encontrada'}), 404
+    
+    resposta = {
+        'solicitacao_id': solicitacao.id,
+        'status': solicitacao.status,
+        'posicao': None,
+        'espera_estimada_segundos': 0.0,
+    }
+    if solicitacao.status == 'pendente':
+        resposta['posicao'], resposta['espera_estimada_segundos'] = previsao.estimar(solicitacao.id)
+    resposta['fila'] = previsao.resumo()
+    return jsonify(resposta)
+
+
 @main_bp.route('/api/atendimento/atual')
 @login_required
 def api_atendimento_atual():
@@ -208,25 +369,25 @@ def api_atendimento_atual():
     if not current_user.esta_em_atendimento:
         return jsonify({'atendimento': None})
     
-    atendimento = Atendimento.query.filter_by(
+    # Com capacidade maior que 1 pode haver vários; 'atendimento' é o mais antigo
+    atendimentos = Atendimento.query.options(db.joinedload(Atendimento.solicitacao)).filter_by(
         colaborador_id=current_user.id,
         status='em_atendimento'
-    ).first()
+    ).order_by(Atendimento.inicio).all()
     
-    if not atendimento:
-        return jsonify({'atendimento': None})
+    if not atendimentos:
+        return jsonify({'atendimento': None, 'atendimentos': []})
     
-    return jsonify({
-        'atendimento': {
-            'id': atendimento.id,
-            'solicitacao_id': atendimento.solicitacao_id,
-            'descricao': atendimento.solicitacao.descricao,
-            'cliente_nome': atendimento.solicitacao.cliente_nome,
-            'cliente_telefone': atendimento.solicitacao.cliente_telefone,
-            'inicio': atendimento.inicio.isoformat(),
-            'duracao_minutos': atendimento.get_duracao_minutos()
-        }
-    })
+    dados = [{
+        'id': atendimento.id,
+        'solicitacao_id': atendimento.solicitacao_id,
+        'descricao': atendimento.solicitacao.descricao,
+        'cliente_nome': atendimento.solicitacao.cliente_nome,
+        'cliente_telefone': atendimento.solicitacao.cliente_telefone,
+        'inicio': atendimento.inicio.isoformat(),
+        'duracao_minutos': atendimento.get_duracao_minutos()
+    } for atendimento in atendimentos]
+    return jsonify({'atendimento': dados[0], 'atendimentos': dados})
 
 
 # Rotas de ação (POST)
@@ -255,11 +416,31 @@ def api_sair_fila():
         return jsonify({'sucesso': False, 'mensagem': 'Não foi possível sair da fila'}), 400
 
 
+# Campos de texto da criação de solicitações (nulos ficam para as demais validações)
+CAMPOS_TEXTO = ('descricao', 'cliente_nome', 'cliente_telefone')
+
+
+def _erro_de_tipo(dados):
+    """Mensagem se os dados não forem um objeto ou algum campo tiver o tipo errado, ou None"""
+    if not isinstance(dados, dict):
+        return 'Envie um objeto JSON'
+    for campo in CAMPOS_TEXTO:
+        if dados.get(campo) is not None and not isinstance(dados[campo], str):
+            return f'O campo {campo} deve ser texto'
+    prioridade = dados.get('prioridade')
+    if prioridade is not None and (isinstance(prioridade, bool) or not isinstance(prioridade, (int, str))):
+        return 'O campo prioridade deve ser um número inteiro ou o nome do nível'
+    return None
+
+
 @main_bp.route('/api/criar-solicitacao', methods=['POST'])
 @login_required
 def api_criar_solicitacao():
     """Cria uma nova solicitação"""
-    data = request.get_json()
+    data = request.get_json(silent=True)
+    erro = _erro_de_tipo(data)
+    if erro:
+        return jsonify({'sucesso': False, 'mensagem': erro}), 400
     
     descricao = data.get('descricao')
     cliente_nome = data.get('cliente_nome')
@@ -268,32 +449,133 @@ def api_criar_solicitacao():
     if not descricao:
         return jsonify({'sucesso': False, 'mensagem': 'Descrição é obrigatória'}), 400
     
-    # Cria a solicitação
-    solicitacao = Solicitacao(
+    try:
+        prioridade = pendentes.normalizar_prioridade(data.get('prioridade'))
+        chave = idempotencia.normalizar_chave(
+            request.headers.get('Idempotency-Key') or data.get('chave_idempotencia')
+        )
+    except ValueError as e:
+        return jsonify({'sucesso': False, 'mensagem': str(e)}), 400
+    
+    # Cria a solicitação e a inclui na fila de prioridades; uma repetição com
+    # a mesma chave devolve a solicitação da primeira tentativa
+    resultado, repetida = idempotencia.criar_solicitacao(
+        current_user.id, chave,
         descricao=descricao,
         cliente_nome=cliente_nome,
         cliente_telefone=cliente_telefone,
-        status='pendente'
+        prioridade=prioridade
     )
-    db.session.add(solicitacao)
-    db.session.commit()
     
-    # Distribui para o próximo colaborador
-    colaborador = GerenciadorFila.distribuir_solicitacao(solicitacao.id)
-    
-    if colaborador:
-        return jsonify({
+    if resultado['colaborador_id']:
+        resposta = {
             'sucesso': True,
-            'mensagem': f'Solicitação distribuída para {colaborador.nome}',
-            'solicitacao_id': solicitacao.id,
-            'colaborador_id': colaborador.id
-        })
+            'mensagem': f'Solicitação distribuída para {resultado["colaborador_nome"]}',
+            'solicitacao_id': resultado['solicitacao_id'],
+            'colaborador_id': resultado['colaborador_id']
+        }
     else:
-        return jsonify({
+        resposta = {
             'sucesso': True,
             'mensagem': 'Solicitação criada, mas não há colaboradores disponíveis',
-            'solicitacao_id': solicitacao.id
-        })
+            'solicitacao_id': resultado['solicitacao_id']
+        }
+    if repetida:
+        resposta['repetida'] = True
+    return jsonify(resposta)
+
+
+TIPOS_NDJSON = ('application/x-ndjson', 'application/ndjson', 'application/jsonl')
+
+
+def _ler_lote(maximo):
+    """
+    Itens de um array JSON ou de NDJSON (um objeto por linha, lido do fluxo)
+    Linhas NDJSON vêm como bytes e são decodificadas item a item
+    Retorna None se o corpo não for um dos dois formatos
+    """
+    if request.mimetype in TIPOS_NDJSON:
+        itens = []
+        for linha in request.stream:
+            if linha.strip():
+                itens.append(linha)
+                if len(itens) > maximo:
+                    break
+        return itens
+    itens = request.get_json(silent=True)
+    return itens if isinstance(itens, list) else None
+
+
+@main_bp.route('/api/solicitacoes/lote', methods=['POST'])
+@login_required
+def api_criar_solicitacoes_lote():
+    """
+    Cria várias solicitações com um INSERT em lote e uma passada de distribuição
+    Responde com o resultado de cada item, na ordem do envio
+    """
+    maximo = current_app.config['SOLICITACOES_LOTE_MAXIMO']
+    itens = _ler_lote(maximo)
+    if itens is None:
+        return jsonify({'sucesso': False, 'mensagem': 'Envie um array JSON ou NDJSON (application/x-ndjson)'}), 400
+    if len(itens) > maximo:
+        return jsonify({'sucesso': False, 'mensagem': f'Máximo de {maximo} solicitações por lote'}), 413
+    
+    resultados = [None] * len(itens)
+    validos = []
+    for indice, item in enumerate(itens):
+        try:
+            if isinstance(item, bytes):
+                try:
+                    item = json.loads(item)
+                except ValueError:
+                    raise ValueError('JSON inválido')
+            erro = _erro_de_tipo(item)
+            if erro:
+                # Tipo errado é erro do cliente: o lote inteiro é recusado, sem gravar nada
+                return jsonify({'sucesso': False, 'indice': indice, 'mensagem': f'Item {indice}: {erro}'}), 400
+            if not item.get('descricao'):
+                raise ValueError('Descrição é obrigatória')
+            campos = {
+                'descricao': item['descricao'],
+                'cliente_nome': item.get('cliente_nome'),
+                'cliente_telefone': item.get('cliente_telefone'),
+                'prioridade': pendentes.normalizar_prioridade(item.get('prioridade')),
+            }
+            chave = idempotencia.normalizar_chave(item.get('chave_idempotencia'))
+        except ValueError as e:
+            resultados[indice] = {'indice': indice, 'sucesso': False, 'mensagem': str(e)}
+            continue
+        validos.append((indice, chave, campos))
+    
+    criadas = idempotencia.criar_solicitacoes(
+        current_user.id, [(chave, campos) for _, chave, campos in validos]
+    )
+    for (indice, _, _), (resultado, repetida) in zip(validos, criadas):
+        resultados[indice] = {'indice': indice, 'sucesso': True, 'solicitacao_id': resultado['solicitacao_id']}
+        if resultado['colaborador_id']:
+            resultados[indice]['colaborador_id'] = resultado['colaborador_id']
+        if repetida:
+            resultados[indice]['repetida'] = True
+    
+    distribuidas = sum(1 for resultado, repetida in criadas if resultado['colaborador_id'] and not repetida)
+    if distribuidas:
+        # Uma única atualização da fila para o lote inteiro
+        fila = GerenciadorFila.obter_fila_completa()
+        socketio.emit('atualizar_fila', {
+            'fila': [{'id': c.id, 'nome': c.nome, 'posicao': c.posicao_fila, 
+                     'em_atendimento': c.esta_em_atendimento} for c in fila]
+        }, room='geral')
+    
+    repetidas = sum(1 for _, repetida in criadas if repetida)
+    return jsonify({
+        'sucesso': True,
+        'total': len(itens),
+        'criadas': len(criadas) - repetidas,
+        'repetidas': repetidas,
+        'distribuidas': distribuidas,
+        'erros': len(itens) - len(criadas),
+        'resultados': resultados
+    })
 
 
 @main_bp.route('/api/aceitar-atendimento', methods=['POST'])
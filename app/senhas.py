@@ -0,0 +1,129 @@
+"""
+Hash e verificação de senhas fora das threads de requisição
+
+O PBKDF2/scrypt do Werkzeug consome CPU por dezenas de milissegundos. Em
+picos de login (início de turno) isso travaria as mesmas threads que
+atendem o SocketIO, então o cálculo é feito em um pool limitado de
+processos, com limite de requisições na fila. Nos modos cooperativos
+(eventlet/gevent) o pool de processos não funciona com o monkey patching;
+o cálculo vai para o pool de threads nativas, já que o hashlib libera o
+GIL durante o PBKDF2/scrypt.
+"""
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.security import generate_password_hash, check_password_hash
+from app import concorrencia
+
+# Método do Werkzeug usado para novos hashes (None usa o padrão do Werkzeug)
+_metodo = None
+_prefixo_atual = None
+_processos = 0
+_fila_maxima = 0
+_executor = None
+_vagas = None
+_lock = threading.Lock()
+
+
+class FilaSenhasCheia(Exception):
+    """Há mais verificações de senha pendentes do que o limite configurado"""
+
+
+def configurar(metodo=None, processos=0, fila_maxima=64):
+    """
+    Configura o método de hash e o pool de processos
+    Com processos=0 o cálculo é feito na própria thread (ex: scripts)
+    """
+    global _metodo, _prefixo_atual, _processos, _fila_maxima, _vagas
+    encerrar()
+    _metodo = metodo
+    # O Werkzeug completa os parâmetros padrão do método no prefixo; calculado
+    # uma vez aqui para que a comparação no login não dependa do pool
+    _prefixo_atual = _gerar_local('').split('$', 1)[0]
+    _processos = processos
+    _fila_maxima = fila_maxima
+    _vagas = threading.BoundedSemaphore(fila_maxima) if processos and fila_maxima else None
+    
+    if processos and not concorrencia.modo_cooperativo():
+        _obter_executor()
+
+
+def _obter_executor():
+    """
+    Cria o pool de processos
+    Com fork todos os processos são criados de uma vez, na primeira tarefa;
+    por isso o pool é aquecido já na configuração, antes de existirem
+    outras threads (agendador, requisições) no processo principal
+    """
+    global _executor
+    with _lock:
+        if _executor is None:
+            if 'fork' in multiprocessing.get_all_start_methods():
+                contexto = multiprocessing.get_context('fork')
+                _executor = ProcessPoolExecutor(_processos, mp_context=contexto)
+                _executor.submit(int).result()
+            else:
+                # Sem fork (Windows) o hashlib libera o GIL durante o cálculo
+                _executor = ThreadPoolExecutor(_processos)
+        return _executor
+
+
+def _executar(func, *args):
+    """Executa no pool respeitando o limite da fila"""
+    if not _processos:
+        return func(*args)
+
+    if _vagas is not None and not _vagas.acquire(blocking=False):
+        raise FilaSenhasCheia()
+    try:
+        if concorrencia.modo_cooperativo():
+            return concorrencia.executar_bloqueante(func, *args)
+        futuro = _obter_executor().submit(func, *args)
+        return concorrencia.executar_bloqueante(futuro.result)
+    except BrokenProcessPool:
+        # Um processo morreu: descarta o pool e calcula nesta thread
+        encerrar()
+        return func(*args)
+    finally:
+        if _vagas is not None:
+            _vagas.release()
+
+
+def _gerar_local(senha):
+    if _metodo:
+        return generate_password_hash(senha, _metodo)
+    return generate_password_hash(senha)
+
+
+def gerar_hash(senha):
+    """Gera o hash da senha com o método configurado"""
+    if _metodo:
+        return _executar(generate_password_hash, senha, _metodo)
+    return _executar(generate_password_hash, senha)
+
+
+def verificar(senha_hash, senha):
+    """Verifica se a senha corresponde ao hash"""
+    return _executar(check_password_hash, senha_hash, senha)
+
+
+def hash_desatualizado(senha_hash):
+    """Indica se o hash foi gerado com parâmetros diferentes dos atuais"""
+    global _prefixo_atual
+    if _prefixo_atual is None:
+        _prefixo_atual = _gerar_local('').split('$', 1)[0]
+    return senha_hash.split('$', 1)[0] != _prefixo_atual
+
+
+def encerrar():
+    """Encerra o pool de processos"""
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+atexit.register(encerrar)
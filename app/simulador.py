@@ -0,0 +1,473 @@
+"""
+Simulador de eventos discretos da fila de atendimento
+
+O modelo é ajustado do histórico com agregações no próprio banco (uma
+consulta por grupo, sem percorrer as linhas no Python): taxa de chegada
+por hora da semana, proporção de prioridades, probabilidade de pulo e de
+timeout por atendimento e duração (lognormal pelos momentos) de
+atendimentos concluídos e pulados.
+
+A simulação avança um relógio simulado de evento em evento e aplica as
+regras de distribuição do GerenciadorFila em estruturas em memória
+(_FilaEmMemoria): pendentes em um heap pela chave de envelhecimento de
+app.pendentes, colaboradores com vaga em um heap pela chave e com os
+ganchos da própria estratégia (app.estrategias, com agregados e relógio
+da simulação), e pulo ou timeout devolvendo a solicitação às pendentes
+antes de redistribuir, sem voltar para quem a liberou. Cada distribuição,
+inclusive as redistribuições, ganha seu desfecho: conclusão, pulo ou
+timeout (colaborador que não responde, ou atendimento mais longo que o
+timeout candidato).
+
+Para conferência, executar(orm=True) roda o GerenciadorFila real em um
+SQLite em memória separado do banco da aplicação: antes de cada
+encerramento o início do atendimento é recuado pela duração simulada, e
+as distribuições são capturadas pelo ouvinte de fila.ao_distribuir. Com a
+mesma semente as duas execuções sorteiam na mesma ordem e distribuem as
+mesmas solicitações aos mesmos colaboradores. Só menor_tempo_hoje pode
+desempatar diferente: o modo ORM registra timeouts 1 s mais longos e
+acumula o tempo no dia do relógio real, e não no dia simulado.
+
+Uso: flask simular --agentes 5 10 15 --timeouts 10 20 --dias 14
+"""
+import heapq
+import itertools
+import math
+import random
+import time
+from datetime import datetime, timedelta
+from flask import Flask
+from sqlalchemy import extract
+from sqlalchemy.pool import StaticPool
+from app.models import db, Colaborador, Solicitacao, Atendimento
+from app.fila import GerenciadorFila, ao_distribuir
+from app import configuracoes, pendentes, previsao, ciclo_vida, estrategias, escrita_adiada, idempotencia
+
+# Um domingo à meia-noite: a hora da semana simulada é dia_da_semana * 24 + hora,
+# a mesma numeração de EXTRACT(dow) (0 = domingo)
+INICIO = datetime(2023, 1, 1)
+HORAS_SEMANA = 168
+
+_simulacao = None
+
+
+@ao_distribuir
+def _registrar_distribuicao(dados, colaborador_id):
+    if _simulacao is not None:
+        _simulacao.novas.append((dados['solicitacao_id'], colaborador_id))
+
+
+class _Agente:
+    """As colunas de Colaborador que as estratégias leem e alteram"""
+
+    def __init__(self, colaborador_id, capacidade):
+        self.id = colaborador_id
+        self.capacidade = capacidade
+        self.peso = 1
+        self.atendimentos_ativos = 0
+        self.posicao_fila = 0
+        self.liberado_em = None
+        self.segundos_atendimento_hoje = 0
+        self.dia_atendimento = None
+        self.passe = 0.0
+        self.versao = 0
+
+
+class _Encerrado:
+    """O que Estrategia.ao_liberar lê do atendimento"""
+
+    def __init__(self, fim, duracao):
+        self.fim = fim
+        self.duracao = duracao
+
+
+class _FilaEmMemoria:
+    """
+    As regras de distribuição do GerenciadorFila sobre heaps em memória
+    A ordem e os ganchos são os da própria estratégia (app.estrategias),
+    com os agregados da fila calculados aqui e o relógio simulado
+    """
+
+    def __init__(self, estrategia, agentes, capacidade, distribuida):
+        self.estrategia = type(estrategias.ESTRATEGIAS[estrategia])(fila=self)
+        self._distribuida = distribuida
+        self.agentes = {colaborador_id: _Agente(colaborador_id, capacidade)
+                        for colaborador_id in range(1, agentes + 1)}
+        self._livres = []       # (ordem da estratégia, id, versão) de quem tem vaga
+        self._pendentes = []    # (chave, seq, solicitacao_id)
+        self._solicitacoes = {}  # solicitacao_id -> (prioridade, criado_em)
+        self._sequencia = itertools.count()
+        for agente in self.agentes.values():
+            self._entrar(agente)
+
+    def ultima_posicao(self):
+        return max(agente.posicao_fila for agente in self.agentes.values())
+
+    def menor_passe(self, colaborador_id):
+        passes = [agente.passe for agente in self.agentes.values()
+                  if agente.id != colaborador_id and agente.atendimentos_ativos < agente.capacidade]
+        return min(passes) if passes else None
+
+    def _atualizar(self, agente):
+        # Entradas antigas do heap ficam com versão vencida e são descartadas;
+        # o id desempata como o índice
+        agente.versao += 1
+        if agente.atendimentos_ativos < agente.capacidade:
+            heapq.heappush(self._livres, (self.estrategia.chave(agente) + (agente.id,),
+                                          agente.id, agente.versao))
+
+    def _proximo(self, excluir=None):
+        retirada = None
+        escolhido = None
+        while self._livres:
+            _, colaborador_id, versao = self._livres[0]
+            if versao != self.agentes[colaborador_id].versao:
+                heapq.heappop(self._livres)
+            elif colaborador_id == excluir:
+                retirada = heapq.heappop(self._livres)
+            else:
+                escolhido = self.agentes[colaborador_id]
+                break
+        if retirada:
+            heapq.heappush(self._livres, retirada)
+        return escolhido
+
+    def _entrar(self, agente):
+        # GerenciadorFila.adicionar_colaborador
+        agente.posicao_fila = self.ultima_posicao() + 1
+        self.estrategia.ao_entrar(agente, INICIO)
+        self._atualizar(agente)
+
+    def _distribuir(self, agora, excluir=None):
+        # excluir: (solicitacao_id, colaborador_id) de um pulo ou timeout
+        adiadas = []
+        while self._pendentes and self._proximo() is not None:
+            entrada = heapq.heappop(self._pendentes)
+            solicitacao_id = entrada[2]
+            agente = self._proximo(excluir[1] if excluir and excluir[0] == solicitacao_id else None)
+            if agente is None:
+                adiadas.append(entrada)
+                continue
+            agente.atendimentos_ativos += 1
+            self.estrategia.ao_receber(agente, None)
+            self._atualizar(agente)
+            self._distribuida(agora, solicitacao_id, agente.id)
+        for entrada in adiadas:
+            heapq.heappush(self._pendentes, entrada)
+
+    def _incluir(self, solicitacao_id):
+        prioridade, criado_em = self._solicitacoes[solicitacao_id]
+        heapq.heappush(self._pendentes, (pendentes.chave(prioridade, criado_em),
+                                         next(self._sequencia), solicitacao_id))
+
+    def enfileirar(self, agora, solicitacao_id, prioridade, criado_em):
+        """GerenciadorFila.enfileirar"""
+        self._solicitacoes[solicitacao_id] = (prioridade, criado_em)
+        self._incluir(solicitacao_id)
+        self._distribuir(agora)
+
+    def encerrar(self, agora, tipo, solicitacao_id, colaborador_id, duracao):
+        """finalizar_atendimento, pular_atendimento ou processar_timeout"""
+        agente = self.agentes[colaborador_id]
+        agente.atendimentos_ativos = max(agente.atendimentos_ativos - 1, 0)
+        relogio = INICIO + timedelta(seconds=agora)
+        self.estrategia.ao_liberar(agente, _Encerrado(relogio, timedelta(seconds=duracao)), relogio)
+        self._atualizar(agente)
+        if tipo == 'conclusao':
+            del self._solicitacoes[solicitacao_id]
+            self._distribuir(agora)
+        else:
+            # Volta às pendentes com a mesma chave (prioridade e criação), sem
+            # voltar para quem a liberou
+            self._incluir(solicitacao_id)
+            self._distribuir(agora, (solicitacao_id, colaborador_id))
+
+
+def _lognormal(total, media, quadrado):
+    """Parâmetros da lognormal com a média e a variância observadas"""
+    if not total or not media or media <= 0:
+        return None
+    variancia = max((quadrado or 0) - media * media, 0.0)
+    sigma2 = math.log(1 + variancia / (media * media))
+    return {'mu': math.log(media) - sigma2 / 2, 'sigma': math.sqrt(sigma2),
+            'media_segundos': round(media, 1), 'amostras': total}
+
+
+def _ocorrencias_por_hora(inicio, fim):
+    """Quantas vezes cada hora da semana aparece no período"""
+    ocorrencias = [0] * HORAS_SEMANA
+    hora = inicio.replace(minute=0, second=0, microsecond=0)
+    while hora <= fim:
+        ocorrencias[(hora.isoweekday() % 7) * 24 + hora.hour] += 1
+        hora += timedelta(hours=1)
+    return ocorrencias
+
+
+def ajustar(dias=None):
+    """
+    Ajusta o modelo aos últimos `dias` do histórico (todo o histórico se None)
+    Retorna um dicionário serializável em JSON
+    """
+    ultimo = db.session.query(db.func.max(Solicitacao.criado_em)).scalar()
+    if ultimo is None:
+        raise ValueError('Não há solicitações no histórico para ajustar o modelo')
+    if dias:
+        desde = ultimo - timedelta(days=dias)
+    else:
+        desde = db.session.query(db.func.min(Solicitacao.criado_em)).scalar()
+
+    dia_semana = extract('dow', Solicitacao.criado_em)
+    hora = extract('hour', Solicitacao.criado_em)
+    por_hora = db.session.query(dia_semana, hora, db.func.count(Solicitacao.id)).filter(
+        Solicitacao.criado_em >= desde
+    ).group_by(dia_semana, hora).all()
+    ocorrencias = _ocorrencias_por_hora(desde, ultimo)
+    chegadas = [0.0] * HORAS_SEMANA
+    for dia, hora_do_dia, total in por_hora:
+        indice = int(dia) * 24 + int(hora_do_dia)
+        chegadas[indice] = total / max(ocorrencias[indice], 1)
+
+    prioridades = dict(db.session.query(Solicitacao.prioridade, db.func.count(Solicitacao.id)).filter(
+        Solicitacao.criado_em >= desde
+    ).group_by(Solicitacao.prioridade).all())
+    total_solicitacoes = sum(prioridades.values())
+
+    duracao = extract('epoch', Atendimento.fim) - extract('epoch', Atendimento.inicio)
+    por_status = {
+        status: (total, media, quadrado)
+        for status, total, media, quadrado in db.session.query(
+            Atendimento.status, db.func.count(Atendimento.id),
+            db.func.avg(duracao), db.func.avg(duracao * duracao)
+        ).filter(Atendimento.fim.isnot(None), Atendimento.inicio >= desde).group_by(Atendimento.status)
+    }
+    total_atendimentos = sum(total for total, _, _ in por_status.values())
+    if not total_atendimentos or 'concluido' not in por_status:
+        raise ValueError('Não há atendimentos concluídos no período para ajustar as durações')
+
+    def _float(valores):
+        total, media, quadrado = valores
+        return total, float(media or 0), float(quadrado or 0)
+
+    return {
+        'periodo': {'inicio': desde.isoformat(), 'fim': ultimo.isoformat()},
+        'solicitacoes': total_solicitacoes,
+        'atendimentos': total_atendimentos,
+        'chegadas_por_hora': [round(taxa, 4) for taxa in chegadas],
+        'prioridades': {str(p): round(total / total_solicitacoes, 4)
+                        for p, total in sorted(prioridades.items())},
+        'probabilidades': {
+            'pulo': round(por_status.get('pulado', (0,))[0] / total_atendimentos, 4),
+            'timeout': round(por_status.get('timeout', (0,))[0] / total_atendimentos, 4),
+        },
+        'duracao_atendimento': _lognormal(*_float(por_status['concluido'])),
+        'duracao_pulo': _lognormal(*_float(por_status['pulado'])) if 'pulado' in por_status else None,
+        'timeout_minutos': configuracoes.timeout_minutos(),
+        'estrategia': estrategias.atual().nome,
+    }
+
+
+def app_isolada(app):
+    """Aplicação com as configurações de `app` e um SQLite em memória próprio"""
+    simulacao = Flask('simulador')
+    simulacao.config.update(app.config)
+    simulacao.config.update(
+        SQLALCHEMY_DATABASE_URI='sqlite://',
+        SQLALCHEMY_BINDS={},
+        SQLALCHEMY_ENGINE_OPTIONS={'poolclass': StaticPool,
+                                   'connect_args': {'check_same_thread': False}},
+    )
+    db.init_app(simulacao)
+    return simulacao
+
+
+def _percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return round(ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))], 1)
+
+
+def _limpar_estado():
+    """Estado por processo que a simulação alimenta"""
+    configuracoes.limpar()
+    pendentes.limpar()
+    previsao.limpar()
+    ciclo_vida.limpar()
+    escrita_adiada.limpar()
+    idempotencia.limpar()
+
+
+class Simulacao:
+    """Uma rodada: `agentes` colaboradores, um timeout candidato e `dias` de chegadas"""
+
+    def __init__(self, modelo, agentes, timeout_minutos, dias, capacidade=1,
+                 estrategia=None, semente=42):
+        self.modelo = modelo
+        self.agentes = agentes
+        self.timeout = timeout_minutos * 60
+        self.horizonte = dias * 86400
+        self.capacidade = capacidade
+        self.estrategia = estrategia or modelo.get('estrategia') or estrategias.PADRAO
+        self.rng = random.Random(semente)
+        self.novas = []
+        self._eventos = []
+        self._sequencia = itertools.count()
+
+    def _agendar(self, instante, tipo, *dados):
+        heapq.heappush(self._eventos, (instante, next(self._sequencia), tipo) + dados)
+
+    def _chegadas(self):
+        """Processo de Poisson com taxa constante em cada hora da semana"""
+        taxas = self.modelo['chegadas_por_hora']
+        for hora in range(math.ceil(self.horizonte / 3600)):
+            taxa = taxas[hora % HORAS_SEMANA] / 3600
+            if taxa <= 0:
+                continue
+            instante = hora * 3600 + self.rng.expovariate(taxa)
+            while instante < min((hora + 1) * 3600, self.horizonte):
+                self._agendar(instante, 'chegada')
+                instante += self.rng.expovariate(taxa)
+
+    def _prioridade(self):
+        sorteio, acumulado = self.rng.random(), 0.0
+        for prioridade, fracao in self.modelo['prioridades'].items():
+            acumulado += fracao
+            if sorteio < acumulado:
+                return int(prioridade)
+        return pendentes.PRIORIDADE_PADRAO
+
+    def _duracao(self, parametros):
+        return self.rng.lognormvariate(parametros['mu'], parametros['sigma'])
+
+    def _desfecho(self, agora, solicitacao_id, colaborador_id):
+        """Sorteia como termina um atendimento que acabou de ser distribuído"""
+        probabilidades = self.modelo['probabilidades']
+        sorteio = self.rng.random()
+        if sorteio < probabilidades['timeout']:
+            tipo, duracao = 'timeout', self.timeout
+        elif sorteio < probabilidades['timeout'] + probabilidades['pulo'] and self.modelo['duracao_pulo']:
+            tipo, duracao = 'pulo', self._duracao(self.modelo['duracao_pulo'])
+        else:
+            tipo, duracao = 'conclusao', self._duracao(self.modelo['duracao_atendimento'])
+        if duracao >= self.timeout:
+            # O job de timeouts encerra antes do colaborador
+            tipo, duracao = 'timeout', self.timeout
+        self._agendar(agora + duracao, tipo, solicitacao_id, colaborador_id, duracao)
+        self.ocupado += min(duracao, max(self.horizonte - agora, 0))
+
+    def _recuar_inicio(self, solicitacao_id, colaborador_id, segundos):
+        Atendimento.query.filter_by(
+            solicitacao_id=solicitacao_id, colaborador_id=colaborador_id, status='em_atendimento'
+        ).update({'inicio': datetime.utcnow() - timedelta(seconds=segundos)})
+        db.session.commit()
+
+    def _preparar(self):
+        db.drop_all()
+        db.create_all()
+        _limpar_estado()
+        configuracoes.definir(configuracoes.TIMEOUT_MINUTOS, str(self.timeout // 60))
+        for numero in range(self.agentes):
+            colaborador = Colaborador(nome=f'Agente {numero + 1}', email=f'agente{numero + 1}@simulacao',
+                                      capacidade=self.capacidade)
+            colaborador.senha_hash = '-'
+            db.session.add(colaborador)
+        db.session.commit()
+        for colaborador_id, in db.session.query(Colaborador.id).all():
+            GerenciadorFila.adicionar_colaborador(colaborador_id)
+
+    def _distribuida(self, agora, solicitacao_id, colaborador_id):
+        self.contagem['distribuicoes'] += 1
+        self.primeira_distribuicao.setdefault(solicitacao_id, agora - self.chegadas[solicitacao_id])
+        self._desfecho(agora, solicitacao_id, colaborador_id)
+
+    def _executar_em_memoria(self):
+        fila = _FilaEmMemoria(self.estrategia, self.agentes, self.capacidade, self._distribuida)
+        proximo_id = itertools.count(1)
+        while self._eventos and self._eventos[0][0] < self.horizonte:
+            agora, _, tipo, *dados = heapq.heappop(self._eventos)
+            if tipo == 'chegada':
+                solicitacao_id = next(proximo_id)
+                self.chegadas[solicitacao_id] = agora
+                fila.enfileirar(agora, solicitacao_id, self._prioridade(),
+                                INICIO + timedelta(seconds=agora))
+            else:
+                solicitacao_id, colaborador_id, duracao = dados
+                self.contagem[tipo] += 1
+                if tipo == 'conclusao':
+                    self.concluidas.append(agora - self.chegadas[solicitacao_id])
+                fila.encerrar(agora, tipo, solicitacao_id, colaborador_id, duracao)
+
+    def _executar_orm(self):
+        global _simulacao
+        _simulacao = self
+        try:
+            self._preparar()
+            while self._eventos and self._eventos[0][0] < self.horizonte:
+                agora, _, tipo, *dados = heapq.heappop(self._eventos)
+                if tipo == 'chegada':
+                    solicitacao = Solicitacao(descricao='simulação', status='pendente',
+                                              prioridade=self._prioridade(),
+                                              criado_em=INICIO + timedelta(seconds=agora))
+                    db.session.add(solicitacao)
+                    db.session.commit()
+                    self.chegadas[solicitacao.id] = agora
+                    GerenciadorFila.enfileirar(solicitacao)
+                else:
+                    solicitacao_id, colaborador_id, duracao = dados
+                    self.contagem[tipo] += 1
+                    if tipo == 'timeout':
+                        self._recuar_inicio(solicitacao_id, colaborador_id, self.timeout + 1)
+                        GerenciadorFila.processar_timeout(colaborador_id, solicitacao_id)
+                    elif tipo == 'pulo':
+                        self._recuar_inicio(solicitacao_id, colaborador_id, duracao)
+                        GerenciadorFila.pular_atendimento(colaborador_id, solicitacao_id)
+                    else:
+                        self._recuar_inicio(solicitacao_id, colaborador_id, duracao)
+                        GerenciadorFila.finalizar_atendimento(colaborador_id, solicitacao_id)
+                        self.concluidas.append(agora - self.chegadas[solicitacao_id])
+
+                for solicitacao_id, colaborador_id in self.novas:
+                    self._distribuida(agora, solicitacao_id, colaborador_id)
+                del self.novas[:]
+        finally:
+            _simulacao = None
+            db.session.remove()
+            _limpar_estado()
+
+    def executar(self, orm=False):
+        """
+        Executa a rodada e retorna o resumo
+        Com `orm`, usa o GerenciadorFila real em um SQLite em memória (requer
+        o contexto de app_isolada; bem mais lento, para conferência)
+        """
+        inicio_real = time.perf_counter()
+        self.ocupado = 0.0
+        self.chegadas, self.primeira_distribuicao, self.concluidas = {}, {}, []
+        self.contagem = dict.fromkeys(('distribuicoes', 'conclusao', 'pulo', 'timeout'), 0)
+
+        with estrategias.usar(self.estrategia):
+            self._chegadas()
+            if orm:
+                self._executar_orm()
+            else:
+                self._executar_em_memoria()
+
+        esperas = list(self.primeira_distribuicao.values())
+        distribuicoes = self.contagem['distribuicoes'] or 1
+        return {
+            'agentes': self.agentes,
+            'capacidade': self.capacidade,
+            'timeout_minutos': self.timeout // 60,
+            'estrategia': self.estrategia,
+            'dias': self.horizonte / 86400,
+            'solicitacoes': len(self.chegadas),
+            'concluidas': len(self.concluidas),
+            'sem_atendimento': len(self.chegadas) - len(self.primeira_distribuicao),
+            'espera_p50_segundos': _percentil(esperas, 50),
+            'espera_p90_segundos': _percentil(esperas, 90),
+            'espera_p99_segundos': _percentil(esperas, 99),
+            'total_p90_segundos': _percentil(self.concluidas, 90),
+            'taxa_pulo': round(self.contagem['pulo'] / distribuicoes, 4),
+            'taxa_timeout': round(self.contagem['timeout'] / distribuicoes, 4),
+            'utilizacao': round(self.ocupado / (self.agentes * self.capacidade * self.horizonte), 4),
+            'segundos_execucao': round(time.perf_counter() - inicio_real, 1),
+        }
@@ -6,6 +6,7 @@ from flask_socketio import emit, join_room, leave_room
 from flask_login import current_user
 from app.models import db, Colaborador, Solicitacao, Atendimento
 from app.fila import GerenciadorFila
+from app import pendentes, idempotencia
 
 
 def register_socket_events(socketio):
@@ -92,42 +93,42 @@ def register_socket_events(socketio):
             emit('erro', {'mensagem': 'Descrição é obrigatória'})
             return
         
-        # Cria a solicitação
-        solicitacao = Solicitacao(
+        try:
+            prioridade = pendentes.normalizar_prioridade(data.get('prioridade'))
+            chave = idempotencia.normalizar_chave(data.get('chave_idempotencia'))
+        except ValueError as e:
+            emit('erro', {'mensagem': str(e)})
+            return
+        
+        # Cria a solicitação e a inclui na fila de prioridades; o colaborador que
+        # a recebe é notificado pelo ouvinte de distribuição (ver create_app).
+        # Uma repetição com a mesma chave só recebe de novo a resposta original
+        resultado, repetida = idempotencia.criar_solicitacao(
+            current_user.id, chave,
             descricao=descricao,
             cliente_nome=cliente_nome,
             cliente_telefone=cliente_telefone,
-            status='pendente'
+            prioridade=prioridade
         )
-        db.session.add(solicitacao)
-        db.session.commit()
-        
-        # Distribui para o próximo colaborador
-        colaborador = GerenciadorFila.distribuir_solicitacao(solicitacao.id)
         
-        if colaborador:
-            # Notifica o colaborador que recebeu a solicitação
-            socketio.emit('nova_solicitacao_recebida', {
-                'solicitacao_id': solicitacao.id,
-                'descricao': solicitacao.descricao,
-                'cliente_nome': solicitacao.cliente_nome,
-                'cliente_telefone': solicitacao.cliente_telefone,
-                'timeout_minutos': 20
-            }, room=f'colaborador_{colaborador.id}')
-            
-            # Atualiza a fila para todos
-            fila = GerenciadorFila.obter_fila_completa()
-            socketio.emit('atualizar_fila', {
-                'fila': [{'id': c.id, 'nome': c.nome, 'posicao': c.posicao_fila, 
-                         'em_atendimento': c.esta_em_atendimento} for c in fila]
-            }, room='geral')
+        if resultado['colaborador_id']:
+            if not repetida:
+                # Atualiza a fila para todos
+                fila = GerenciadorFila.obter_fila_completa()
+                socketio.emit('atualizar_fila', {
+                    'fila': [{'id': c.id, 'nome': c.nome, 'posicao': c.posicao_fila, 
+                             'em_atendimento': c.esta_em_atendimento} for c in fila]
+                }, room='geral')
             
             emit('solicitacao_criada', {
-                'mensagem': f'Solicitação distribuída para {colaborador.nome}',
-                'solicitacao_id': solicitacao.id
+                'mensagem': f'Solicitação distribuída para {resultado["colaborador_nome"]}',
+                'solicitacao_id': resultado['solicitacao_id'],
+                'repetida': repetida
             })
         else:
             emit('aviso', {
+                'solicitacao_id': resultado['solicitacao_id'],
+                'repetida': repetida,
                 'mensagem': 'Solicitação criada, mas não há colaboradores disponíveis na fila'
             })
     
@@ -225,18 +226,7 @@ def register_socket_events(socketio):
         )
         
         if proximo_colaborador:
-            # Busca a solicitação atualizada
-            solicitacao = Solicitacao.query.get(solicitacao_id)
-            
-            # Notifica o próximo colaborador
-            socketio.emit('nova_solicitacao_recebida', {
-                'solicitacao_id': solicitacao.id,
-                'descricao': solicitacao.descricao,
-                'cliente_nome': solicitacao.cliente_nome,
-                'cliente_telefone': solicitacao.cliente_telefone,
-                'timeout_minutos': 20
-            }, room=f'colaborador_{proximo_colaborador.id}')
-            
+            # O próximo colaborador já foi notificado pelo ouvinte de distribuição
             # Atualiza a fila para todos
             fila = GerenciadorFila.obter_fila_completa()
             socketio.emit('atualizar_fila', {
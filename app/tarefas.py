@@ -0,0 +1,155 @@
+"""
+Jobs periódicos do agendador (APScheduler)
+
+Timeouts, sincronização de configurações, pendentes, previsão de espera,
+escrita adiada, painel, virada do dia e heartbeat da réplica. Cada job abre
+o próprio contexto da aplicação e registra a falha sem derrubar o agendador.
+"""
+from app.fila import GerenciadorFila
+from app import (socketio, scheduler, configuracoes, replica, metricas, pendentes, estrategias,
+                 previsao, escrita_adiada, painel)
+
+
+def agendar(app):
+    """Registra os jobs e inicia o agendador (uma vez por processo)"""
+    def verificar_timeouts_job():
+        """Job para verificar timeouts periodicamente"""
+        with app.app_context():
+            try:
+                resultados = GerenciadorFila.verificar_timeouts()
+                if resultados:
+                    metricas.TIMEOUTS.incrementar(quantidade=len(resultados))
+                    print(f'Timeouts processados: {len(resultados)}')
+                    # Notifica via SocketIO sobre os timeouts
+                    for resultado in resultados:
+                        socketio.emit('timeout_processado', resultado, 
+                                    room=f'colaborador_{resultado["proximo_colaborador"]}')
+            except Exception as e:
+                print(f'Erro ao verificar timeouts: {e}')
+    
+    def sincronizar_configuracoes_job():
+        """Job para recarregar configurações alteradas por outros processos"""
+        with app.app_context():
+            try:
+                configuracoes.sincronizar()
+            except Exception as e:
+                print(f'Erro ao sincronizar configurações: {e}')
+    
+    def distribuir_pendentes_job():
+        """Job para recarregar as pendentes (inclusive de outros processos) e distribuí-las"""
+        with app.app_context():
+            try:
+                pendentes.recarregar()
+                distribuidas = GerenciadorFila.distribuir_pendentes()
+                if distribuidas:
+                    print(f'Pendentes distribuídas: {len(distribuidas)}')
+            except Exception as e:
+                print(f'Erro ao distribuir pendentes: {e}')
+    
+    def recarregar_previsao_job():
+        """Job para recompor os colaboradores na fila usados pela previsão de espera"""
+        with app.app_context():
+            try:
+                previsao.recarregar()
+            except Exception as e:
+                print(f'Erro ao recarregar a previsão de espera: {e}')
+    
+    def gravar_escrita_adiada_job():
+        """Job para gravar em lote os horários e observações adiados"""
+        with app.app_context():
+            try:
+                escrita_adiada.descarregar()
+            except Exception as e:
+                print(f'Erro ao gravar a escrita adiada: {e}')
+    
+    def atualizar_painel_job():
+        """Job para recalcular o resumo do painel enquanto houver assinantes"""
+        if not painel.assinantes():
+            return
+        with app.app_context():
+            try:
+                painel.atualizar()
+            except Exception as e:
+                print(f'Erro ao atualizar o painel: {e}')
+    
+    def zerar_tempo_do_dia_job():
+        """Job para zerar o tempo de atendimento do dia anterior (estratégia menor_tempo_hoje)"""
+        with app.app_context():
+            try:
+                estrategias.zerar_tempo_do_dia()
+            except Exception as e:
+                print(f'Erro ao zerar o tempo de atendimento do dia: {e}')
+    
+    def heartbeat_replica_job():
+        """Job para gravar o heartbeat usado na medição do atraso da réplica"""
+        with app.app_context():
+            try:
+                replica.registrar_heartbeat()
+                if app.config['REPLICA_SQLITE_COPIA_SEGUNDOS']:
+                    replica.copiar_sqlite()
+            except Exception as e:
+                print(f'Erro ao atualizar réplica: {e}')
+    
+    # Agenda verificação de timeouts a cada minuto
+    if not scheduler.running:
+        scheduler.add_job(
+            func=verificar_timeouts_job,
+            trigger='interval',
+            minutes=1,
+            id='verificar_timeouts',
+            replace_existing=True
+        )
+        scheduler.add_job(
+            func=sincronizar_configuracoes_job,
+            trigger='interval',
+            seconds=app.config['CONFIGURACOES_INTERVALO_SEGUNDOS'],
+            id='sincronizar_configuracoes',
+            replace_existing=True
+        )
+        scheduler.add_job(
+            func=distribuir_pendentes_job,
+            trigger='interval',
+            seconds=app.config['PENDENTES_RECARGA_SEGUNDOS'],
+            id='distribuir_pendentes',
+            replace_existing=True
+        )
+        scheduler.add_job(
+            func=recarregar_previsao_job,
+            trigger='interval',
+            seconds=app.config['PREVISAO_RECARGA_SEGUNDOS'],
+            id='recarregar_previsao',
+            replace_existing=True
+        )
+        scheduler.add_job(
+            func=gravar_escrita_adiada_job,
+            trigger='interval',
+            seconds=app.config['ESCRITA_ADIADA_INTERVALO_SEGUNDOS'],
+            id='gravar_escrita_adiada',
+            replace_existing=True
+        )
+        scheduler.add_job(
+            func=atualizar_painel_job,
+            trigger='interval',
+            seconds=app.config['PAINEL_INTERVALO_SEGUNDOS'],
+            id='atualizar_painel',
+            replace_existing=True
+        )
+        # De hora em hora (UTC): vira o dia à meia-noite mesmo após uma parada
+        scheduler.add_job(
+            func=zerar_tempo_do_dia_job,
+            trigger='cron',
+            minute=0,
+            timezone='UTC',
+            id='zerar_tempo_do_dia',
+            replace_existing=True
+        )
+        if app.config['SQLALCHEMY_BINDS'].get(replica.BIND):
+            scheduler.add_job(
+                func=heartbeat_replica_job,
+                trigger='interval',
+                seconds=app.config['REPLICA_SQLITE_COPIA_SEGUNDOS']
+                or app.config['REPLICA_HEARTBEAT_SEGUNDOS'],
+                id='heartbeat_replica',
+                replace_existing=True
+            )
+        scheduler.start()
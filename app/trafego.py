@@ -0,0 +1,113 @@
+"""
+Captura do tráfego da fila para reprodução (benchmarks/replay_trafego.py)
+
+Grava um período de `solicitacoes` e `atendimentos` em JSON Lines
+compactado com gzip, sem dados de clientes: ids viram índices (colaborador
+1..N, na ordem em que aparecem) e instantes viram segundos desde o início
+do período. A primeira linha é o cabeçalho; as demais são eventos em ordem
+de tempo:
+
+- ["e", t, colaborador]  entrada na fila
+- ["x", t, colaborador]  saída da fila
+- ["c", t, solicitacao, prioridade, tentativas]  chegada
+
+`tentativas` são os atendimentos da solicitação, em ordem:
+[colaborador, status, distribuição, aceite, encerramento], com a
+distribuição em segundos após a chegada e o aceite e o encerramento em
+segundos após a distribuição (None se não aconteceram). Status: c
+concluído, p pulado, t timeout, a em andamento ao fim do período.
+
+Entradas e saídas da fila não ficam no banco e são inferidas por sessões:
+o colaborador entra um segundo antes do primeiro atendimento e sai um
+segundo após o último; um intervalo sem atendimento maior que
+`intervalo_sessao` encerra a sessão.
+"""
+import gzip
+import json
+from app.models import Colaborador, Solicitacao, Atendimento
+from app import configuracoes, replica
+
+VERSAO = 1
+STATUS = {'concluido': 'c', 'pulado': 'p', 'timeout': 't', 'em_atendimento': 'a'}
+
+
+def _segundos(inicio, instante):
+    return round((instante - inicio).total_seconds(), 3) if instante else None
+
+
+def _sessoes(intervalos, intervalo_sessao):
+    """Junta os intervalos (inicio, fim) ordenados de um colaborador em sessões"""
+    sessoes = []
+    for inicio, fim in intervalos:
+        if sessoes and inicio - sessoes[-1][1] <= intervalo_sessao:
+            sessoes[-1][1] = max(sessoes[-1][1], fim)
+        else:
+            sessoes.append([inicio, fim])
+    return sessoes
+
+
+def capturar(arquivo, desde, ate, intervalo_sessao=1800):
+    """
+    Grava em `arquivo` as solicitações criadas em [desde, ate) e seus atendimentos
+    Retorna a contagem de colaboradores, solicitações e atendimentos
+    """
+    sessao = replica.sessao_leitura()
+    duracao = _segundos(desde, ate)
+    periodo = (Solicitacao.criado_em >= desde, Solicitacao.criado_em < ate)
+
+    chegadas = {}
+    for solicitacao_id, criado_em, prioridade in sessao.query(
+        Solicitacao.id, Solicitacao.criado_em, Solicitacao.prioridade
+    ).filter(*periodo).order_by(Solicitacao.criado_em, Solicitacao.id):
+        chegadas[solicitacao_id] = [_segundos(desde, criado_em), len(chegadas) + 1, prioridade, []]
+
+    indices = {}
+    intervalos = {}
+    atendimentos = 0
+    for solicitacao_id, colaborador_id, status, inicio, aceito_em, fim in sessao.query(
+        Atendimento.solicitacao_id, Atendimento.colaborador_id, Atendimento.status,
+        Atendimento.inicio, Atendimento.aceito_em, Atendimento.fim
+    ).join(Solicitacao, Solicitacao.id == Atendimento.solicitacao_id).filter(
+        *periodo
+    ).order_by(Atendimento.inicio, Atendimento.id):
+        chegada = chegadas[solicitacao_id]
+        colaborador = indices.setdefault(colaborador_id, len(indices) + 1)
+        distribuicao = _segundos(desde, inicio)
+        encerrado = fim if fim is not None and fim < ate else None
+        chegada[3].append([colaborador, STATUS.get(status, 'a') if encerrado else 'a',
+                           round(distribuicao - chegada[0], 3),
+                           _segundos(inicio, aceito_em), _segundos(inicio, encerrado)])
+        fim_intervalo = _segundos(desde, encerrado) if encerrado else duracao
+        intervalos.setdefault(colaborador, []).append((distribuicao, fim_intervalo))
+        atendimentos += 1
+
+    eventos = [['c', t, indice, prioridade, tentativas]
+               for t, indice, prioridade, tentativas in chegadas.values()]
+    for colaborador, lista in intervalos.items():
+        for inicio, fim in _sessoes(sorted(lista), intervalo_sessao):
+            eventos.append(['e', max(round(inicio - 1, 3), 0.0), colaborador])
+            if fim + 1 < duracao:
+                eventos.append(['x', round(fim + 1, 3), colaborador])
+    # No mesmo instante, entradas antes das chegadas e saídas por último
+    ordem = {'e': 0, 'c': 1, 'x': 2}
+    eventos.sort(key=lambda evento: (evento[1], ordem[evento[0]]))
+
+    capacidades = dict(sessao.query(Colaborador.id, Colaborador.capacidade).filter(
+        Colaborador.id.in_(list(indices))
+    )) if indices else {}
+    cabecalho = {
+        'versao': VERSAO,
+        'inicio': desde.isoformat(),
+        'fim': ate.isoformat(),
+        'duracao_segundos': duracao,
+        'capacidades': [capacidades.get(colaborador_id) or 1
+                        for colaborador_id in sorted(indices, key=indices.get)],
+        'solicitacoes': len(chegadas),
+        'atendimentos': atendimentos,
+        'timeout_minutos': configuracoes.timeout_minutos(),
+        'intervalo_sessao': intervalo_sessao,
+    }
+    with gzip.open(arquivo, 'wt', encoding='utf-8') as saida:
+        for linha in [cabecalho] + eventos:
+            saida.write(json.dumps(linha, separators=(',', ':')) + '\n')
+    return {'colaboradores': len(indices), 'solicitacoes': len(chegadas), 'atendimentos': atendimentos}
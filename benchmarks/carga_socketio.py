@@ -0,0 +1,278 @@
+"""
+Teste de carga de ponta a ponta pelo SocketIO
+
+Sobe o servidor em um subprocesso (como os demais benchmarks, para que os
+clientes não disputem o mesmo processo) e simula:
+
+- agentes: fazem login, entram na fila, recebem 'nova_solicitacao_recebida',
+  pulam (com probabilidade --taxa-pulo) ou aceitam e finalizam após um tempo
+  de atendimento exponencial;
+- produtores: enviam 'nova_solicitacao' em chegadas de Poisson com a taxa
+  total --chegadas (solicitações por segundo).
+
+Relata a vazão, a latência entre o envio da solicitação e a notificação do
+agente (p50/p95/p99) e as contagens de erros.
+
+Uso:
+    pip install aiohttp
+    python benchmarks/carga_socketio.py --agentes 200 --produtores 5 --chegadas 20 --segundos 60
+    python benchmarks/carga_socketio.py --modo eventlet --agentes 500 --chegadas 50
+
+Para dimensionar o hardware, rode o servidor na máquina alvo com os
+colaboradores criados por `flask gerar-dados --colaboradores N --solicitacoes 0`
+(senha 'senha123') e aponte os clientes para ele com --url.
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import aiohttp
+import socketio
+
+from comum import percentil, servidor
+
+# Hash barato: o teste mede a fila, não o login
+METODO_SENHA = 'pbkdf2:sha256:1000'
+
+PREPARO = '''
+import random
+from app import dados_sinteticos
+from app.models import Colaborador
+dados_sinteticos.gerar_colaboradores(random.Random(0), {total})
+Colaborador.query.update({{'capacidade': {capacidade}}})
+db.session.commit()
+'''
+
+
+class Estatisticas:
+    """Contadores e amostras compartilhados pelos clientes simulados"""
+
+    def __init__(self):
+        self.enviadas = {}
+        self.latencias = []
+        self.notificacoes = 0
+        self.redistribuicoes = 0
+        self.aceitas = 0
+        self.finalizadas = 0
+        self.puladas = 0
+        self.sem_colaborador = 0
+        self.erros = {}
+        self.encerrado = False
+
+    def erro(self, tipo):
+        self.erros[tipo] = self.erros.get(tipo, 0) + 1
+
+
+async def login(url, indice):
+    """Faz login com o colaborador `indice` e retorna o cabeçalho Cookie da sessão"""
+    async with aiohttp.ClientSession() as sessao:
+        async with sessao.post(f'{url}/login', allow_redirects=False, data={
+            'email': f'colab{indice}@sintetico.local',
+            'senha': 'senha123'
+        }) as resposta:
+            await resposta.read()
+            if resposta.status != 302:
+                raise RuntimeError(f'login falhou ({resposta.status})')
+            # O cookie jar do aiohttp ignora cookies de endereços IP
+            cookies = resposta.cookies
+    return '; '.join(f'{nome}={cookie.value}' for nome, cookie in cookies.items())
+
+
+async def conectar(url, indice):
+    """Faz login com o colaborador `indice` e abre a conexão SocketIO com a sessão"""
+    cabecalho = await login(url, indice)
+    cliente = socketio.AsyncClient(reconnection=False)
+    try:
+        await asyncio.wait_for(
+            cliente.connect(url, headers={'Cookie': cabecalho}, transports=['websocket']), 10
+        )
+    except Exception:
+        await cliente.disconnect()
+        raise
+    return cliente
+
+
+async def emitir(cliente, estatisticas, evento, dados):
+    """Envia um evento do agente, ignorando os que chegam durante o encerramento"""
+    if estatisticas.encerrado:
+        return
+    try:
+        await cliente.emit(evento, dados)
+    except socketio.exceptions.BadNamespaceError:
+        estatisticas.erro('desconectado')
+
+
+def configurar_agente(cliente, estatisticas, rng, taxa_pulo, atendimento_ms):
+    """Registra o comportamento do agente simulado e retorna o evento de entrada na fila"""
+    na_fila = asyncio.Event()
+    cliente.on('entrou_fila', lambda dados: na_fila.set())
+
+    @cliente.on('nova_solicitacao_recebida')
+    async def recebida(dados):
+        agora = time.perf_counter()
+        enviada = estatisticas.enviadas.pop(dados['descricao'], None)
+        if enviada is not None:
+            estatisticas.latencias.append(agora - enviada)
+            estatisticas.notificacoes += 1
+        else:
+            estatisticas.redistribuicoes += 1
+
+        evento = 'pular_atendimento' if rng.random() < taxa_pulo else 'aceitar_atendimento'
+        await emitir(cliente, estatisticas, evento, {'solicitacao_id': dados['solicitacao_id']})
+
+    @cliente.on('atendimento_aceito')
+    async def aceito(dados):
+        estatisticas.aceitas += 1
+        await asyncio.sleep(rng.expovariate(1000 / atendimento_ms))
+        await emitir(cliente, estatisticas, 'finalizar_atendimento',
+                     {'solicitacao_id': dados['solicitacao_id']})
+
+    @cliente.on('atendimento_finalizado')
+    def finalizado(dados):
+        estatisticas.finalizadas += 1
+
+    @cliente.on('atendimento_pulado')
+    def pulado(dados):
+        estatisticas.puladas += 1
+
+    @cliente.on('erro')
+    def erro(dados):
+        estatisticas.erro(dados.get('mensagem', 'erro'))
+
+    return na_fila
+
+
+async def produzir(cliente, estatisticas, rng, taxa, parar, prefixo):
+    """Envia solicitações em chegadas de Poisson até receber o sinal de parada"""
+    cliente.on('aviso', lambda dados: setattr(
+        estatisticas, 'sem_colaborador', estatisticas.sem_colaborador + 1))
+    cliente.on('erro', lambda dados: estatisticas.erro(dados.get('mensagem', 'erro')))
+
+    numero = 0
+    while not parar.is_set():
+        await asyncio.sleep(rng.expovariate(taxa))
+        numero += 1
+        descricao = f'carga {prefixo}-{numero}'
+        estatisticas.enviadas[descricao] = time.perf_counter()
+        try:
+            await cliente.emit('nova_solicitacao', {'descricao': descricao,
+                                                    'cliente_nome': 'Cliente de carga'})
+        except Exception:
+            estatisticas.erro('envio')
+
+
+async def abrir_clientes(url, indices, estatisticas, lote=20):
+    """Conecta os clientes em lotes, contando as falhas"""
+    clientes = []
+    for i in range(0, len(indices), lote):
+        resultado = await asyncio.gather(
+            *[conectar(url, indice) for indice in indices[i:i + lote]], return_exceptions=True
+        )
+        for item in resultado:
+            if isinstance(item, Exception):
+                estatisticas.erro('conexao')
+            else:
+                clientes.append(item)
+    return clientes
+
+
+async def simular(url, args, estatisticas):
+    """Conecta os clientes, monta a fila e gera a carga; retorna a duração da medição"""
+    total = args.agentes + args.produtores
+    rng = random.Random(args.semente)
+    agentes = await abrir_clientes(url, list(range(1, args.agentes + 1)), estatisticas)
+    produtores = await abrir_clientes(url, list(range(args.agentes + 1, total + 1)), estatisticas)
+
+    # Cada entrada na fila é anunciada a todos; a medição começa depois delas
+    entradas = []
+    for cliente in agentes:
+        entradas.append(configurar_agente(cliente, estatisticas, random.Random(rng.random()),
+                                          args.taxa_pulo, args.atendimento_ms))
+        await cliente.emit('entrar_fila')
+    inicio = time.perf_counter()
+    try:
+        await asyncio.wait_for(asyncio.gather(*[e.wait() for e in entradas]), 120)
+    except asyncio.TimeoutError:
+        estatisticas.erro('entrada_fila')
+    print(f'{len(agentes)} agentes e {len(produtores)} produtores conectados; '
+          f'fila montada em {time.perf_counter() - inicio:.1f}s')
+    await asyncio.sleep(1)
+
+    parar = asyncio.Event()
+    taxa_por_produtor = args.chegadas / max(len(produtores), 1)
+    tarefas = [
+        asyncio.create_task(produzir(cliente, estatisticas, random.Random(rng.random()),
+                                     taxa_por_produtor, parar, indice))
+        for indice, cliente in enumerate(produtores)
+    ]
+    inicio = time.perf_counter()
+    await asyncio.sleep(args.segundos)
+    parar.set()
+    await asyncio.gather(*tarefas)
+    duracao = time.perf_counter() - inicio
+
+    # Espera as notificações e atendimentos em andamento terminarem
+    await asyncio.sleep(args.dreno)
+    estatisticas.encerrado = True
+    await asyncio.gather(*[c.disconnect() for c in agentes + produtores], return_exceptions=True)
+    return duracao
+
+
+def relatar(estatisticas, duracao):
+    enviadas = estatisticas.notificacoes + len(estatisticas.enviadas)
+    latencias = estatisticas.latencias
+    print(f'duração {duracao:.1f}s | enviadas {enviadas} ({enviadas / duracao:.1f}/s) | '
+          f'notificadas {estatisticas.notificacoes} | aceitas {estatisticas.aceitas} | '
+          f'finalizadas {estatisticas.finalizadas} ({estatisticas.finalizadas / duracao:.1f}/s) | '
+          f'puladas {estatisticas.puladas} | redistribuições {estatisticas.redistribuicoes}')
+    print(f'envio -> notificação: p50 {percentil(latencias, 50) * 1000:.1f} ms | '
+          f'p95 {percentil(latencias, 95) * 1000:.1f} ms | '
+          f'p99 {percentil(latencias, 99) * 1000:.1f} ms | '
+          f'máx {max(latencias or [0]) * 1000:.1f} ms')
+    sem_notificacao = len(estatisticas.enviadas) - estatisticas.sem_colaborador
+    print(f'sem colaborador {estatisticas.sem_colaborador} | sem notificação '
+          f'{max(sem_notificacao, 0)} | erros {estatisticas.erros or 0}')
+
+
+async def executar(args):
+    """Executa o teste contra um servidor local novo ou contra --url"""
+    estatisticas = Estatisticas()
+    if args.url:
+        duracao = await simular(args.url, args, estatisticas)
+    else:
+        total = args.agentes + args.produtores
+        async with servidor(args.porta, args.modo, preparo=PREPARO.format(total=total, capacidade=args.capacidade),
+                            SENHA_METODO=METODO_SENHA, SENHA_PROCESSOS=0) as processo:
+            print(f'servidor local ({args.modo})')
+            duracao = await simular(processo.url, args, estatisticas)
+    relatar(estatisticas, duracao)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--agentes', type=int, default=200)
+    parser.add_argument('--produtores', type=int, default=5)
+    parser.add_argument('--chegadas', type=float, default=20,
+                        help='Solicitações por segundo (total)')
+    parser.add_argument('--atendimento-ms', type=float, default=2000,
+                        help='Tempo médio de atendimento')
+    parser.add_argument('--taxa-pulo', type=float, default=0.1)
+    parser.add_argument('--capacidade', type=int, default=1,
+                        help='Atendimentos simultâneos por agente (servidor local)')
+    parser.add_argument('--segundos', type=float, default=30)
+    parser.add_argument('--dreno', type=float, default=5,
+                        help='Espera após a última chegada antes de encerrar')
+    parser.add_argument('--modo', default='threading', choices=['threading', 'eventlet', 'gevent'])
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--porta', type=int, default=5097)
+    parser.add_argument('--url', help='Servidor já em execução (colaboradores de flask gerar-dados)')
+    args = parser.parse_args()
+    if args.produtores < 1:
+        parser.error('é preciso ao menos um produtor')
+
+    asyncio.run(executar(args))
+
+
+if __name__ == '__main__':
+    main()
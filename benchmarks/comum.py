@@ -0,0 +1,103 @@
+"""
+Funções compartilhadas pelos benchmarks
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+
+import socketio
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SERVIDOR = '''
+import os, sys
+modo = os.environ['SOCKETIO_ASYNC_MODE']
+if modo == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch()
+elif modo == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+sys.path.insert(0, {raiz!r})
+from app import create_app, socketio, shutdown_scheduler
+from app.models import db
+app = create_app()
+with app.app_context():
+    db.create_all()
+{preparo}
+socketio.run(app, host='127.0.0.1', port=int(os.environ['PORT']),
+             debug=False, use_reloader=False, log_output=False,
+             allow_unsafe_werkzeug=True)
+'''
+
+
+def ler_status_processo(pid):
+    """Retorna (threads, memória RSS em MB) do processo"""
+    threads, rss = 0, 0.0
+    with open(f'/proc/{pid}/status') as arquivo:
+        for linha in arquivo:
+            if linha.startswith('Threads:'):
+                threads = int(linha.split()[1])
+            elif linha.startswith('VmRSS:'):
+                rss = int(linha.split()[1]) / 1024
+    return threads, rss
+
+
+def percentil(valores, p):
+    """Percentil simples por ordenação"""
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+async def aguardar_servidor(url, limite=30):
+    """Aguarda o servidor começar a aceitar conexões"""
+    inicio = time.time()
+    while time.time() - inicio < limite:
+        cliente = socketio.AsyncClient()
+        try:
+            await cliente.connect(url, transports=['websocket'])
+            await cliente.disconnect()
+            return True
+        except Exception:
+            await cliente.disconnect()
+            await asyncio.sleep(0.2)
+    return False
+
+
+@asynccontextmanager
+async def servidor(porta, modo='threading', preparo='', **env_extra):
+    """
+    Sobe a aplicação em um subprocesso com um banco SQLite temporário
+    `preparo` é código executado dentro do contexto da aplicação antes de servir
+    """
+    banco = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+    env = dict(os.environ,
+               SOCKETIO_ASYNC_MODE=modo,
+               PORT=str(porta),
+               FLASK_ENV='development',
+               # O monitor de SQL (ligado em development) soma custo a cada consulta medida
+               SQL_MONITOR='false',
+               DATABASE_URL=f'sqlite:///{banco.name}',
+               **{k: str(v) for k, v in env_extra.items()})
+    preparo = '\n'.join('    ' + linha for linha in preparo.strip().splitlines())
+    codigo = SERVIDOR.format(raiz=RAIZ, preparo=f'with app.app_context():\n{preparo}' if preparo else '')
+    processo = subprocess.Popen([sys.executable, '-c', codigo], env=env, cwd=RAIZ,
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f'http://127.0.0.1:{porta}'
+    try:
+        if not await aguardar_servidor(url):
+            raise RuntimeError(f'Servidor ({modo}) não iniciou')
+        processo.url = url
+        yield processo
+    finally:
+        processo.terminate()
+        processo.wait()
+        for sufixo in ('', '-wal', '-shm'):
+            if os.path.exists(banco.name + sufixo):
+                os.unlink(banco.name + sufixo)
@@ -0,0 +1,88 @@
+"""
+Benchmark de conexões SocketIO simultâneas por processo
+
+Sobe o servidor em um subprocesso para cada modo assíncrono informado,
+abre N conexões de clientes e mede quantas foram aceitas, o tempo de
+resposta a um evento enviado por todos ao mesmo tempo, e o consumo de
+threads e memória do servidor.
+
+Uso:
+    pip install aiohttp
+    python benchmarks/conexoes_socketio.py --modos threading eventlet gevent --conexoes 200 1000
+"""
+import argparse
+import asyncio
+import time
+
+import socketio
+
+from comum import ler_status_processo, percentil, servidor
+
+
+async def medir(url, total_conexoes, lote=50):
+    """Abre as conexões em lotes e mede o tempo de resposta a um evento"""
+    clientes = []
+    falhas = 0
+
+    async def conectar():
+        cliente = socketio.AsyncClient(reconnection=False)
+        try:
+            await asyncio.wait_for(cliente.connect(url, transports=['websocket']), 10)
+            return cliente
+        except Exception:
+            await cliente.disconnect()
+            return None
+
+    for i in range(0, total_conexoes, lote):
+        resultado = await asyncio.gather(*[conectar() for _ in range(min(lote, total_conexoes - i))])
+        clientes.extend(c for c in resultado if c)
+        falhas += sum(1 for c in resultado if c is None)
+
+    # Todos os clientes enviam um evento ao mesmo tempo (resposta 'erro' sem login)
+    latencias = []
+
+    async def ida_e_volta(cliente):
+        recebido = asyncio.Event()
+        cliente.on('erro', lambda dados: recebido.set())
+        inicio = time.perf_counter()
+        await cliente.emit('obter_estatisticas')
+        try:
+            await asyncio.wait_for(recebido.wait(), 30)
+            latencias.append(time.perf_counter() - inicio)
+        except asyncio.TimeoutError:
+            pass
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*[ida_e_volta(c) for c in clientes])
+    duracao = time.perf_counter() - inicio
+
+    return clientes, falhas, latencias, duracao
+
+
+async def executar_modo(modo, total_conexoes, porta):
+    """Executa o benchmark para um modo assíncrono"""
+    async with servidor(porta, modo) as processo:
+        clientes, falhas, latencias, duracao = await medir(processo.url, total_conexoes)
+        threads, rss = ler_status_processo(processo.pid)
+        print(f'{modo:>10} | conexões {len(clientes):>5}/{total_conexoes:<5} | falhas {falhas:>4} | '
+              f'threads {threads:>5} | RSS {rss:7.1f} MB | '
+              f'p50 {percentil(latencias, 50) * 1000:7.1f} ms | '
+              f'p99 {percentil(latencias, 99) * 1000:7.1f} ms | '
+              f'eventos/s {len(latencias) / duracao if duracao else 0:8.1f}')
+        await asyncio.gather(*[c.disconnect() for c in clientes], return_exceptions=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--modos', nargs='+', default=['threading', 'eventlet', 'gevent'])
+    parser.add_argument('--conexoes', nargs='+', type=int, default=[100, 500])
+    parser.add_argument('--porta', type=int, default=5099)
+    args = parser.parse_args()
+
+    for total in args.conexoes:
+        for modo in args.modos:
+            asyncio.run(executar_modo(modo, total, args.porta))
+
+
+if __name__ == '__main__':
+    main()
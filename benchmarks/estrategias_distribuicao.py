@@ -0,0 +1,221 @@
+"""
+Custo e justiça das estratégias de distribuição (app.estrategias)
+
+Para cada estratégia, coloca --agentes colaboradores na fila e simula um
+relógio: solicitações chegam a uma taxa que mantém a ocupação média em
+--ocupacao e cada atendimento dura um tempo exponencial multiplicado pela
+velocidade do colaborador (uns são mais lentos que outros). As chegadas e
+os encerramentos passam pelo GerenciadorFila real, na ordem do relógio
+simulado; o início de cada atendimento é recuado pela duração simulada
+antes de finalizar, para que o tempo acumulado no dia seja o simulado.
+
+Mede o tempo e as consultas SQL de cada distribuição e liberação e, por
+colaborador, atendimentos recebidos, tempo ocupado e ociosidade entre
+liberar uma vaga e receber o próximo atendimento. A justiça é o índice
+de Jain (1 = todos iguais; 1/n = um só recebe tudo), também ponderado
+pelo peso de cada colaborador (usado pelo round-robin ponderado).
+
+Uso:
+    python benchmarks/estrategias_distribuicao.py --agentes 1000 --solicitacoes 5000
+    python benchmarks/estrategias_distribuicao.py --estrategias circular menos_recente
+"""
+import argparse
+import heapq
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from sqlalchemy import event
+
+from comum import percentil
+from fila_operacoes import criar_app, Medidor
+
+
+def jain(valores):
+    """Índice de justiça de Jain"""
+    soma = sum(valores)
+    quadrados = sum(valor * valor for valor in valores)
+    return round(soma * soma / (len(valores) * quadrados), 4) if quadrados else 1.0
+
+
+def montar(agentes, capacidade, semente):
+    """Recria as tabelas com `agentes` colaboradores na fila; retorna (ids, velocidades, pesos)"""
+    from app.models import db, Colaborador
+    from app import dados_sinteticos, pendentes
+    db.session.remove()
+    db.drop_all()
+    db.create_all()
+    pendentes.limpar()
+    ids = dados_sinteticos.gerar_colaboradores(random.Random(semente), agentes, na_fila=agentes)
+
+    rng = random.Random(semente)
+    velocidades = {colaborador_id: rng.choice((0.5, 1.0, 1.0, 1.5, 2.0)) for colaborador_id in ids}
+    pesos = {colaborador_id: rng.choice((1, 1, 2, 3)) for colaborador_id in ids}
+    entrada = datetime.utcnow() - timedelta(minutes=1)
+    for colaborador_id in ids:
+        Colaborador.query.filter_by(id=colaborador_id).update({
+            'peso': pesos[colaborador_id],
+            'capacidade': capacidade,
+            # Mesma ordem inicial da posição na fila
+            'liberado_em': entrada + timedelta(microseconds=colaborador_id),
+        })
+    db.session.commit()
+    return ids, velocidades, pesos
+
+
+def simular(nome, args):
+    """Simula a estratégia `nome` e retorna o resumo de custo e justiça"""
+    from app.models import db, Atendimento, Solicitacao
+    from app.fila import GerenciadorFila as Fila
+    from app import estrategias
+
+    ids, velocidades, pesos = montar(args.agentes, args.capacidade, args.semente)
+    rng = random.Random(args.semente)
+    taxa = args.ocupacao * args.agentes / args.duracao_media
+
+    recebidos = dict.fromkeys(ids, 0)
+    ocupado = dict.fromkeys(ids, 0.0)
+    livre_desde = dict.fromkeys(ids, 0.0)
+    ociosidade = []
+    sem_vaga = 0
+    encerramentos = []  # (fim simulado, colaborador, solicitação, duração)
+    agora = 0.0
+
+    medidor = Medidor(db.engine)
+    try:
+        with estrategias.usar(nome):
+            for _ in range(args.solicitacoes):
+                agora += rng.expovariate(taxa)
+                while encerramentos and encerramentos[0][0] <= agora:
+                    fim, colaborador_id, solicitacao_id, duracao = heapq.heappop(encerramentos)
+                    Atendimento.query.filter_by(
+                        solicitacao_id=solicitacao_id, status='em_atendimento'
+                    ).update({'inicio': datetime.utcnow() - timedelta(seconds=duracao)})
+                    db.session.commit()
+                    medidor.medir('liberar', Fila.finalizar_atendimento, colaborador_id, solicitacao_id)
+                    livre_desde[colaborador_id] = fim
+
+                solicitacao = Solicitacao(descricao='benchmark', status='pendente')
+                db.session.add(solicitacao)
+                db.session.commit()
+                solicitacao_id = solicitacao.id
+                colaborador = medidor.medir('distribuir', Fila.distribuir_solicitacao, solicitacao_id)
+                if colaborador is None:
+                    sem_vaga += 1
+                    Solicitacao.query.filter_by(id=solicitacao_id).update({'status': 'concluido'})
+                    db.session.commit()
+                    continue
+
+                colaborador_id = colaborador.id
+                duracao = rng.expovariate(1 / args.duracao_media) * velocidades[colaborador_id]
+                recebidos[colaborador_id] += 1
+                ocupado[colaborador_id] += duracao
+                if args.capacidade == 1:
+                    ociosidade.append(agora - livre_desde[colaborador_id])
+                heapq.heappush(encerramentos, (agora + duracao, colaborador_id, solicitacao_id, duracao))
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', medidor._contar)
+        db.session.remove()
+
+    custo = medidor.resumo()
+    return {
+        'estrategia': nome,
+        'custo': custo,
+        'sem_vaga': sem_vaga,
+        'justica': {
+            'jain_atendimentos': jain(list(recebidos.values())),
+            'jain_atendimentos_por_peso': jain([recebidos[i] / pesos[i] for i in ids]),
+            'jain_tempo_ocupado': jain(list(ocupado.values())),
+            'atendimentos_min': min(recebidos.values()),
+            'atendimentos_max': max(recebidos.values()),
+            'sem_atendimento': sum(1 for total in recebidos.values() if not total),
+            # Só com capacidade 1: com mais vagas, liberar uma não deixa o colaborador ocioso
+            'ociosidade_p50_s': round(percentil(ociosidade, 50), 1) if ociosidade else None,
+            'ociosidade_p95_s': round(percentil(ociosidade, 95), 1) if ociosidade else None,
+            'ociosidade_max_s': round(max(ociosidade), 1) if ociosidade else None,
+        },
+    }
+
+
+def imprimir(resultado):
+    custo, justica = resultado['custo'], resultado['justica']
+    print(f'\n{resultado["estrategia"]}')
+    for operacao in ('distribuir', 'liberar'):
+        dados = custo.get(operacao)
+        if dados:
+            print(f'  {operacao:<12} p50 {dados["p50_ms"]:7.2f} ms | p95 {dados["p95_ms"]:7.2f} ms | '
+                  f'consultas {dados["consultas_media"]:5.1f}')
+    print(f'  jain atendimentos {justica["jain_atendimentos"]:.3f} | por peso '
+          f'{justica["jain_atendimentos_por_peso"]:.3f} | tempo ocupado '
+          f'{justica["jain_tempo_ocupado"]:.3f} | min/max {justica["atendimentos_min"]}/'
+          f'{justica["atendimentos_max"]}')
+    if justica['ociosidade_p50_s'] is not None:
+        print(f'  ociosidade p50 {justica["ociosidade_p50_s"]}s | p95 {justica["ociosidade_p95_s"]}s | '
+              f'max {justica["ociosidade_max_s"]}s')
+    print(f'  sem vaga {resultado["sem_vaga"]} | sem atendimento {justica["sem_atendimento"]}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--estrategias', nargs='+',
+                        help='Nomes em app.estrategias.ESTRATEGIAS (padrão: todas)')
+    parser.add_argument('--agentes', type=int, default=1000)
+    parser.add_argument('--solicitacoes', type=int, default=5000)
+    parser.add_argument('--ocupacao', type=float, default=0.8,
+                        help='Fração média dos agentes ocupados')
+    parser.add_argument('--duracao-media', type=float, default=300.0,
+                        help='Duração média de um atendimento simulado (segundos)')
+    parser.add_argument('--capacidade', type=int, default=1)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--database-url', help='Banco descartável (as tabelas são recriadas)')
+    parser.add_argument('--saida', help='Arquivo JSON (padrão: benchmarks/resultados/'
+                                        'estrategias-<data>.json)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        uri = args.database_url or f'sqlite:///{os.path.join(diretorio, "estrategias.db")}'
+        app = criar_app(uri)
+        # Só depois de criar_app: o import de app lê DATABASE_URL
+        from app.estrategias import ESTRATEGIAS
+        args.estrategias = args.estrategias or list(ESTRATEGIAS)
+        invalidas = set(args.estrategias) - set(ESTRATEGIAS)
+        if invalidas:
+            parser.error(f'estratégias inválidas: {", ".join(sorted(invalidas))} '
+                         f'(use {", ".join(ESTRATEGIAS)})')
+        relatorio = {
+            'gerado_em': datetime.utcnow().isoformat(),
+            'ambiente': {
+                'python': platform.python_version(),
+                'plataforma': platform.platform(),
+                'banco': uri.split(':', 1)[0],
+            },
+            'parametros': vars(args),
+            'estrategias': [],
+        }
+        with app.app_context():
+            for nome in args.estrategias:
+                inicio = time.perf_counter()
+                resultado = simular(nome, args)
+                resultado['segundos'] = round(time.perf_counter() - inicio, 1)
+                relatorio['estrategias'].append(resultado)
+                imprimir(resultado)
+
+    saida = args.saida or os.path.join(
+        RAIZ, 'benchmarks', 'resultados', f'estrategias-{datetime.now():%Y%m%d-%H%M%S}.json'
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+    print(f'\nresultados gravados em {saida}')
+
+
+if __name__ == '__main__':
+    main()
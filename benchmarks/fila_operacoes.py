@@ -0,0 +1,287 @@
+"""
+Micro-benchmark das operações do GerenciadorFila
+
+Para cada combinação de tamanho de fila (--agentes) e de histórico
+(--linhas, solicitações concluídas geradas por app.dados_sinteticos),
+mede o tempo e o número de consultas SQL de cada operação da fila.
+Cada chamada usa uma sessão nova, como uma requisição, e o preparo
+(criar a solicitação, distribuí-la etc.) fica fora da medição.
+
+O resultado é gravado em JSON; com --comparar, as operações que ficaram
+mais lentas que a tolerância ou passaram a fazer mais consultas são
+listadas e o script termina com código 1.
+
+Uso:
+    python benchmarks/fila_operacoes.py --agentes 10 100 1000 --linhas 1000 100000 1000000
+    python benchmarks/fila_operacoes.py --linhas 1000 --comparar resultados/anterior.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from sqlalchemy import event
+
+from comum import percentil
+
+
+def criar_app(uri):
+    """Cria a aplicação apontando para o banco do benchmark"""
+    os.environ['DATABASE_URL'] = uri
+    os.environ['SENHA_PROCESSOS'] = '0'
+
+    # As variáveis precisam existir antes do import de config
+    from app import create_app, scheduler
+    app = create_app()
+    if scheduler.running:
+        scheduler.pause()
+    return app
+
+
+class Medidor:
+    """Cronometra chamadas e conta as consultas SQL emitidas durante cada uma"""
+
+    def __init__(self, engine):
+        self.consultas = 0
+        self.amostras = {}
+        event.listen(engine, 'before_cursor_execute', self._contar)
+
+    def _contar(self, conn, cursor, statement, parameters, context, executemany):
+        self.consultas += 1
+
+    def medir(self, nome, func, *args):
+        from app.models import db
+        # Sessão nova a cada chamada, como em uma requisição
+        db.session.remove()
+        self.consultas = 0
+        inicio = time.perf_counter()
+        resultado = func(*args)
+        duracao = time.perf_counter() - inicio
+        self.amostras.setdefault(nome, []).append((duracao, self.consultas))
+        return resultado
+
+    def resumo(self):
+        operacoes = {}
+        for nome, amostras in self.amostras.items():
+            tempos = [duracao * 1000 for duracao, _ in amostras]
+            consultas = [total for _, total in amostras]
+            operacoes[nome] = {
+                'chamadas': len(amostras),
+                'media_ms': round(sum(tempos) / len(tempos), 3),
+                'p50_ms': round(percentil(tempos, 50), 3),
+                'p95_ms': round(percentil(tempos, 95), 3),
+                'max_ms': round(max(tempos), 3),
+                'consultas_media': round(sum(consultas) / len(consultas), 2),
+                'consultas_max': max(consultas),
+            }
+        return operacoes
+
+
+def gerar_historico(linhas, total_colaboradores, semente):
+    """Recria as tabelas e gera colaboradores (fora da fila) e o histórico"""
+    from app.models import db
+    from app import dados_sinteticos
+    db.drop_all()
+    db.create_all()
+    return dados_sinteticos.gerar(total_colaboradores, linhas, semente=semente)
+
+
+def montar_fila(agentes):
+    """Coloca os `agentes` primeiros colaboradores na fila, todos livres"""
+    from app.models import db, Colaborador, Atendimento, Solicitacao
+    db.session.remove()
+    # Sobras de uma rodada anterior não podem ficar em andamento
+    Atendimento.query.filter_by(status='em_atendimento').update({'status': 'concluido'})
+    Solicitacao.query.filter(Solicitacao.status.in_(['pendente', 'em_atendimento'])).update(
+        {'status': 'concluido'}, synchronize_session=False
+    )
+    Colaborador.query.update({'esta_disponivel': False, 'esta_em_atendimento': False,
+                              'atendimentos_ativos': 0, 'posicao_fila': None})
+    # Os ids são sequenciais (ver app.dados_sinteticos)
+    Colaborador.query.filter(Colaborador.id <= agentes).update(
+        {'esta_disponivel': True, 'posicao_fila': Colaborador.id}
+    )
+    db.session.commit()
+
+
+def criar_solicitacao():
+    from app.models import db, Solicitacao
+    solicitacao = Solicitacao(descricao='benchmark', status='pendente')
+    db.session.add(solicitacao)
+    db.session.commit()
+    return solicitacao.id
+
+
+def executar_operacoes(medidor, reservas, repeticoes):
+    """Executa cada operação `repeticoes` vezes"""
+    from app.models import db, Atendimento
+    from app.fila import GerenciadorFila as Fila
+
+    for _ in range(repeticoes):
+        medidor.medir('obter_proximo_colaborador', Fila.obter_proximo_colaborador)
+        medidor.medir('obter_fila_completa', Fila.obter_fila_completa)
+        medidor.medir('obter_estatisticas_gerais', Fila.obter_estatisticas_gerais)
+        medidor.medir('verificar_timeouts', Fila.verificar_timeouts)
+
+    # Entrada no fim da fila e saída do início (reposiciona todos os demais)
+    for colaborador_id in reservas[:repeticoes]:
+        medidor.medir('adicionar_colaborador', Fila.adicionar_colaborador, colaborador_id)
+    for _ in range(repeticoes):
+        db.session.remove()
+        primeiro = Fila.obter_proximo_colaborador()
+        medidor.medir('remover_colaborador', Fila.remover_colaborador, primeiro.id)
+
+    for _ in range(repeticoes):
+        solicitacao_id = criar_solicitacao()
+        colaborador = medidor.medir('distribuir_solicitacao', Fila.distribuir_solicitacao,
+                                    solicitacao_id)
+        medidor.medir('aceitar_atendimento', Fila.aceitar_atendimento,
+                      colaborador.id, solicitacao_id)
+        medidor.medir('finalizar_atendimento', Fila.finalizar_atendimento,
+                      colaborador.id, solicitacao_id)
+
+    for _ in range(repeticoes):
+        solicitacao_id = criar_solicitacao()
+        colaborador = Fila.distribuir_solicitacao(solicitacao_id)
+        proximo = medidor.medir('pular_atendimento', Fila.pular_atendimento,
+                                colaborador.id, solicitacao_id)
+        Fila.finalizar_atendimento(proximo.id, solicitacao_id)
+
+    # Um atendimento expirado por rodada: processa o timeout e redistribui
+    for _ in range(repeticoes):
+        solicitacao_id = criar_solicitacao()
+        Fila.distribuir_solicitacao(solicitacao_id)
+        Atendimento.query.filter_by(solicitacao_id=solicitacao_id, status='em_atendimento').update(
+            {'inicio': datetime.utcnow() - timedelta(days=1)}
+        )
+        db.session.commit()
+        resultados = medidor.medir('verificar_timeouts_com_expirado', Fila.verificar_timeouts)
+        for resultado in resultados:
+            Fila.finalizar_atendimento(resultado['proximo_colaborador'], resultado['solicitacao_id'])
+    db.session.remove()
+
+
+def executar(args):
+    """Executa a grade de cenários e retorna o relatório"""
+    with tempfile.TemporaryDirectory() as diretorio:
+        uri = args.database_url or f'sqlite:///{os.path.join(diretorio, "fila.db")}'
+        app = criar_app(uri)
+        from app.models import db
+        from app import configuracoes
+
+        relatorio = {
+            'gerado_em': datetime.utcnow().isoformat(),
+            'ambiente': {
+                'python': platform.python_version(),
+                'plataforma': platform.platform(),
+                'banco': uri.split(':', 1)[0],
+            },
+            'parametros': {'agentes': args.agentes, 'linhas': args.linhas,
+                           'repeticoes': args.repeticoes, 'semente': args.semente},
+            'cenarios': [],
+        }
+
+        maximo_agentes = max(args.agentes)
+        # Colaboradores fora da fila usados para medir a entrada na fila
+        reservas = list(range(maximo_agentes + 1, maximo_agentes + args.repeticoes + 1))
+        with app.app_context():
+            for linhas in args.linhas:
+                inicio = time.perf_counter()
+                contagem = gerar_historico(linhas, maximo_agentes + args.repeticoes, args.semente)
+                print(f'histórico de {linhas} solicitações ({contagem["atendimentos"]} '
+                      f'atendimentos) gerado em {time.perf_counter() - inicio:.1f}s')
+                configuracoes.limpar()
+                configuracoes.timeout_minutos()
+
+                for agentes in args.agentes:
+                    montar_fila(agentes)
+                    medidor = Medidor(db.engine)
+                    try:
+                        executar_operacoes(medidor, reservas, args.repeticoes)
+                    finally:
+                        event.remove(db.engine, 'before_cursor_execute', medidor._contar)
+                    operacoes = medidor.resumo()
+                    relatorio['cenarios'].append({
+                        'linhas': linhas,
+                        'agentes': agentes,
+                        'contagem': contagem,
+                        'operacoes': operacoes,
+                    })
+                    imprimir_cenario(linhas, agentes, operacoes)
+        return relatorio
+
+
+def imprimir_cenario(linhas, agentes, operacoes):
+    print(f'\nlinhas {linhas} | agentes {agentes}')
+    for nome, dados in operacoes.items():
+        print(f'  {nome:<32} p50 {dados["p50_ms"]:8.2f} ms | p95 {dados["p95_ms"]:8.2f} ms | '
+              f'consultas {dados["consultas_media"]:6.1f}')
+
+
+def comparar(atual, anterior, tolerancia):
+    """Lista as operações que pioraram em relação a uma execução anterior"""
+    base = {
+        (cenario['linhas'], cenario['agentes'], nome): dados
+        for cenario in anterior['cenarios']
+        for nome, dados in cenario['operacoes'].items()
+    }
+    regressoes = []
+    for cenario in atual['cenarios']:
+        for nome, dados in cenario['operacoes'].items():
+            chave = (cenario['linhas'], cenario['agentes'], nome)
+            antes = base.get(chave)
+            if not antes:
+                continue
+            if dados['consultas_max'] > antes['consultas_max']:
+                regressoes.append(f'{chave}: consultas {antes["consultas_max"]} -> '
+                                  f'{dados["consultas_max"]}')
+            if antes['p50_ms'] and dados['p50_ms'] > antes['p50_ms'] * (1 + tolerancia):
+                regressoes.append(f'{chave}: p50 {antes["p50_ms"]:.2f} -> '
+                                  f'{dados["p50_ms"]:.2f} ms')
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--agentes', nargs='+', type=int, default=[10, 100, 1000])
+    parser.add_argument('--linhas', nargs='+', type=int, default=[1000, 100000, 1000000])
+    parser.add_argument('--repeticoes', type=int, default=20)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--database-url', help='Banco descartável (as tabelas são recriadas)')
+    parser.add_argument('--saida', help='Arquivo JSON (padrão: benchmarks/resultados/fila-<data>.json)')
+    parser.add_argument('--comparar', help='JSON de uma execução anterior')
+    parser.add_argument('--tolerancia', type=float, default=0.25,
+                        help='Aumento relativo de p50 aceito na comparação')
+    args = parser.parse_args()
+    if min(args.agentes) < 2:
+        parser.error('são necessários ao menos 2 agentes (pular_atendimento redistribui)')
+
+    relatorio = executar(args)
+
+    saida = args.saida or os.path.join(
+        RAIZ, 'benchmarks', 'resultados', f'fila-{datetime.now():%Y%m%d-%H%M%S}.json'
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+    print(f'\nresultados gravados em {saida}')
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            regressoes = comparar(relatorio, json.load(arquivo), args.tolerancia)
+        for regressao in regressoes:
+            print(f'REGRESSÃO {regressao}')
+        if regressoes:
+            raise SystemExit(1)
+        print('sem regressões em relação a', args.comparar)
+
+
+if __name__ == '__main__':
+    main()
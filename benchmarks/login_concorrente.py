@@ -0,0 +1,104 @@
+"""
+Benchmark de picos de login com eventos SocketIO em paralelo
+
+Dispara N logins simultâneos enquanto um cliente SocketIO envia um evento
+a cada 20 ms, comparando o hash de senhas na própria thread
+(SENHA_PROCESSOS=0) com o pool de processos.
+
+Uso:
+    pip install aiohttp
+    python benchmarks/login_concorrente.py --logins 200 --processos 0 4
+"""
+import argparse
+import asyncio
+import time
+
+import aiohttp
+import socketio
+
+from comum import percentil, servidor
+
+PREPARO = '''
+from app.models import Colaborador
+modelo = Colaborador(nome='x', email='x')
+modelo.set_senha('senha123')
+db.session.execute(Colaborador.__table__.insert(), [
+    {{'nome': f'Colaborador {{i}}', 'email': f'colab{{i}}@empresa.com',
+      'senha_hash': modelo.senha_hash, 'esta_disponivel': False,
+      'esta_em_atendimento': False}}
+    for i in range({total})
+])
+db.session.commit()
+'''
+
+
+async def fazer_login(url, indice, latencias, erros):
+    """Faz um login completo com uma sessão HTTP própria"""
+    async with aiohttp.ClientSession() as sessao:
+        inicio = time.perf_counter()
+        async with sessao.post(f'{url}/login', allow_redirects=False, data={
+            'email': f'colab{indice}@empresa.com',
+            'senha': 'senha123'
+        }) as resposta:
+            await resposta.read()
+            if resposta.status == 302:
+                latencias.append(time.perf_counter() - inicio)
+            else:
+                erros.append(resposta.status)
+
+
+async def monitorar_eventos(url, parar, latencias):
+    """Envia um evento periodicamente e mede o tempo de resposta"""
+    cliente = socketio.AsyncClient()
+    recebido = asyncio.Event()
+    cliente.on('erro', lambda dados: recebido.set())
+    await cliente.connect(url, transports=['websocket'])
+    while not parar.is_set():
+        recebido.clear()
+        inicio = time.perf_counter()
+        await cliente.emit('obter_estatisticas')
+        try:
+            await asyncio.wait_for(recebido.wait(), 10)
+            latencias.append(time.perf_counter() - inicio)
+        except asyncio.TimeoutError:
+            latencias.append(10.0)
+        await asyncio.sleep(0.02)
+    await cliente.disconnect()
+
+
+async def executar(processos, total, porta):
+    """Executa o benchmark para um número de processos de hash"""
+    async with servidor(porta, preparo=PREPARO.format(total=total),
+                        SENHA_PROCESSOS=processos) as processo:
+        logins, erros, eventos = [], [], []
+        parar = asyncio.Event()
+        monitor = asyncio.create_task(monitorar_eventos(processo.url, parar, eventos))
+        await asyncio.sleep(0.5)
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*[fazer_login(processo.url, i, logins, erros) for i in range(total)])
+        duracao = time.perf_counter() - inicio
+
+        parar.set()
+        await monitor
+
+        print(f'processos {processos:>2} | logins {len(logins):>4}/{total:<4} | erros {len(erros):>3} | '
+              f'{duracao:6.2f} s | login p50 {percentil(logins, 50) * 1000:7.1f} ms | '
+              f'p99 {percentil(logins, 99) * 1000:7.1f} ms | '
+              f'evento p99 {percentil(eventos, 99) * 1000:7.1f} ms | '
+              f'máx {max(eventos or [0]) * 1000:7.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--processos', nargs='+', type=int, default=[0, 4])
+    parser.add_argument('--porta', type=int, default=5098)
+    args = parser.parse_args()
+
+    for processos in args.processos:
+        asyncio.run(executar(processos, args.logins, args.porta))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Benchmark do painel de TV por SSE (/painel/eventos)
+
+Sobe o servidor em um subprocesso para cada modo assíncrono informado,
+abre N assinantes SSE e cria solicitações em intervalos regulares. Mede
+quantas conexões foram aceitas, o tempo da criação até cada assinante
+receber o resumo novo (inclui a espera pelo intervalo do painel), o
+espalhamento entre o primeiro e o último assinante de cada versão, e o
+consumo de CPU, threads e memória do servidor.
+
+Uso:
+    pip install aiohttp
+    python benchmarks/painel_sse.py --modos threading eventlet --assinantes 100 1000
+"""
+import argparse
+import asyncio
+import time
+
+import aiohttp
+
+from carga_socketio import PREPARO, login
+from comum import ler_status_processo, percentil, servidor
+
+TOKEN = 'benchmark'
+
+
+def ler_cpu_processo(pid):
+    """Segundos de CPU (usuário + sistema) consumidos pelo processo"""
+    with open(f'/proc/{pid}/stat') as arquivo:
+        campos = arquivo.read().rsplit(')', 1)[1].split()
+    return (int(campos[11]) + int(campos[12])) / 100
+
+
+async def assinar(sessao, url, recebidos, conectados):
+    """Lê o fluxo SSE e guarda o instante de chegada de cada versão"""
+    try:
+        async with sessao.get(f'{url}/painel/eventos?token={TOKEN}',
+                              timeout=aiohttp.ClientTimeout(total=None, sock_connect=30)) as resposta:
+            if resposta.status != 200:
+                return
+            conectados.append(1)
+            async for linha in resposta.content:
+                if linha.startswith(b'id: '):
+                    versao = int(linha[4:])
+                    recebidos.setdefault(versao, []).append(time.perf_counter())
+    except (aiohttp.ClientError, asyncio.CancelledError):
+        pass
+
+
+async def medir(url, total, criacoes, intervalo, lote=100):
+    """Abre os assinantes, cria solicitações e mede a entrega dos resumos"""
+    recebidos = {}
+    conectados = []
+    conector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=conector) as sessao:
+        tarefas = []
+        for i in range(0, total, lote):
+            tarefas.extend(asyncio.create_task(assinar(sessao, url, recebidos, conectados))
+                           for _ in range(min(lote, total - i)))
+            await asyncio.sleep(0.2)
+        await asyncio.sleep(3)
+
+        # Sem colaboradores na fila cada criação soma uma pendente e gera uma versão
+        cookie = await login(url, 1)
+        versao_inicial = max(recebidos, default=0)
+        envios = []
+        async with aiohttp.ClientSession(headers={'Cookie': cookie}) as cliente:
+            for i in range(criacoes):
+                envios.append(time.perf_counter())
+                async with cliente.post(f'{url}/api/criar-solicitacao',
+                                        json={'descricao': f'painel {i}'}) as resposta:
+                    await resposta.read()
+                await asyncio.sleep(intervalo)
+        await asyncio.sleep(2)
+
+        for tarefa in tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*tarefas, return_exceptions=True)
+
+    atrasos, espalhamentos, entregas = [], [], 0
+    for versao, instantes in recebidos.items():
+        if versao <= versao_inicial:
+            continue
+        entregas += len(instantes)
+        espalhamentos.append(max(instantes) - min(instantes))
+        # Atribui a versão à criação mais recente anterior à primeira entrega
+        envio = max((e for e in envios if e <= min(instantes)), default=None)
+        if envio is not None:
+            atrasos.extend(t - envio for t in instantes)
+    return len(conectados), entregas, atrasos, espalhamentos
+
+
+async def executar_modo(modo, total, args):
+    """Executa o benchmark para um modo assíncrono"""
+    async with servidor(args.porta, modo, preparo=PREPARO.format(total=1, capacidade=1),
+                        PAINEL_TOKEN=TOKEN,
+                        PAINEL_INTERVALO_SEGUNDOS=args.intervalo_painel,
+                        PAINEL_MAXIMO_ASSINANTES=total + 10) as processo:
+        cpu_inicio = ler_cpu_processo(processo.pid)
+        inicio = time.perf_counter()
+        conectados, entregas, atrasos, espalhamentos = await medir(
+            processo.url, total, args.criacoes, args.intervalo
+        )
+        cpu = ler_cpu_processo(processo.pid) - cpu_inicio
+        duracao = time.perf_counter() - inicio
+        threads, rss = ler_status_processo(processo.pid)
+        print(f'{modo:>10} | assinantes {conectados:>5}/{total:<5} | entregas {entregas:>7} | '
+              f'threads {threads:>5} | RSS {rss:7.1f} MB | CPU {cpu / duracao * 100:5.1f}% | '
+              f'atraso p50 {percentil(atrasos, 50) * 1000:7.1f} ms | '
+              f'p99 {percentil(atrasos, 99) * 1000:7.1f} ms | '
+              f'espalhamento p99 {percentil(espalhamentos, 99) * 1000:7.1f} ms')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--modos', nargs='+', default=['threading', 'eventlet', 'gevent'])
+    parser.add_argument('--assinantes', nargs='+', type=int, default=[100, 1000])
+    parser.add_argument('--criacoes', type=int, default=10,
+                        help='Solicitações criadas durante a medição')
+    parser.add_argument('--intervalo', type=float, default=1.5,
+                        help='Segundos entre as criações')
+    parser.add_argument('--intervalo-painel', type=int, default=1,
+                        help='PAINEL_INTERVALO_SEGUNDOS do servidor')
+    parser.add_argument('--porta', type=int, default=5097)
+    args = parser.parse_args()
+
+    for total in args.assinantes:
+        for modo in args.modos:
+            asyncio.run(executar_modo(modo, total, args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Benchmark de vazão de distribuição por perfil de banco
+
+Várias threads criam, distribuem e finalizam solicitações ao mesmo tempo
+contra um banco novo, comparando os perfis do engine (ver app/banco.py).
+
+Uso:
+    python benchmarks/perfis_banco.py --perfis padrao sqlite --threads 8 --segundos 10
+    python benchmarks/perfis_banco.py --perfis postgres --postgres-url postgresql://localhost/bench
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.exc import OperationalError
+
+
+def criar_app(perfil, uri):
+    """Cria a aplicação com o perfil e o banco informados"""
+    os.environ['DB_PERFIL'] = perfil
+    os.environ['DATABASE_URL'] = uri
+    os.environ['SENHA_PROCESSOS'] = '0'
+
+    # As variáveis precisam existir antes do import de config
+    from app import create_app, scheduler
+    app = create_app()
+    if scheduler.running:
+        scheduler.pause()
+    return app
+
+
+def preparar(app, total_colaboradores):
+    """Cria as tabelas e coloca os colaboradores na fila"""
+    from app.models import db, Colaborador
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        db.session.execute(Colaborador.__table__.insert(), [
+            {'nome': f'Colaborador {i}', 'email': f'colab{i}@empresa.com', 'senha_hash': '-',
+             'esta_disponivel': True, 'esta_em_atendimento': False, 'posicao_fila': i + 1}
+            for i in range(total_colaboradores)
+        ])
+        db.session.commit()
+
+
+def trabalhador(app, parar, contadores):
+    """Cria, distribui e finaliza solicitações até receber o sinal de parada"""
+    from app.models import db, Solicitacao
+    from app.fila import GerenciadorFila
+
+    while not parar.is_set():
+        with app.app_context():
+            try:
+                solicitacao = Solicitacao(descricao='benchmark', status='pendente')
+                db.session.add(solicitacao)
+                db.session.commit()
+                colaborador = GerenciadorFila.distribuir_solicitacao(solicitacao.id)
+                if colaborador:
+                    GerenciadorFila.finalizar_atendimento(colaborador.id, solicitacao.id)
+                    contadores['distribuidas'] += 1
+                else:
+                    contadores['sem_colaborador'] += 1
+            except OperationalError as erro:
+                db.session.rollback()
+                chave = 'locked' if 'locked' in str(erro) else 'outros_erros'
+                contadores[chave] += 1
+
+
+def executar(perfil, uri, threads, segundos, total_colaboradores):
+    """Executa o benchmark para um perfil"""
+    app = criar_app(perfil, uri)
+    preparar(app, total_colaboradores)
+
+    contadores = {'distribuidas': 0, 'sem_colaborador': 0, 'locked': 0, 'outros_erros': 0}
+    parar = threading.Event()
+    lista = [threading.Thread(target=trabalhador, args=(app, parar, contadores))
+             for _ in range(threads)]
+    inicio = time.perf_counter()
+    for thread in lista:
+        thread.start()
+    time.sleep(segundos)
+    parar.set()
+    for thread in lista:
+        thread.join()
+    duracao = time.perf_counter() - inicio
+
+    print(f'{perfil:>9} | threads {threads:>3} | distribuições/s '
+          f'{contadores["distribuidas"] / duracao:8.1f} | sem colaborador '
+          f'{contadores["sem_colaborador"]:>5} | locked {contadores["locked"]:>5} | '
+          f'outros erros {contadores["outros_erros"]:>4}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--perfis', nargs='+', default=['padrao', 'sqlite'])
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--segundos', type=float, default=10)
+    parser.add_argument('--colaboradores', type=int, default=50)
+    parser.add_argument('--postgres-url')
+    args = parser.parse_args()
+
+    # Cada perfil roda em um processo novo para isolar engine e extensões
+    if len(args.perfis) > 1:
+        for perfil in args.perfis:
+            comando = [sys.executable, __file__, '--perfis', perfil,
+                       '--threads', str(args.threads), '--segundos', str(args.segundos),
+                       '--colaboradores', str(args.colaboradores)]
+            if args.postgres_url:
+                comando += ['--postgres-url', args.postgres_url]
+            subprocess.run(comando, check=False)
+        return
+
+    perfil = args.perfis[0]
+    if perfil == 'postgres':
+        if not args.postgres_url:
+            parser.error('--postgres-url é obrigatório para o perfil postgres')
+        executar(perfil, args.postgres_url, args.threads, args.segundos, args.colaboradores)
+        return
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        uri = f'sqlite:///{os.path.join(diretorio, "bench.db")}'
+        executar(perfil, uri, args.threads, args.segundos, args.colaboradores)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,453 @@
+"""
+Reprodução acelerada do tráfego capturado por `flask capturar-trafego`
+
+Sobe uma instância nova (ou usa --url) com um colaborador para cada
+colaborador capturado, com a mesma capacidade, e --produtores contas que
+enviam as solicitações. O arquivo é reproduzido --velocidade vezes mais
+rápido que o original (1 = tempo real) pelos pontos de entrada reais:
+
+- chegadas: evento SocketIO 'nova_solicitacao' ou, com --entrada rest,
+  POST /api/criar-solicitacao;
+- entradas e saídas da fila: 'entrar_fila' e 'sair_fila' (a saída de quem
+  ainda tem atendimentos é adiada até o último terminar);
+- colaboradores: quem recebe 'nova_solicitacao_recebida' repete a próxima
+  tentativa capturada da solicitação: aceita e finaliza, ou pula, nos
+  mesmos intervalos divididos pela velocidade; num timeout não responde.
+
+A instância pode distribuir para outro colaborador ou em outra ordem; essa
+divergência é o que o relatório compara com a captura: colaborador
+diferente na primeira distribuição, número de tentativas e status final
+diferentes, solicitações não distribuídas e a espera até a distribuição
+(nas duas, em segundos da captura). A latência é medida do envio de cada
+ação até a resposta e do envio da solicitação até a notificação do
+colaborador. O atraso do gerador mostra se o cliente acompanhou o ritmo.
+
+O timeout da instância local é o capturado dividido pela velocidade, com
+mínimo de 1 minuto e verificação a cada minuto: em velocidades altas os
+timeouts divergem.
+
+Uso:
+    flask capturar-trafego --desde 2024-12-30 --ate 2024-12-31 --saida trafego.jsonl.gz
+    python benchmarks/replay_trafego.py trafego.jsonl.gz --velocidade 50
+    python benchmarks/replay_trafego.py trafego.jsonl.gz --velocidade 1 --url http://homologacao:5000
+
+Com --url os colaboradores precisam existir (flask gerar-dados
+--colaboradores N --solicitacoes 0, senha 'senha123'): o colaborador i da
+captura usa colab{i}@sintetico.local e os produtores os seguintes.
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import platform
+import time
+from collections import deque
+from datetime import datetime
+
+import aiohttp
+import socketio
+
+from comum import RAIZ, percentil, servidor
+from carga_socketio import METODO_SENHA, login, conectar
+
+PREPARO = '''
+import random
+from app import dados_sinteticos
+from app.models import Colaborador
+ids = dados_sinteticos.gerar_colaboradores(random.Random(0), {total})
+for colaborador_id, capacidade in zip(ids, {capacidades!r}):
+    if capacidade != 1:
+        Colaborador.query.filter_by(id=colaborador_id).update({{'capacidade': capacidade}})
+db.session.commit()
+'''
+
+
+def ler(arquivo):
+    """(cabeçalho, eventos) de um arquivo de captura"""
+    with gzip.open(arquivo, 'rt', encoding='utf-8') as entrada:
+        cabecalho = json.loads(next(entrada))
+        if cabecalho.get('versao') != 1:
+            raise ValueError(f'Versão de captura não suportada: {cabecalho.get("versao")}')
+        return cabecalho, [json.loads(linha) for linha in entrada]
+
+
+class Reproducao:
+    """Estado compartilhado pelos clientes durante a reprodução"""
+
+    def __init__(self, eventos, velocidade):
+        self.velocidade = velocidade
+        self.tentativas = {evento[2]: evento[4] for evento in eventos if evento[0] == 'c'}
+        self.enviada_em = {}
+        self.notificada_em = {}
+        self.reproduzidas = {}      # solicitação -> [(colaborador, status)]
+        self.aguardando = {}        # (evento de resposta, solicitacao_id) -> instante do envio
+        self.ativos = {}            # colaborador -> solicitacao_ids em atendimento
+        self.na_fila = set()
+        self.saida_adiada = set()
+        self.latencias = {}
+        self.contagem = dict.fromkeys(('saidas_adiadas', 'tentativas_extras', 'sem_colaborador'), 0)
+        self.erros = {}
+        self.reacoes = set()
+        self.atraso_gerador = 0.0
+        self.encerrado = False
+
+    def erro(self, tipo):
+        self.erros[tipo] = self.erros.get(tipo, 0) + 1
+
+    def latencia(self, operacao, segundos):
+        self.latencias.setdefault(operacao, []).append(segundos)
+
+    async def emitir(self, cliente, evento, dados=None, resposta=None):
+        """Envia um evento e registra o instante para medir a latência da `resposta`"""
+        if self.encerrado:
+            return
+        if resposta:
+            self.aguardando[resposta] = time.perf_counter()
+        try:
+            await cliente.emit(evento, dados)
+        except socketio.exceptions.BadNamespaceError:
+            self.erro('desconectado')
+
+    def respondida(self, chave):
+        enviada = self.aguardando.pop(chave, None)
+        if enviada is not None:
+            self.latencia(chave[0], time.perf_counter() - enviada)
+
+
+def configurar_colaborador(cliente, indice, reproducao):
+    """Registra as reações do colaborador `indice` da captura"""
+    ativos = reproducao.ativos.setdefault(indice, set())
+
+    async def reagir(solicitacao_id, tentativa):
+        _, status, _, aceite, encerramento = tentativa
+        dados = {'solicitacao_id': solicitacao_id}
+        if status == 'p':
+            await asyncio.sleep((encerramento or 0) / reproducao.velocidade)
+            await reproducao.emitir(cliente, 'pular_atendimento', dados,
+                                    ('pular', solicitacao_id))
+        elif status == 'c':
+            aceite = aceite or 0
+            await asyncio.sleep(aceite / reproducao.velocidade)
+            await reproducao.emitir(cliente, 'aceitar_atendimento', dados,
+                                    ('aceitar', solicitacao_id))
+            await asyncio.sleep(max((encerramento or 0) - aceite, 0) / reproducao.velocidade)
+            await reproducao.emitir(cliente, 'finalizar_atendimento', dados,
+                                    ('finalizar', solicitacao_id))
+
+    @cliente.on('nova_solicitacao_recebida')
+    def recebida(dados):
+        agora = time.perf_counter()
+        try:
+            solicitacao = int(dados['descricao'].rsplit(' ', 1)[1])
+        except (KeyError, IndexError, ValueError):
+            reproducao.erro('solicitacao_desconhecida')
+            return
+        if solicitacao not in reproducao.notificada_em:
+            reproducao.notificada_em[solicitacao] = agora
+            reproducao.latencia('notificacao', agora - reproducao.enviada_em[solicitacao])
+
+        capturadas = reproducao.tentativas.get(solicitacao) or []
+        feitas = reproducao.reproduzidas.setdefault(solicitacao, [])
+        if len(feitas) < len(capturadas):
+            tentativa = capturadas[len(feitas)]
+        else:
+            # A instância redistribuiu mais vezes que a captura: repete a última reação
+            reproducao.contagem['tentativas_extras'] += 1
+            tentativa = capturadas[-1] if capturadas else [indice, 'a', 0, None, None]
+        feitas.append((indice, tentativa[1]))
+        if tentativa[1] in ('c', 'p'):
+            ativos.add(dados['solicitacao_id'])
+            tarefa = asyncio.ensure_future(reagir(dados['solicitacao_id'], tentativa))
+            reproducao.reacoes.add(tarefa)
+            tarefa.add_done_callback(reproducao.reacoes.discard)
+
+    async def liberar(dados):
+        ativos.discard(dados.get('solicitacao_id'))
+        if indice in reproducao.saida_adiada and not ativos:
+            reproducao.saida_adiada.discard(indice)
+            reproducao.na_fila.discard(indice)
+            await reproducao.emitir(cliente, 'sair_fila', resposta=('sair', indice))
+
+    @cliente.on('atendimento_aceito')
+    def aceito(dados):
+        reproducao.respondida(('aceitar', dados.get('solicitacao_id')))
+
+    @cliente.on('atendimento_finalizado')
+    async def finalizado(dados):
+        reproducao.respondida(('finalizar', dados.get('solicitacao_id')))
+        await liberar(dados)
+
+    @cliente.on('atendimento_pulado')
+    async def pulado(dados):
+        reproducao.respondida(('pular', dados.get('solicitacao_id')))
+        await liberar(dados)
+
+    cliente.on('entrou_fila', lambda dados: reproducao.respondida(('entrar', indice)))
+    cliente.on('saiu_fila', lambda dados: reproducao.respondida(('sair', indice)))
+    cliente.on('erro', lambda dados: reproducao.erro(dados.get('mensagem', 'erro')))
+
+
+class Produtor:
+    """Envia as chegadas pelo SocketIO ou pela API REST"""
+
+    def __init__(self, reproducao, url, cliente, cookie, entrada):
+        self.reproducao, self.url, self.cliente = reproducao, url, cliente
+        self.cookie, self.entrada = cookie, entrada
+        self.enviadas = deque()
+        self.sessao = None
+        if entrada == 'socketio':
+            # As respostas não trazem a descrição: casam na ordem de envio
+            cliente.on('solicitacao_criada', lambda dados: self._respondida())
+            cliente.on('aviso', lambda dados: self._respondida(sem_colaborador=True))
+            cliente.on('erro', lambda dados: self._respondida(erro=dados.get('mensagem', 'erro')))
+
+    def _respondida(self, sem_colaborador=False, erro=None):
+        if self.enviadas:
+            self.reproducao.latencia('criar', time.perf_counter() - self.enviadas.popleft())
+        if sem_colaborador:
+            self.reproducao.contagem['sem_colaborador'] += 1
+        if erro:
+            self.reproducao.erro(erro)
+
+    async def enviar(self, solicitacao, prioridade):
+        dados = {'descricao': f'replay {solicitacao}', 'cliente_nome': 'Replay',
+                 'prioridade': prioridade}
+        agora = time.perf_counter()
+        self.reproducao.enviada_em[solicitacao] = agora
+        if self.entrada == 'socketio':
+            self.enviadas.append(agora)
+            await self.reproducao.emitir(self.cliente, 'nova_solicitacao', dados)
+            return
+        if self.sessao is None:
+            self.sessao = aiohttp.ClientSession(headers={'Cookie': self.cookie})
+        try:
+            async with self.sessao.post(f'{self.url}/api/criar-solicitacao', json=dados) as resposta:
+                corpo = await resposta.json()
+            self.reproducao.latencia('criar', time.perf_counter() - agora)
+            if resposta.status != 200:
+                self.reproducao.erro(corpo.get('mensagem', str(resposta.status)))
+            elif 'colaborador_id' not in corpo:
+                self.reproducao.contagem['sem_colaborador'] += 1
+        except aiohttp.ClientError:
+            self.reproducao.erro('envio')
+
+    async def fechar(self):
+        if self.sessao is not None:
+            await self.sessao.close()
+
+
+async def abrir(url, indices, reproducao, lote=20):
+    """Conecta os clientes em lotes; retorna {índice: cliente}"""
+    clientes = {}
+    for i in range(0, len(indices), lote):
+        parte = indices[i:i + lote]
+        resultado = await asyncio.gather(*[conectar(url, indice) for indice in parte],
+                                         return_exceptions=True)
+        for indice, item in zip(parte, resultado):
+            if isinstance(item, Exception):
+                reproducao.erro('conexao')
+            else:
+                clientes[indice] = item
+    return clientes
+
+
+async def reproduzir(url, cabecalho, eventos, args):
+    """Conecta os clientes e reproduz os eventos; retorna o estado e a duração"""
+    reproducao = Reproducao(eventos, args.velocidade)
+    total = len(cabecalho['capacidades'])
+    colaboradores = await abrir(url, list(range(1, total + 1)), reproducao)
+    indices_produtores = list(range(total + 1, total + args.produtores + 1))
+    clientes_produtores = await abrir(url, indices_produtores, reproducao)
+    cookies = {}
+    if args.entrada == 'rest':
+        cookies = dict(zip(indices_produtores, await asyncio.gather(
+            *[login(url, indice) for indice in indices_produtores])))
+    produtores = [Produtor(reproducao, url, cliente, cookies.get(indice), args.entrada)
+                  for indice, cliente in clientes_produtores.items()]
+    if not produtores:
+        raise RuntimeError('nenhum produtor conectado')
+    for indice, cliente in colaboradores.items():
+        configurar_colaborador(cliente, indice, reproducao)
+    print(f'{len(colaboradores)} colaboradores e {len(produtores)} produtores conectados; '
+          f'{len(eventos)} eventos em {cabecalho["duracao_segundos"] / args.velocidade:.0f}s')
+
+    tarefas = set()
+
+    def disparar(corotina):
+        tarefa = asyncio.ensure_future(corotina)
+        tarefas.add(tarefa)
+        tarefa.add_done_callback(tarefas.discard)
+
+    laco = asyncio.get_running_loop()
+    inicio = laco.time()
+    chegadas = 0
+    for evento in eventos:
+        tipo, instante = evento[0], evento[1]
+        atraso = inicio + instante / args.velocidade - laco.time()
+        if atraso > 0:
+            await asyncio.sleep(atraso)
+        else:
+            reproducao.atraso_gerador = max(reproducao.atraso_gerador, -atraso)
+
+        if tipo == 'c':
+            produtor = produtores[chegadas % len(produtores)]
+            chegadas += 1
+            disparar(produtor.enviar(evento[2], evento[3]))
+            continue
+        indice = evento[2]
+        cliente = colaboradores.get(indice)
+        if cliente is None:
+            continue
+        if tipo == 'e':
+            if indice in reproducao.saida_adiada:
+                reproducao.saida_adiada.discard(indice)
+            elif indice not in reproducao.na_fila:
+                reproducao.na_fila.add(indice)
+                disparar(reproducao.emitir(cliente, 'entrar_fila', resposta=('entrar', indice)))
+        elif indice in reproducao.na_fila:
+            if reproducao.ativos.get(indice):
+                reproducao.saida_adiada.add(indice)
+                reproducao.contagem['saidas_adiadas'] += 1
+            else:
+                reproducao.na_fila.discard(indice)
+                disparar(reproducao.emitir(cliente, 'sair_fila', resposta=('sair', indice)))
+    duracao = laco.time() - inicio
+
+    # Espera os atendimentos em andamento terminarem (até --dreno segundos)
+    limite = laco.time() + args.dreno
+    while (tarefas or reproducao.reacoes) and laco.time() < limite:
+        await asyncio.sleep(0.1)
+    reproducao.encerrado = True
+    await asyncio.gather(*[produtor.fechar() for produtor in produtores])
+    await asyncio.gather(*[cliente.disconnect() for cliente in
+                           list(colaboradores.values()) + list(clientes_produtores.values())],
+                         return_exceptions=True)
+    return reproducao, duracao
+
+
+def _resumo(valores, escala=1.0):
+    if not valores:
+        return None
+    return {'quantidade': len(valores),
+            'p50': round(percentil(valores, 50) * escala, 1),
+            'p90': round(percentil(valores, 90) * escala, 1),
+            'p99': round(percentil(valores, 99) * escala, 1),
+            'max': round(max(valores) * escala, 1)}
+
+
+def divergencia(reproducao):
+    """Compara cada solicitação reproduzida com a captura"""
+    contagem = dict.fromkeys(('nao_distribuidas', 'colaborador_diferente', 'tentativas_diferentes',
+                              'status_final_diferente'), 0)
+    espera_capturada, espera_reproduzida = [], []
+    for solicitacao, capturadas in reproducao.tentativas.items():
+        if solicitacao not in reproducao.enviada_em:
+            continue
+        feitas = reproducao.reproduzidas.get(solicitacao, [])
+        if capturadas:
+            espera_capturada.append(capturadas[0][2])
+        if not feitas:
+            contagem['nao_distribuidas'] += bool(capturadas)
+            continue
+        espera_reproduzida.append((reproducao.notificada_em[solicitacao]
+                                   - reproducao.enviada_em[solicitacao]) * reproducao.velocidade)
+        if capturadas and capturadas[0][0] != feitas[0][0]:
+            contagem['colaborador_diferente'] += 1
+        if len(capturadas) != len(feitas):
+            contagem['tentativas_diferentes'] += 1
+        if (capturadas[-1][1] if capturadas else None) != feitas[-1][1]:
+            contagem['status_final_diferente'] += 1
+    contagem['espera_capturada_s'] = _resumo(espera_capturada)
+    contagem['espera_reproduzida_s'] = _resumo(espera_reproduzida)
+    return contagem
+
+
+def imprimir(resultado):
+    divergencias = resultado['divergencia']
+    print(f'\nduração {resultado["duracao_s"]}s | enviadas {resultado["enviadas"]} | '
+          f'atraso máximo do gerador {resultado["atraso_gerador_ms"]} ms')
+    enviadas = max(resultado['enviadas'], 1)
+    for chave in ('nao_distribuidas', 'colaborador_diferente', 'tentativas_diferentes',
+                  'status_final_diferente'):
+        print(f'  {chave:<24} {divergencias[chave]:>6} ({divergencias[chave] / enviadas:.1%})')
+    for chave in ('espera_capturada_s', 'espera_reproduzida_s'):
+        dados = divergencias[chave]
+        if dados:
+            print(f'  {chave:<24} p50 {dados["p50"]}s | p90 {dados["p90"]}s | p99 {dados["p99"]}s')
+    for operacao, dados in resultado['latencia_ms'].items():
+        print(f'  {operacao:<12} {dados["quantidade"]:>6} | p50 {dados["p50"]} ms | '
+              f'p90 {dados["p90"]} ms | p99 {dados["p99"]} ms | máx {dados["max"]} ms')
+    print(f'  {resultado["contagem"]} | erros {resultado["erros"] or 0}')
+
+
+async def executar(args):
+    cabecalho, eventos = ler(args.arquivo)
+    print(f'captura de {cabecalho["inicio"]} a {cabecalho["fim"]}: {cabecalho["solicitacoes"]} '
+          f'solicitações, {len(cabecalho["capacidades"])} colaboradores')
+    if args.url:
+        reproducao, duracao = await reproduzir(args.url, cabecalho, eventos, args)
+    else:
+        total = len(cabecalho['capacidades']) + args.produtores
+        capacidades = cabecalho['capacidades'] + [1] * args.produtores
+        timeout = max(round(cabecalho['timeout_minutos'] / args.velocidade), 1)
+        async with servidor(args.porta, args.modo,
+                            preparo=PREPARO.format(total=total, capacidades=capacidades),
+                            SENHA_METODO=METODO_SENHA, SENHA_PROCESSOS=0,
+                            TIMEOUT_MINUTOS=timeout) as processo:
+            print(f'servidor local ({args.modo}, timeout {timeout} min)')
+            reproducao, duracao = await reproduzir(processo.url, cabecalho, eventos, args)
+
+    return {
+        'duracao_s': round(duracao, 1),
+        'enviadas': len(reproducao.enviada_em),
+        'atraso_gerador_ms': round(reproducao.atraso_gerador * 1000, 1),
+        'divergencia': divergencia(reproducao),
+        'latencia_ms': {operacao: _resumo(valores, 1000)
+                        for operacao, valores in sorted(reproducao.latencias.items())},
+        'contagem': reproducao.contagem,
+        'erros': reproducao.erros,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('arquivo', help='Captura de flask capturar-trafego')
+    parser.add_argument('--velocidade', type=float, default=10,
+                        help='Quantas vezes mais rápido que o original (1 a 100)')
+    parser.add_argument('--entrada', default='socketio', choices=['socketio', 'rest'],
+                        help='Ponto de entrada das solicitações')
+    parser.add_argument('--produtores', type=int, default=4)
+    parser.add_argument('--dreno', type=float, default=10,
+                        help='Espera após o último evento pelos atendimentos em andamento')
+    parser.add_argument('--modo', default='threading', choices=['threading', 'eventlet', 'gevent'])
+    parser.add_argument('--porta', type=int, default=5098)
+    parser.add_argument('--url', help='Instância já em execução (colaboradores de flask gerar-dados)')
+    parser.add_argument('--saida', help='Arquivo JSON (padrão: benchmarks/resultados/'
+                                        'replay-<data>.json)')
+    args = parser.parse_args()
+    if not 1 <= args.velocidade <= 100:
+        parser.error('--velocidade deve estar entre 1 e 100')
+    if args.produtores < 1:
+        parser.error('é preciso ao menos um produtor')
+
+    resultado = asyncio.run(executar(args))
+    imprimir(resultado)
+    relatorio = {
+        'gerado_em': datetime.utcnow().isoformat(),
+        'ambiente': {'python': platform.python_version(), 'plataforma': platform.platform(),
+                     'modo': args.modo, 'url': args.url},
+        'parametros': vars(args),
+        'resultado': resultado,
+    }
+    saida = args.saida or os.path.join(
+        RAIZ, 'benchmarks', 'resultados', f'replay-{datetime.now():%Y%m%d-%H%M%S}.json'
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as arquivo:
+        json.dump(relatorio, arquivo, indent=2, ensure_ascii=False)
+    print(f'\nresultados gravados em {saida}')
+
+
+if __name__ == '__main__':
+    main()
@@ -24,13 +24,120 @@ class Config:
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
     
+    # Pool de conexões do SQLAlchemy (ignorado para SQLite em memória)
+    SQLALCHEMY_POOL_SIZE = int(os.environ.get('SQLALCHEMY_POOL_SIZE', 10))
+    SQLALCHEMY_MAX_OVERFLOW = int(os.environ.get('SQLALCHEMY_MAX_OVERFLOW', 5))
+    
+    # Réplica de leitura para relatórios e estatísticas (opcional)
+    REPLICA_DATABASE_URL = os.environ.get('REPLICA_DATABASE_URL')
+    SQLALCHEMY_BINDS = {'replica': REPLICA_DATABASE_URL} if REPLICA_DATABASE_URL else {}
+    # Atraso máximo aceito; acima dele os relatórios voltam ao banco principal
+    REPLICA_ATRASO_MAXIMO_SEGUNDOS = int(os.environ.get('REPLICA_ATRASO_MAXIMO_SEGUNDOS', 30))
+    REPLICA_VERIFICACAO_SEGUNDOS = int(os.environ.get('REPLICA_VERIFICACAO_SEGUNDOS', 5))
+    REPLICA_HEARTBEAT_SEGUNDOS = int(os.environ.get('REPLICA_HEARTBEAT_SEGUNDOS', 5))
+    # Só para réplica SQLite: copia o arquivo principal a cada N segundos (0 desativa)
+    REPLICA_SQLITE_COPIA_SEGUNDOS = int(os.environ.get('REPLICA_SQLITE_COPIA_SEGUNDOS', 0))
+    
+    # Perfil do engine: auto (deduzido da URI), sqlite, postgres ou padrao
+    DB_PERFIL = os.environ.get('DB_PERFIL', 'auto')
+    
+    # Perfil sqlite
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE = int(os.environ.get('SQLITE_CACHE_SIZE', -64000))  # negativo = KiB
+    
+    # Perfil postgres
+    POSTGRES_STATEMENT_TIMEOUT_MS = int(os.environ.get('POSTGRES_STATEMENT_TIMEOUT_MS', 30000))
+    POSTGRES_POOL_RECYCLE = int(os.environ.get('POSTGRES_POOL_RECYCLE', 1800))
+    POSTGRES_POOL_TIMEOUT = int(os.environ.get('POSTGRES_POOL_TIMEOUT', 10))
+    
     # Configuração do SocketIO
-    SOCKETIO_ASYNC_MODE = 'threading'
+    # threading, eventlet ou gevent (os dois últimos são cooperativos)
+    SOCKETIO_ASYNC_MODE = os.environ.get('SOCKETIO_ASYNC_MODE', 'threading')
+    # Threads nativas usadas para acesso ao banco nos modos cooperativos
+    DB_THREADPOOL_SIZE = int(os.environ.get('DB_THREADPOOL_SIZE', 10))
     SOCKETIO_CORS_ALLOWED_ORIGINS = '*'  # Restringir em produção
     
+    # Hash de senhas: método do Werkzeug (ex: scrypt, pbkdf2:sha256:600000),
+    # processos dedicados (0 calcula na própria thread) e limite da fila
+    SENHA_METODO = os.environ.get('SENHA_METODO') or None
+    SENHA_PROCESSOS = int(os.environ.get('SENHA_PROCESSOS', os.cpu_count() or 1))
+    SENHA_FILA_MAXIMA = int(os.environ.get('SENHA_FILA_MAXIMA', 64))
+    
+    # Cache de usuários autenticados (validade em segundos)
+    CACHE_USUARIOS_TTL = int(os.environ.get('CACHE_USUARIOS_TTL', 30))
+    CACHE_USUARIOS_MAX = int(os.environ.get('CACHE_USUARIOS_MAX', 10000))
+    
+    # Chaves de idempotência na criação de solicitações: validade do cache em
+    # segundos (a coluna única no banco continua valendo depois disso)
+    IDEMPOTENCIA_TTL_SEGUNDOS = int(os.environ.get('IDEMPOTENCIA_TTL_SEGUNDOS', 3600))
+    IDEMPOTENCIA_MAX = int(os.environ.get('IDEMPOTENCIA_MAX', 10000))
+    
+    # Busca textual: correspondências mais recentes ordenadas por relevância (0 considera todas)
+    BUSCA_MAXIMO_CANDIDATOS = int(os.environ.get('BUSCA_MAXIMO_CANDIDATOS', 5000))
+    
+    # Máximo de solicitações por chamada de /api/solicitacoes/lote
+    SOLICITACOES_LOTE_MAXIMO = int(os.environ.get('SOLICITACOES_LOTE_MAXIMO', 1000))
+    
     # Timeout para atendimento (em minutos)
+    # Valor padrão; a configuração 'timeout_minutos' do sistema tem precedência
     TIMEOUT_MINUTOS = int(os.environ.get('TIMEOUT_MINUTOS', 20))
     
+    # Intervalo para recarregar configurações alteradas por outros processos
+    CONFIGURACOES_INTERVALO_SEGUNDOS = int(os.environ.get('CONFIGURACOES_INTERVALO_SEGUNDOS', 5))
+    
+    # Segundos de espera equivalentes a um nível de prioridade (envelhecimento)
+    PRIORIDADE_ENVELHECIMENTO_SEGUNDOS = int(os.environ.get('PRIORIDADE_ENVELHECIMENTO_SEGUNDOS', 300))
+    # Intervalo para recarregar as pendentes do banco e distribuí-las
+    PENDENTES_RECARGA_SEGUNDOS = int(os.environ.get('PENDENTES_RECARGA_SEGUNDOS', 30))
+    
+    # Escolha do próximo colaborador: circular, menos_recente, menor_tempo_hoje ou
+    # round_robin_ponderado; a configuração 'estrategia_distribuicao' do sistema tem precedência
+    ESTRATEGIA_DISTRIBUICAO = os.environ.get('ESTRATEGIA_DISTRIBUICAO', 'circular')
+    
+    # Previsão de espera: peso de cada atendimento nas médias móveis (0 a 1) e
+    # intervalo para recompor os colaboradores na fila a partir do banco
+    PREVISAO_ALFA = float(os.environ.get('PREVISAO_ALFA', 0.1))
+    PREVISAO_RECARGA_SEGUNDOS = int(os.environ.get('PREVISAO_RECARGA_SEGUNDOS', 60))
+    
+    # Escrita adiada de horários do ciclo de vida e observações: intervalo entre
+    # as gravações em lote e limite de linhas no buffer (0 grava na transação)
+    ESCRITA_ADIADA_INTERVALO_SEGUNDOS = int(os.environ.get('ESCRITA_ADIADA_INTERVALO_SEGUNDOS', 5))
+    ESCRITA_ADIADA_MAXIMO = int(os.environ.get('ESCRITA_ADIADA_MAXIMO', 10000))
+    
+    # Métricas em /metrics (formato Prometheus); com token, exige
+    # o cabeçalho "Authorization: Bearer <token>"
+    METRICAS_HABILITADAS = os.environ.get('METRICAS_HABILITADAS', 'True').lower() == 'true'
+    METRICAS_TOKEN = os.environ.get('METRICAS_TOKEN')
+    
+    # Painel de TV por SSE (/painel): intervalo do resumo, heartbeat,
+    # limite de conexões por processo e token opcional para painéis sem login
+    PAINEL_INTERVALO_SEGUNDOS = int(os.environ.get('PAINEL_INTERVALO_SEGUNDOS', 2))
+    PAINEL_HEARTBEAT_SEGUNDOS = int(os.environ.get('PAINEL_HEARTBEAT_SEGUNDOS', 15))
+    PAINEL_MAXIMO_ASSINANTES = int(os.environ.get('PAINEL_MAXIMO_ASSINANTES', 5000))
+    PAINEL_TOKEN = os.environ.get('PAINEL_TOKEN')
+    
+    # Contagem de consultas SQL por requisição/evento (cabeçalho X-Consultas-SQL)
+    SQL_MONITOR = os.environ.get('SQL_MONITOR', 'False').lower() == 'true'
+    # Execuções do mesmo SQL com parâmetros diferentes que caracterizam N+1
+    SQL_LIMIAR_N_MAIS_1 = int(os.environ.get('SQL_LIMIAR_N_MAIS_1', 5))
+    # Máximo de consultas por escopo (0 desativa); no modo estrito o escopo falha
+    SQL_ORCAMENTO_CONSULTAS = int(os.environ.get('SQL_ORCAMENTO_CONSULTAS', 0))
+    SQL_ORCAMENTO_ESTRITO = os.environ.get('SQL_ORCAMENTO_ESTRITO', 'False').lower() == 'true'
+    
+    # Emails com acesso às rotas administrativas (separados por vírgula)
+    ADMINISTRADORES = [email.strip() for email in
+                       os.environ.get('ADMINISTRADORES', 'admin@empresa.com').split(',')
+                       if email.strip()]
+    
+    # Perfil por amostragem em /admin/perfil; com token, também aceita
+    # o cabeçalho "Authorization: Bearer <token>" (para scripts)
+    PERFILADOR_TOKEN = os.environ.get('PERFILADOR_TOKEN')
+    PERFILADOR_MAXIMO_SEGUNDOS = int(os.environ.get('PERFILADOR_MAXIMO_SEGUNDOS', 60))
+    PERFILADOR_INTERVALO_MS = int(os.environ.get('PERFILADOR_INTERVALO_MS', 10))
+    
     # Configurações de email (para futuras notificações)
     MAIL_SERVER = os.environ.get('MAIL_SERVER')
     MAIL_PORT = int(os.environ.get('MAIL_PORT', 587))
@@ -47,6 +154,7 @@ class DevelopmentConfig(Config):
     """Configurações para ambiente de desenvolvimento"""
     DEBUG = True
     TESTING = False
+    SQL_MONITOR = os.environ.get('SQL_MONITOR', 'True').lower() == 'true'
 
 
 class ProductionConfig(Config):
@@ -65,6 +173,8 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    SENHA_PROCESSOS = 0
+    SQL_MONITOR = True
 
 
 # Dicionário de configurações
@@ -0,0 +1,78 @@
+"""busca textual
+
+Revision ID: 3a4b86d874d5
+Revises: a749c6f2ab67
+Create Date: 2026-10-19 05:52:33.890187
+
+Índice textual de solicitações (ver app/busca.py): tabela FTS5 mantida por
+gatilhos no SQLite, coluna tsvector gerada com índice GIN no PostgreSQL.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3a4b86d874d5'
+down_revision = 'a749c6f2ab67'
+branch_labels = None
+depends_on = None
+
+
+def _telefone(linha):
+    digitos = f"coalesce({linha}.cliente_telefone, '')"
+    for separador in (' ', '(', ')', '-', '+', '.', '/'):
+        digitos = f"replace({digitos}, '{separador}', '')"
+    return f"coalesce({linha}.cliente_telefone, '') || ' ' || {digitos}"
+
+
+def _valores(linha):
+    return f"{linha}.id, {linha}.descricao, coalesce({linha}.cliente_nome, ''), {_telefone(linha)}"
+
+
+def _upgrade_sqlite():
+    inserir = ('INSERT INTO solicitacoes_busca(rowid, descricao, cliente_nome, cliente_telefone) '
+               f'VALUES ({_valores("NEW")});')
+    remover = ("INSERT INTO solicitacoes_busca(solicitacoes_busca, rowid, descricao, cliente_nome, cliente_telefone) "
+               f"VALUES ('delete', {_valores('OLD')});")
+    op.execute("CREATE VIRTUAL TABLE IF NOT EXISTS solicitacoes_busca USING fts5("
+               "descricao, cliente_nome, cliente_telefone, content='', "
+               "tokenize='unicode61 remove_diacritics 2', prefix='2 3')")
+    op.execute("INSERT INTO solicitacoes_busca(solicitacoes_busca, rank) VALUES ('rank', 'bm25(1.0, 3.0, 3.0)')")
+    op.execute(f"CREATE TRIGGER IF NOT EXISTS solicitacoes_busca_ai AFTER INSERT ON solicitacoes BEGIN {inserir} END")
+    op.execute(f"CREATE TRIGGER IF NOT EXISTS solicitacoes_busca_ad AFTER DELETE ON solicitacoes BEGIN {remover} END")
+    op.execute("CREATE TRIGGER IF NOT EXISTS solicitacoes_busca_au AFTER UPDATE OF descricao, cliente_nome, "
+               f"cliente_telefone ON solicitacoes BEGIN {remover} {inserir} END")
+    # Indexa as solicitações existentes
+    op.execute("INSERT INTO solicitacoes_busca(solicitacoes_busca) VALUES ('delete-all')")
+    op.execute('INSERT INTO solicitacoes_busca(rowid, descricao, cliente_nome, cliente_telefone) '
+               f'SELECT {_valores("solicitacoes")} FROM solicitacoes')
+
+
+def _upgrade_postgresql():
+    # A coluna gerada é calculada para as linhas existentes no próprio ALTER TABLE
+    op.execute("ALTER TABLE solicitacoes ADD COLUMN IF NOT EXISTS busca tsvector GENERATED ALWAYS AS ("
+               "setweight(to_tsvector('simple', coalesce(cliente_nome, '')), 'A') || "
+               "setweight(to_tsvector('simple', coalesce(cliente_telefone, '') || ' ' || "
+               "regexp_replace(coalesce(cliente_telefone, ''), '[^0-9]', '', 'g')), 'A') || "
+               "setweight(to_tsvector('simple', descricao), 'B')) STORED")
+    op.execute('CREATE INDEX IF NOT EXISTS ix_solicitacoes_busca ON solicitacoes USING gin (busca)')
+
+
+def upgrade():
+    dialeto = op.get_bind().dialect.name
+    if dialeto == 'sqlite':
+        _upgrade_sqlite()
+    elif dialeto == 'postgresql':
+        _upgrade_postgresql()
+
+
+def downgrade():
+    dialeto = op.get_bind().dialect.name
+    if dialeto == 'sqlite':
+        op.execute('DROP TRIGGER IF EXISTS solicitacoes_busca_ai')
+        op.execute('DROP TRIGGER IF EXISTS solicitacoes_busca_ad')
+        op.execute('DROP TRIGGER IF EXISTS solicitacoes_busca_au')
+        op.execute('DROP TABLE IF EXISTS solicitacoes_busca')
+    elif dialeto == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_solicitacoes_busca')
+        op.execute('ALTER TABLE solicitacoes DROP COLUMN IF EXISTS busca')
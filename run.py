@@ -2,6 +2,17 @@
 Arquivo principal para executar a aplicação
 """
 import os
+from dotenv import load_dotenv
+
+# Modos cooperativos exigem o monkey patching antes dos demais imports
+load_dotenv()
+if os.environ.get('SOCKETIO_ASYNC_MODE') == 'eventlet':
+    import eventlet
+    eventlet.monkey_patch()
+elif os.environ.get('SOCKETIO_ASYNC_MODE') == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
 import atexit
 from app import create_app, socketio, shutdown_scheduler
 
@@ -25,6 +36,7 @@ if __name__ == '__main__':
     🚀 Servidor iniciado em: http://{host}:{port}
     🔧 Modo: {'Desenvolvimento' if debug else 'Produção'}
     ⏱️  Timeout de atendimento: {app.config.get('TIMEOUT_MINUTOS', 20)} minutos
+    🔀 Modo assíncrono: {socketio.async_mode}
     
     📝 Para acessar:
        - Abra seu navegador em http://localhost:{port}
@@ -0,0 +1,67 @@
+"""
+Fixtures dos testes: a aplicação em modo testing (SQLite em memória) e um
+banco recriado a cada teste, com o estado por processo zerado
+"""
+import os
+
+os.environ['FLASK_ENV'] = 'testing'
+
+import pytest
+from app import create_app, scheduler, shutdown_scheduler
+from app import (cache_usuarios, ciclo_vida, configuracoes, escrita_adiada, idempotencia,
+                 pendentes, previsao)
+from app.models import db, Colaborador
+
+
+def limpar_estado():
+    """Estado por processo que sobrevive entre testes"""
+    cache_usuarios.limpar()
+    configuracoes.limpar()
+    pendentes.limpar()
+    previsao.limpar()
+    ciclo_vida.limpar()
+    escrita_adiada.limpar()
+    idempotencia.limpar()
+
+
+@pytest.fixture(scope='session')
+def app():
+    aplicacao = create_app()
+    # Os jobs rodariam em outra thread sobre o mesmo banco em memória
+    if scheduler.running:
+        scheduler.pause()
+    yield aplicacao
+    shutdown_scheduler()
+
+
+@pytest.fixture
+def banco(app):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        limpar_estado()
+        yield db
+        db.session.remove()
+        limpar_estado()
+
+
+@pytest.fixture
+def cliente(app, banco):
+    return app.test_client()
+
+
+@pytest.fixture
+def criar_colaborador(banco):
+    """Cria um colaborador (senha 'senha123'), opcionalmente já na fila"""
+    def _criar(nome='Agente', capacidade=1, na_fila=False):
+        from app.fila import GerenciadorFila
+        numero = Colaborador.query.count() + 1
+        colaborador = Colaborador(nome=f'{nome} {numero}', email=f'agente{numero}@teste.com',
+                                  capacidade=capacidade)
+        colaborador.set_senha('senha123')
+        db.session.add(colaborador)
+        db.session.commit()
+        if na_fila:
+            GerenciadorFila.adicionar_colaborador(colaborador.id)
+        return colaborador
+    return _criar
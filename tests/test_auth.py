@@ -0,0 +1,38 @@
+"""Rotas de autenticação com o pool de senhas cheio"""
+import pytest
+from app import senhas
+from app.senhas import FilaSenhasCheia
+
+MENSAGEM = 'Muitos acessos simultâneos'
+
+
+@pytest.fixture
+def encher_fila(monkeypatch):
+    """A partir da chamada, todo cálculo de senha é recusado"""
+    def recusar(func, *args):
+        raise FilaSenhasCheia()
+    return lambda: monkeypatch.setattr(senhas, '_executar', recusar)
+
+
+def _recusada(resposta):
+    return resposta.status_code == 503 and MENSAGEM in resposta.get_data(as_text=True)
+
+
+def test_login_com_fila_cheia(cliente, criar_colaborador, encher_fila):
+    colaborador = criar_colaborador()
+    encher_fila()
+    assert _recusada(cliente.post('/login', data={'email': colaborador.email, 'senha': 'senha123'}))
+
+
+def test_registro_com_fila_cheia(cliente, encher_fila):
+    encher_fila()
+    assert _recusada(cliente.post('/registro', data={'nome': 'Novo', 'email': 'novo@teste.com',
+                                                     'senha': 'senha123', 'confirmar_senha': 'senha123'}))
+
+
+def test_alterar_senha_com_fila_cheia(cliente, criar_colaborador, encher_fila):
+    colaborador = criar_colaborador()
+    cliente.post('/login', data={'email': colaborador.email, 'senha': 'senha123'})
+    encher_fila()
+    assert _recusada(cliente.post('/alterar-senha', data={'senha_atual': 'senha123', 'nova_senha': 'outra123',
+                                                          'confirmar_senha': 'outra123'}))
@@ -0,0 +1,60 @@
+"""Busca textual: cursor, limite de candidatas e telefones"""
+import pytest
+from app import busca
+from app.models import db, Solicitacao
+
+
+@pytest.fixture
+def solicitacoes(banco):
+    linhas = [Solicitacao(descricao=f'Dúvida sobre fatura {numero}', cliente_nome=f'Cliente {numero % 7}',
+                          cliente_telefone=f'(11) 9{numero:04d}-6275', status='concluido')
+              for numero in range(60)]
+    db.session.add_all(linhas)
+    db.session.commit()
+    return linhas
+
+
+@pytest.fixture
+def maximo_candidatos():
+    yield busca.configurar
+    busca.configurar(5000)
+
+
+def _todas_as_paginas(consulta, por_pagina):
+    ids, proximo = [], None
+    while True:
+        pagina, proximo = busca.buscar(consulta, por_pagina, proximo)
+        ids += [s.id for s in pagina]
+        if proximo is None:
+            return ids
+
+
+def test_cursor_percorre_a_mesma_ordem_de_uma_pagina_so(solicitacoes):
+    de_uma_vez, proximo = busca.buscar('cliente fatura', 100)
+    assert proximo is None and len(de_uma_vez) == 60
+    assert _todas_as_paginas('cliente fatura', 7) == [s.id for s in de_uma_vez]
+
+
+def test_limite_considera_as_mais_recentes(solicitacoes, maximo_candidatos):
+    maximo_candidatos(25)
+    ids = _todas_as_paginas('fatura', 10)
+    assert sorted(ids) == sorted(s.id for s in solicitacoes[-25:])
+
+
+def test_telefone_por_prefixo_dos_blocos_ou_dos_digitos(solicitacoes):
+    alvo = solicitacoes[12].id  # (11) 90012-6275
+    for consulta in ('90012', '1190012', '11900126275'):
+        assert alvo in [s.id for s in busca.buscar(consulta, 100)[0]]
+    for consulta in ('0012', '900126275'):
+        assert alvo not in [s.id for s in busca.buscar(consulta, 100)[0]]
+
+
+def test_rota_pagina_por_cursor(solicitacoes, cliente, criar_colaborador):
+    colaborador = criar_colaborador()
+    cliente.post('/login', data={'email': colaborador.email, 'senha': 'senha123'})
+    resposta = cliente.get('/api/solicitacoes/busca?q=fatura&cursor=abc')
+    assert resposta.status_code == 400
+    primeira = cliente.get('/api/solicitacoes/busca?q=fatura&por_pagina=50').get_json()
+    segunda = cliente.get(f'/api/solicitacoes/busca?q=fatura&cursor={primeira["proximo"]}').get_json()
+    assert len(primeira['solicitacoes']) + len(segunda['solicitacoes']) == 60
+    assert segunda['tem_mais'] is False
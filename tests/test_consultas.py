@@ -0,0 +1,17 @@
+"""Consultas por página e evento (o mesmo que flask verificar-consultas)"""
+from app import monitor_sql, socketio
+
+ORCAMENTO = 15
+
+
+def test_paginas_e_eventos_sem_n_mais_1(app, banco):
+    escopos = monitor_sql.auditar(app, socketio)
+    assert len(escopos) >= len(monitor_sql.PAGINAS) + len(monitor_sql.EVENTOS)
+    problemas = {}
+    for escopo in escopos:
+        encontrados = escopo.problemas()
+        if escopo.consultas > ORCAMENTO:
+            encontrados.append(f'{escopo.consultas} consultas (orçamento {ORCAMENTO})')
+        if encontrados:
+            problemas[escopo.nome] = encontrados
+    assert problemas == {}
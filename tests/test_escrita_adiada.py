@@ -0,0 +1,45 @@
+"""Escrita adiada e transações desfeitas"""
+from app import escrita_adiada
+from app.fila import GerenciadorFila
+from app.models import db, Atendimento, Solicitacao
+
+
+def _atendimento(colaborador):
+    solicitacao = Solicitacao(descricao='teste', status='pendente')
+    db.session.add(solicitacao)
+    db.session.commit()
+    GerenciadorFila.enfileirar(solicitacao)
+    return Atendimento.query.filter_by(colaborador_id=colaborador.id).one()
+
+
+def test_rollback_descarta_valores_adiados(criar_colaborador):
+    atendimento = _atendimento(criar_colaborador(na_fila=True))
+    atendimento.observacoes = 'desfeita'
+    assert escrita_adiada.adiar(atendimento, 'observacoes')
+    db.session.rollback()
+    assert escrita_adiada.tamanho() == 0
+    assert escrita_adiada.descarregar() == 0
+    assert db.session.get(Atendimento, atendimento.id).observacoes is None
+
+
+def test_commit_leva_ao_buffer(criar_colaborador):
+    atendimento = _atendimento(criar_colaborador(na_fila=True))
+    atendimento.observacoes = 'confirmada'
+    escrita_adiada.adiar(atendimento, 'observacoes')
+    assert escrita_adiada.tamanho() == 0
+    db.session.commit()
+    assert escrita_adiada.tamanho() == 1
+    assert escrita_adiada.descarregar() == 1
+    db.session.expire_all()
+    assert db.session.get(Atendimento, atendimento.id).observacoes == 'confirmada'
+
+
+def test_aplicar_desfeito_volta_ao_buffer(criar_colaborador):
+    atendimento = _atendimento(criar_colaborador(na_fila=True))
+    atendimento.observacoes = 'adiada'
+    escrita_adiada.adiar(atendimento, 'observacoes')
+    db.session.commit()
+    assert escrita_adiada.aplicar(atendimento)
+    assert escrita_adiada.tamanho() == 0
+    db.session.rollback()
+    assert escrita_adiada.pendente(atendimento, 'observacoes') == 'adiada'
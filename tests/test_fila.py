@@ -0,0 +1,110 @@
+"""Distribuição da fila: reserva da solicitação e vagas dos colaboradores"""
+from app.fila import GerenciadorFila
+from app.models import db, Colaborador, Solicitacao, Atendimento
+from app import estrategias, pendentes
+
+
+def _pendente(descricao='teste'):
+    solicitacao = Solicitacao(descricao=descricao, status='pendente')
+    db.session.add(solicitacao)
+    db.session.commit()
+    return solicitacao
+
+
+def _no_banco(sql, **parametros):
+    """Simula a escrita de outro processo (sem passar pelos objetos da sessão)"""
+    db.session.execute(db.text(sql), parametros)
+
+
+def test_solicitacao_reservada_por_outro_processo_nao_e_distribuida(criar_colaborador):
+    colaborador = criar_colaborador(na_fila=True)
+    solicitacao = _pendente()
+    assert solicitacao.status == 'pendente'
+    _no_banco("UPDATE solicitacoes SET status = 'em_atendimento' WHERE id = :id", id=solicitacao.id)
+
+    assert GerenciadorFila.distribuir_solicitacao(solicitacao.id) is None
+    db.session.commit()
+    assert Atendimento.query.count() == 0
+    assert db.session.get(Colaborador, colaborador.id).atendimentos_ativos == 0
+
+
+def test_vaga_ocupada_por_outro_processo_nao_se_perde(criar_colaborador):
+    colaborador = criar_colaborador(capacidade=2, na_fila=True)
+    assert colaborador.atendimentos_ativos == 0
+    _no_banco('UPDATE colaboradores SET atendimentos_ativos = 1 WHERE id = :id', id=colaborador.id)
+
+    solicitacao = _pendente()
+    assert GerenciadorFila.distribuir_solicitacao(solicitacao.id).id == colaborador.id
+    db.session.commit()
+    ativos = db.session.execute(db.text('SELECT atendimentos_ativos FROM colaboradores WHERE id = :id'),
+                                {'id': colaborador.id}).scalar()
+    assert ativos == 2
+
+
+def test_sem_vaga_no_banco_devolve_a_reserva(criar_colaborador, monkeypatch):
+    colaborador = criar_colaborador(na_fila=True)
+    solicitacao = _pendente()
+    # A escolha viu a vaga livre, mas outro processo a ocupou antes do UPDATE
+    escolhas = iter([colaborador, None])
+    monkeypatch.setattr(estrategias.Circular, 'proximo', lambda self, excluir=(): next(escolhas))
+    _no_banco('UPDATE colaboradores SET atendimentos_ativos = 1 WHERE id = :id', id=colaborador.id)
+
+    assert GerenciadorFila.distribuir_solicitacao(solicitacao.id) is None
+    db.session.commit()
+    assert db.session.get(Solicitacao, solicitacao.id).status == 'pendente'
+    assert Atendimento.query.count() == 0
+
+
+def test_liberacao_decrementa_no_banco(criar_colaborador):
+    colaborador = criar_colaborador(capacidade=3, na_fila=True)
+    _no_banco('UPDATE colaboradores SET atendimentos_ativos = 2, esta_em_atendimento = 1 '
+              'WHERE id = :id', id=colaborador.id)
+    colaborador.finalizar_atendimento()
+    db.session.commit()
+    assert (colaborador.atendimentos_ativos, colaborador.esta_em_atendimento) == (1, True)
+    colaborador.finalizar_atendimento()
+    colaborador.finalizar_atendimento()
+    db.session.commit()
+    assert (colaborador.atendimentos_ativos, colaborador.esta_em_atendimento) == (0, False)
+
+
+def _distribuida_a(colaborador, descricao='teste'):
+    solicitacao = _pendente(descricao)
+    assert GerenciadorFila.enfileirar(solicitacao).id == colaborador.id
+    return solicitacao
+
+
+def test_pulo_com_vagas_nao_devolve_para_quem_pulou(criar_colaborador):
+    primeiro = criar_colaborador(capacidade=2, na_fila=True)
+    segundo = criar_colaborador(capacidade=2, na_fila=True)
+    solicitacao = _distribuida_a(primeiro)
+    _distribuida_a(segundo)
+    # Depois de liberar, quem pulou é o menos ocupado e seria o próximo
+
+    proximo = GerenciadorFila.pular_atendimento(primeiro.id, solicitacao.id)
+    assert proximo.id == segundo.id
+
+
+def test_timeout_com_vagas_nao_devolve_para_quem_expirou(criar_colaborador):
+    primeiro = criar_colaborador(capacidade=2, na_fila=True)
+    segundo = criar_colaborador(capacidade=2, na_fila=True)
+    solicitacao = _distribuida_a(primeiro)
+    _distribuida_a(segundo)
+    _no_banco("UPDATE atendimentos SET inicio = '2000-01-01 00:00:00' WHERE solicitacao_id = :id",
+              id=solicitacao.id)
+
+    proximo = GerenciadorFila.processar_timeout(primeiro.id, solicitacao.id)
+    assert proximo.id == segundo.id
+
+
+def test_pulo_sem_outro_colaborador_fica_pendente_e_libera_a_vaga(criar_colaborador):
+    unico = criar_colaborador(capacidade=2, na_fila=True)
+    pulada = _distribuida_a(unico, 'pulada')
+    seguinte = _pendente('seguinte')
+    pendentes.adicionar(seguinte.id, seguinte.prioridade, seguinte.criado_em)
+
+    # A pulada é a mais antiga, mas só quem pulou está livre: a vaga vai para a seguinte
+    assert GerenciadorFila.pular_atendimento(unico.id, pulada.id) is None
+    assert db.session.get(Solicitacao, pulada.id).status == 'pendente'
+    assert db.session.get(Solicitacao, seguinte.id).status == 'em_atendimento'
+    assert pendentes.a_frente(pulada.id) == 0
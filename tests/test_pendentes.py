@@ -0,0 +1,31 @@
+"""Ordem das pendentes"""
+import bisect
+import random
+from app.pendentes import _Ordem
+
+
+class _OrdemPequena(_Ordem):
+    # Blocos pequenos: as divisões e remoções de bloco acontecem logo
+    CARGA = 4
+
+
+def test_ordem_confere_com_lista_ordenada():
+    rng = random.Random(7)
+    for _ in range(200):
+        iniciais = [rng.randrange(50) for _ in range(rng.randrange(30))]
+        ordem, referencia = _OrdemPequena(iniciais), sorted(iniciais)
+        for _ in range(100):
+            valor = rng.randrange(50)
+            operacao = rng.random()
+            if operacao < 0.45:
+                ordem.incluir(valor)
+                bisect.insort(referencia, valor)
+            elif operacao < 0.9:
+                indice = bisect.bisect_left(referencia, valor)
+                havia = indice < len(referencia) and referencia[indice] == valor
+                assert ordem.remover(valor) == havia
+                if havia:
+                    del referencia[indice]
+            assert ordem.posicao(valor) == bisect.bisect_left(referencia, valor)
+        assert [ordem.posicao(valor) for valor in range(51)] == \
+            [bisect.bisect_left(referencia, valor) for valor in range(51)]
@@ -0,0 +1,9 @@
+"""Planos das consultas frequentes (o mesmo que flask verificar-planos)"""
+from app.planos import auditar
+
+
+def test_consultas_frequentes_usam_indices(banco):
+    relatorio = auditar()
+    assert relatorio
+    falhas = {item['fluxo']: item['sql'] for item in relatorio if item['varreduras']}
+    assert falhas == {}
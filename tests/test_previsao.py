@@ -0,0 +1,33 @@
+"""Médias da previsão de espera"""
+from datetime import datetime, timedelta
+from app import previsao
+from app.fila import GerenciadorFila
+from app.models import db, Solicitacao
+
+
+def _nova(descricao):
+    solicitacao = Solicitacao(descricao=descricao, status='pendente')
+    db.session.add(solicitacao)
+    db.session.commit()
+    return solicitacao
+
+
+def _recuar_inicio(solicitacao, segundos):
+    db.session.execute(db.text('UPDATE atendimentos SET inicio = :inicio WHERE solicitacao_id = :id'),
+                       {'inicio': datetime.utcnow() - timedelta(seconds=segundos), 'id': solicitacao.id})
+    db.session.commit()
+
+
+def test_media_usa_so_concluidos(criar_colaborador):
+    colaborador = criar_colaborador(na_fila=True)
+    pulada = _nova('pulada')
+    GerenciadorFila.enfileirar(pulada)
+    _recuar_inicio(pulada, 1000)
+    GerenciadorFila.pular_atendimento(colaborador.id, pulada.id)
+    assert previsao.resumo()['duracao_media_segundos'] is None
+
+    # Uma nova chegada redistribui a pulada, agora concluída
+    GerenciadorFila.enfileirar(_nova('seguinte'))
+    _recuar_inicio(pulada, 300)
+    GerenciadorFila.finalizar_atendimento(colaborador.id, pulada.id)
+    assert abs(previsao.resumo()['duracao_media_segundos'] - 300) < 5
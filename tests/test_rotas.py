@@ -0,0 +1,53 @@
+"""Rotas da aplicação"""
+import logging
+from app.models import Solicitacao
+
+
+def test_perfil_registra_resumo_no_log(app, cliente, monkeypatch, caplog, capsys):
+    monkeypatch.setitem(app.config, 'PERFILADOR_TOKEN', 'segredo')
+    caplog.set_level(logging.INFO, logger=app.logger.name)
+    resposta = cliente.get('/admin/perfil?segundos=0.1', headers={'Authorization': 'Bearer segredo'})
+    assert resposta.status_code == 200
+    assert int(resposta.headers['X-Perfil-Amostras']) > 0
+    assert any(registro.getMessage().startswith('Perfil: ') for registro in caplog.records)
+    assert 'amostras' not in capsys.readouterr().out
+
+
+def _entrar(cliente, colaborador):
+    cliente.post('/login', data={'email': colaborador.email, 'senha': 'senha123'})
+
+
+def test_lote_recusa_item_com_tipo_errado(cliente, criar_colaborador):
+    _entrar(cliente, criar_colaborador())
+    for item_errado in ({'descricao': 5}, {'descricao': 'x', 'cliente_nome': ['a']},
+                        {'descricao': 'x', 'cliente_telefone': 11999}, {'descricao': 'x', 'prioridade': 1.5},
+                        {'descricao': 'x', 'prioridade': True}, 'texto'):
+        resposta = cliente.post('/api/solicitacoes/lote', json=[{'descricao': 'válida'}, item_errado])
+        assert resposta.status_code == 400
+        assert resposta.get_json()['indice'] == 1
+    assert Solicitacao.query.count() == 0
+
+
+def test_lote_aceita_prioridade_inteira_ou_nome(cliente, criar_colaborador):
+    _entrar(cliente, criar_colaborador())
+    resposta = cliente.post('/api/solicitacoes/lote', json=[
+        {'descricao': 'a', 'prioridade': 3}, {'descricao': 'b', 'prioridade': 'alta'},
+        {'descricao': 'c', 'cliente_nome': None},
+    ])
+    assert resposta.status_code == 200
+    assert resposta.get_json()['criadas'] == 3
+
+
+def test_lote_ndjson_recusa_linha_que_nao_e_objeto(cliente, criar_colaborador):
+    _entrar(cliente, criar_colaborador())
+    resposta = cliente.post('/api/solicitacoes/lote', data=b'{"descricao": "a"}\n[1, 2]\n',
+                            content_type='application/x-ndjson')
+    assert resposta.status_code == 400
+    assert resposta.get_json()['indice'] == 1
+
+
+def test_criar_solicitacao_recusa_tipo_errado(cliente, criar_colaborador):
+    _entrar(cliente, criar_colaborador())
+    resposta = cliente.post('/api/criar-solicitacao', json={'descricao': {'texto': 'x'}})
+    assert resposta.status_code == 400
+    assert Solicitacao.query.count() == 0
@@ -0,0 +1,36 @@
+"""Simulador: a fila em memória segue as mesmas regras do GerenciadorFila"""
+import math
+import pytest
+from app.simulador import Simulacao, app_isolada
+
+MODELO = {
+    'chegadas_por_hora': [12] * 168,
+    'prioridades': {'0': 0.2, '1': 0.5, '3': 0.3},
+    'probabilidades': {'pulo': 0.15, 'timeout': 0.05},
+    'duracao_atendimento': {'mu': math.log(600), 'sigma': 0.5},
+    'duracao_pulo': {'mu': math.log(60), 'sigma': 0.5},
+}
+
+
+class _Gravando(Simulacao):
+    def _distribuida(self, agora, solicitacao_id, colaborador_id):
+        self.sequencia.append((solicitacao_id, colaborador_id))
+        super()._distribuida(agora, solicitacao_id, colaborador_id)
+
+
+def _distribuicoes(app, estrategia, capacidade, orm):
+    simulacao = _Gravando(MODELO, agentes=3, timeout_minutos=10, dias=0.25,
+                          capacidade=capacidade, estrategia=estrategia, semente=3)
+    simulacao.sequencia = []
+    with app_isolada(app).app_context():
+        simulacao.executar(orm=orm)
+    return simulacao.sequencia
+
+
+# menor_tempo_hoje fica de fora: no modo ORM o tempo acumula no relógio real
+@pytest.mark.parametrize('estrategia', ['circular', 'menos_recente', 'round_robin_ponderado'])
+@pytest.mark.parametrize('capacidade', [1, 2])
+def test_memoria_e_orm_distribuem_igual(app, estrategia, capacidade):
+    em_memoria = _distribuicoes(app, estrategia, capacidade, orm=False)
+    assert len(em_memoria) > 50
+    assert em_memoria == _distribuicoes(app, estrategia, capacidade, orm=True)